@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Private cache of the responses of the http client, with conditional revalidation."""
+
+import os
+import json
+import asyncio
+import time
+import hashlib
+import tempfile
+from typing import Any, Dict, List, Tuple, Mapping, Callable, Optional
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+
+NOT_MODIFIED = 304
+# the statuses cacheable by default, as listed by RFC 7231
+CACHEABLE_STATUSES = frozenset({200, 203, 204, 206, 300, 301, 404, 405, 410, 414, 501})
+# the headers a 304 response must not update, since they describe the stored body
+BODY_HEADERS = frozenset({"content-length", "content-encoding", "content-type", "transfer-encoding"})
+
+
+def parse_cache_control(header: str) -> Dict[str, Optional[str]]:
+    """
+    Parse a Cache-Control header.
+
+    :param header: the header.
+    :return: the lowercase directives, with their value if any.
+    """
+    directives: Dict[str, Optional[str]] = {}
+    for directive in header.split(","):
+        name, sep, value = directive.strip().partition("=")
+        if name:
+            directives[name.strip().lower()] = value.strip().strip('"') if sep else None
+    return directives
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Parse an http date into a timestamp, None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _int(value: Optional[str], default: int = 0) -> int:
+    """Parse a non-negative integer, the default if malformed."""
+    try:
+        return max(int(value or ""), 0)
+    except ValueError:
+        return default
+
+
+class StoredResponse:
+    """A response of the http client, as sent back to the skills and as stored in the cache."""
+
+    def __init__(
+        self,
+        status: int,
+        reason: Optional[str],
+        headers: Mapping[str, str],
+        body: bytes,
+        stored_at: float = 0.0,
+        expires_at: float = 0.0,
+        vary: Optional[Dict[str, Optional[str]]] = None,
+        body_path: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the response.
+
+        :param status: the status code.
+        :param reason: the status text.
+        :param headers: the headers.
+        :param body: the body.
+        :param stored_at: the time the response was received.
+        :param expires_at: the time the response becomes stale.
+        :param vary: the request headers the response varies on, with the values they had.
+        :param body_path: the file the body was spooled to, in which case `body` is empty.
+        """
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self.body = body
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.vary = vary or {}
+        self.body_path = body_path
+
+    def cleanup(self) -> None:
+        """Remove the file the body was spooled to, if any."""
+        if self.body_path is not None:
+            with suppress(FileNotFoundError):
+                os.remove(self.body_path)
+            self.body_path = None
+
+    def is_fresh(self, now: float) -> bool:
+        """Check whether the response can be used without revalidation."""
+        return now < self.expires_at
+
+    def with_age(self, now: float) -> "StoredResponse":
+        """Get a copy of the response with its Age header, as served from the cache."""
+        headers = CIMultiDict(self.headers)
+        headers["Age"] = str(int(max(now - self.stored_at, 0)))
+        return StoredResponse(self.status, self.reason, headers, self.body, self.stored_at, self.expires_at, self.vary)
+
+    def to_json(self) -> Dict[str, Any]:
+        """Get the metadata of the response, as stored on disk."""
+        return {
+            "status": self.status,
+            "reason": self.reason,
+            "headers": list(self.headers.items()),
+            "stored_at": self.stored_at,
+            "expires_at": self.expires_at,
+            "vary": self.vary,
+        }
+
+    @classmethod
+    def from_json(cls, metadata: Dict[str, Any], body: bytes) -> "StoredResponse":
+        """Get a response from its metadata and body, as stored on disk."""
+        return cls(
+            metadata["status"],
+            metadata["reason"],
+            CIMultiDict(metadata["headers"]),
+            body,
+            metadata["stored_at"],
+            metadata["expires_at"],
+            metadata["vary"],
+        )
+
+
+class ClientCache:
+    """
+    Private cache of the responses to GET requests of the http client, as described by RFC 7234.
+
+    Responses are fresh for their Cache-Control max-age, or until their Expires date, and are served without
+    any network I/O while fresh. Stale responses with an ETag or a Last-Modified date are revalidated with
+    a conditional request, so that only the changed resources are downloaded again.
+    The memory tier is an LRU, and the optional disk tier keeps the responses across restarts. The disk tier is
+    read and written in a thread, so that its I/O does not block the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_body_size: int = 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param max_entries: the number of responses kept in memory, the cache is disabled if not positive.
+        :param max_body_size: the size of the largest body to cache.
+        :param cache_dir: the directory of the disk tier, none if not set.
+        :param clock: the clock of the cache, which must be the wall clock for the Expires dates to apply.
+        """
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self.cache_dir = cache_dir
+        self._clock = clock
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        if self.enabled and cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        """Check whether the cache is enabled."""
+        return self.max_entries > 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Get the statistics of the cache."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+    async def lookup(self, url: str, headers: Optional[Mapping[str, str]]) -> Tuple[Optional[StoredResponse], bool]:
+        """
+        Look up the response to a GET request.
+
+        :param url: the url of the request.
+        :param headers: the headers of the request.
+        :return: the stored response, if any, and whether it is fresh.
+        """
+        headers = headers or {}
+        directives = parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-store" in directives:
+            return None, False
+        entry = await self._get(url)
+        if entry is None or any(headers.get(name) != value for name, value in entry.vary.items()):
+            self.misses += 1
+            return None, False
+        now = self._clock()
+        if "no-cache" not in directives and entry.is_fresh(now):
+            self.hits += 1
+            return entry.with_age(now), True
+        return entry, False
+
+    @staticmethod
+    def conditional_headers(entry: StoredResponse) -> Dict[str, str]:
+        """Get the headers revalidating a stored response."""
+        headers = {}
+        if "ETag" in entry.headers:
+            headers["If-None-Match"] = entry.headers["ETag"]
+        if "Last-Modified" in entry.headers:
+            headers["If-Modified-Since"] = entry.headers["Last-Modified"]
+        return headers
+
+    async def store(self, url: str, request_headers: Optional[Mapping[str, str]], response: StoredResponse) -> None:
+        """
+        Store the response to a GET request, if it is cacheable.
+
+        :param url: the url of the request.
+        :param request_headers: the headers of the request.
+        :param response: the response.
+        """
+        request_headers = request_headers or {}
+        response_directives = parse_cache_control(response.headers.get("Cache-Control", ""))
+        vary = [name.strip() for name in response.headers.get("Vary", "").split(",") if name.strip()]
+        if (
+            response.status not in CACHEABLE_STATUSES
+            or response.body_path is not None
+            or len(response.body) > self.max_body_size
+            or "no-store" in response_directives
+            or "no-store" in parse_cache_control(request_headers.get("Cache-Control", ""))
+            or "*" in vary
+        ):
+            await self.invalidate(url)
+            return
+        now = self._clock()
+        response.stored_at = now
+        response.expires_at = self._expires_at(response, response_directives, now)
+        has_validator = "ETag" in response.headers or "Last-Modified" in response.headers
+        if response.expires_at <= now and not has_validator:
+            # neither usable without revalidation, nor revalidatable
+            await self.invalidate(url)
+            return
+        response.vary = {name: request_headers.get(name) for name in vary}
+        await self._put(url, response)
+
+    async def refresh(self, url: str, entry: StoredResponse, not_modified_headers: CIMultiDictProxy) -> StoredResponse:
+        """
+        Refresh a stored response which the server validated with a 304.
+
+        :param url: the url of the request.
+        :param entry: the stored response.
+        :param not_modified_headers: the headers of the 304 response.
+        :return: the refreshed response.
+        """
+        self.revalidations += 1
+        headers = CIMultiDict(entry.headers)
+        for name in {header.lower() for header in not_modified_headers if header.lower() not in BODY_HEADERS}:
+            headers.popall(name, None)
+            headers.extend((name, value) for value in not_modified_headers.getall(name))
+        now = self._clock()
+        refreshed = StoredResponse(entry.status, entry.reason, headers, entry.body, now, 0.0, entry.vary)
+        refreshed.expires_at = self._expires_at(refreshed, parse_cache_control(headers.get("Cache-Control", "")), now)
+        await self._put(url, refreshed)
+        return refreshed
+
+    async def invalidate(self, url: str) -> None:
+        """Remove the response stored for a url."""
+        self._entries.pop(url, None)
+        if self.cache_dir is not None:
+            await self._run_on_disk(self._remove, url)
+
+    def close(self) -> None:
+        """Shut down the thread of the disk tier."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @staticmethod
+    def _expires_at(response: StoredResponse, directives: Dict[str, Optional[str]], now: float) -> float:
+        """Get the time a response becomes stale, from its Cache-Control or Expires headers."""
+        if "no-cache" in directives:
+            return now
+        age = _int(response.headers.get("Age"))
+        if "max-age" in directives:
+            return now + _int(directives["max-age"]) - age
+        expires = parse_http_date(response.headers.get("Expires"))
+        if expires is not None:
+            date = parse_http_date(response.headers.get("Date")) or now
+            return now + expires - date - age
+        return now
+
+    def _paths(self, url: str) -> List[str]:
+        """Get the paths of the metadata and of the body of a url in the disk tier."""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        cache_dir = str(self.cache_dir)
+        return [os.path.join(cache_dir, f"{key}.json"), os.path.join(cache_dir, f"{key}.body")]
+
+    async def _run_on_disk(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run an operation on the disk tier in its thread, which is a single one so that they run in order."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="http_client_cache")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _get(self, url: str) -> Optional[StoredResponse]:
+        """Get the response stored for a url, promoting it from the disk tier if needed."""
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+            return entry
+        if self.cache_dir is None:
+            return None
+        entry = await self._run_on_disk(self._read, url)
+        if entry is not None:
+            self._remember(url, entry)
+        return entry
+
+    async def _put(self, url: str, response: StoredResponse) -> None:
+        """Store a response in both tiers."""
+        self._remember(url, response)
+        if self.cache_dir is not None:
+            await self._run_on_disk(self._write, url, response)
+
+    def _read(self, url: str) -> Optional[StoredResponse]:
+        """Read the response stored for a url in the disk tier."""
+        metadata_path, body_path = self._paths(url)
+        try:
+            with open(metadata_path, encoding="utf-8") as metadata_file:
+                metadata = json.load(metadata_file)
+            with open(body_path, "rb") as body_file:
+                body = body_file.read()
+        except (OSError, ValueError):
+            return None
+        return StoredResponse.from_json(metadata, body)
+
+    def _write(self, url: str, response: StoredResponse) -> None:
+        """Write a response to the disk tier."""
+        metadata_path, body_path = self._paths(url)
+        for path, content in ((body_path, response.body), (metadata_path, json.dumps(response.to_json()).encode())):
+            # written to a temporary file first, so that readers never see a partial entry
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as temporary_file:
+                temporary_file.write(content)
+            os.replace(temporary_file.name, path)
+
+    def _remove(self, url: str) -> None:
+        """Remove the response stored for a url from the disk tier."""
+        for path in self._paths(url):
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+    def _remember(self, url: str, response: StoredResponse) -> None:
+        """Keep a response in the memory tier, evicting the least recently used ones."""
+        self._entries[url] = response
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Record and replay of the requests of the http client, for offline benchmarks and tests."""
+
+import json
+import base64
+import random
+import asyncio
+import hashlib
+from typing import IO, Dict, List, Tuple, Optional
+from dataclasses import field, dataclass
+
+from multidict import CIMultiDict
+
+from packages.eightballer.connections.http_client.cache import StoredResponse
+
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+TRANSPORT_MODES = (LIVE, RECORD, REPLAY)
+
+RequestKey = Tuple[str, str, str]
+
+
+class CassetteMiss(KeyError):
+    """A request without any recorded response is replayed."""
+
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> RequestKey:
+    """
+    Get the key a request is recorded and replayed under.
+
+    :param method: the method of the request.
+    :param url: the url of the request.
+    :param body: the body of the request.
+    :return: the key.
+    """
+    return method.upper(), url, hashlib.sha256(body or b"").hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class Interaction:
+    """A request and its recorded response, one line of a cassette."""
+
+    method: str
+    url: str
+    body_hash: str
+    status: int
+    reason: Optional[str]
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    body: bytes = b""
+    latency: float = 0.0
+
+    @property
+    def key(self) -> RequestKey:
+        """Get the key of the request."""
+        return self.method, self.url, self.body_hash
+
+    def to_line(self) -> str:
+        """Get the line of the interaction in a cassette."""
+        return json.dumps(
+            [
+                self.method,
+                self.url,
+                self.body_hash,
+                self.status,
+                self.reason,
+                self.headers,
+                base64.b64encode(self.body).decode("ascii"),
+                round(self.latency, 6),
+            ],
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_line(cls, line: str) -> "Interaction":
+        """Get an interaction from its line in a cassette."""
+        method, url, body_hash, status, reason, headers, body, latency = json.loads(line)
+        return cls(
+            method,
+            url,
+            body_hash,
+            status,
+            reason,
+            [tuple(header) for header in headers],
+            base64.b64decode(body),
+            latency,
+        )
+
+
+class Cassette:
+    """
+    Record the requests of the http client and their responses to a file, then replay them without any network.
+
+    A cassette is a JSON line per interaction. When replaying, the responses of each request are indexed in memory
+    and served in the order they were recorded, starting over once they are all used, after their recorded latency
+    or a fixed one. Errors can be injected at a given rate to benchmark the retries and the skills under failures.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = REPLAY,
+        latency: Optional[float] = None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the cassette.
+
+        :param path: the path of the cassette file.
+        :param mode: either record or replay.
+        :param latency: the latency of the replayed responses, their recorded latency if None.
+        :param error_rate: the share of the replayed requests answered with an error instead.
+        :param error_status: the status of the injected errors.
+        :param seed: the seed of the error injection, for reproducible runs.
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Cassette mode must be one of {RECORD!r} or {REPLAY!r}, got {mode!r}.")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._index: Dict[RequestKey, List[Interaction]] = {}
+        self._cursors: Dict[RequestKey, int] = {}
+        self._file: Optional[IO[str]] = None
+        self.replayed = 0
+        self.injected_errors = 0
+
+    def open(self) -> None:
+        """Load the cassette to replay, or open it to record."""
+        if self.mode == RECORD:
+            self._file = open(self.path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+            return
+        with open(self.path, encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    interaction = Interaction.from_line(line)
+                    self._index.setdefault(interaction.key, []).append(interaction)
+
+    def close(self) -> None:
+        """Close the cassette being recorded."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(
+        self, method: str, url: str, request_body: Optional[bytes], response: StoredResponse, latency: float
+    ) -> None:
+        """
+        Record the response to a request.
+
+        :param method: the method of the request.
+        :param url: the url of the request.
+        :param request_body: the body of the request.
+        :param response: the response, read.
+        :param latency: the seconds the response took.
+        """
+        if self._file is None:
+            raise ValueError("Cassette is not open for recording.")
+        body = response.body
+        if response.body_path is not None:
+            with open(response.body_path, "rb") as body_file:
+                body = body_file.read()
+        interaction = Interaction(
+            *request_key(method, url, request_body),
+            response.status,
+            response.reason,
+            list(response.headers.items()),
+            body,
+            latency,
+        )
+        self._file.write(interaction.to_line() + "\n")
+        self._file.flush()
+
+    async def replay(self, method: str, url: str, request_body: Optional[bytes]) -> StoredResponse:
+        """
+        Replay the response to a request.
+
+        :param method: the method of the request.
+        :param url: the url of the request.
+        :param request_body: the body of the request.
+        :return: the next recorded response to the request, or an injected error.
+        """
+        key = request_key(method, url, request_body)
+        interactions = self._index.get(key)
+        if not interactions:
+            raise CassetteMiss(f"No recorded response to {method.upper()} {url} in {self.path}.")
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = (cursor + 1) % len(interactions)
+        interaction = interactions[cursor]
+        await asyncio.sleep(interaction.latency if self.latency is None else self.latency)
+        self.replayed += 1
+        if self.error_rate > 0 and self._rng.random() < self.error_rate:
+            self.injected_errors += 1
+            return StoredResponse(self.error_status, "Injected error", {}, b"")
+        return StoredResponse(
+            interaction.status, interaction.reason, CIMultiDict(interaction.headers), interaction.body
+        )
@@ -19,13 +19,16 @@
 # ------------------------------------------------------------------------------
 """HTTP client connection and channel."""
 
+import os
 import ssl
-import email
+import time
 import asyncio
 import logging
-from typing import Any, Set, Tuple, Optional, cast
+import tempfile
+from typing import Any, Set, Dict, List, Tuple, BinaryIO, Mapping, Optional, cast
 from asyncio import CancelledError
 from traceback import format_exc
+from urllib.parse import urlparse
 from asyncio.tasks import Task
 from asyncio.events import AbstractEventLoop
 
@@ -45,12 +48,39 @@ from packages.eightballer.protocols.http.dialogues import (
     HttpDialogue as BaseHttpDialogue,
     HttpDialogues as BaseHttpDialogues,
 )
+from packages.eightballer.connections.http_client.cache import NOT_MODIFIED, ClientCache, StoredResponse
+from packages.eightballer.connections.http_client.hedging import HedgingPolicy
+from packages.eightballer.connections.http_client.timeouts import RequestTimeouts, strip_reserved_headers
+from packages.eightballer.connections.http_client.cassette import (
+    LIVE,
+    RECORD,
+    REPLAY,
+    TRANSPORT_MODES,
+    Cassette,
+)
+from packages.eightballer.connections.http_client.retry import (
+    RetryPolicy,
+    is_idempotent,
+    parse_retry_after,
+    is_retryable_status,
+)
+from packages.eightballer.connections.http_common.headers import (
+    decode_headers,
+    encode_headers,
+)
+from packages.eightballer.connections.http_common.stateless_dialogues import StatelessDialoguesMixin
+from packages.eightballer.connections.http_client.scheduler import HostScheduler, parse_urgency
 
 
 SUCCESS = 200
 NOT_FOUND = 404
 REQUEST_TIMEOUT = 408
 SERVER_ERROR = 500
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE"})
+BODY_CHUNK_SIZE = 64 * 1024
+# the header carrying the path of a response body that was spooled to a file, instead of the body itself
+SPOOLED_BODY_HEADER = "X-Spooled-Body-Path"
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since", "If-Match", "If-Unmodified-Since", "If-Range")
 PUBLIC_ID = PublicId.from_str("eightballer/http_client:0.1.0")
 
 _default_logger = logging.getLogger("aea.packages.eightballer.connections.http_client")
@@ -68,20 +98,22 @@ def headers_to_string(headers: CIMultiDictProxy) -> str:
 
     :return: str
     """
-    msg = email.message.Message()
-    for name, value in headers.items():
-        msg.add_header(name, value)
-    return msg.as_string()
+    return encode_headers(headers)
 
 
 HttpDialogue = BaseHttpDialogue
 
 
-class HttpDialogues(BaseHttpDialogues):
+class HttpDialogues(StatelessDialoguesMixin, BaseHttpDialogues):
     """The dialogues class keeps track of all http dialogues."""
 
-    def __init__(self) -> None:
-        """Initialize dialogues."""
+    def __init__(self, dialogue_ttl: float = 0.0, dialogue_ring_size: int = 0) -> None:
+        """
+        Initialize dialogues.
+
+        :param dialogue_ttl: the seconds after which dialogues without a response are expired, never if not positive.
+        :param dialogue_ring_size: the number of completed or expired dialogues to keep for debugging.
+        """
 
         def role_from_first_message(  # pylint: disable=unused-argument
             message: Message, receiver_address: Address
@@ -101,13 +133,31 @@ class HttpDialogues(BaseHttpDialogues):
             role_from_first_message=role_from_first_message,
             dialogue_class=HttpDialogue,
         )
+        StatelessDialoguesMixin.__init__(self, dialogue_ttl, dialogue_ring_size)
 
 
 class HTTPClientAsyncChannel:
     """A wrapper for a HTTPClient."""
 
-    DEFAULT_TIMEOUT = 300  # default timeout in seconds
+    DEFAULT_TIMEOUT = 300  # default total timeout of a request in seconds
     DEFAULT_EXCEPTION_CODE = 600  # custom code to indicate there was exception during request
+    CONNECTION_LIMIT = 100
+    CONNECTION_LIMIT_PER_HOST = 0
+    DNS_CACHE_TTL = 10
+    KEEPALIVE_TIMEOUT = 15.0
+    MAX_IN_FLIGHT_PER_HOST = 16
+    CACHE_SIZE = 0
+    CACHE_MAX_BODY_SIZE = 1024 * 1024
+    MAX_RETRIES = 0
+    RETRY_BACKOFF = 0.5
+    RETRY_MAX_BACKOFF = 30.0
+    RETRY_BUDGET = 60.0
+    HEDGE_PERCENTILE = 0.0
+    HEDGE_BUDGET = 0.05
+    HEDGE_MIN_DELAY = 0.01
+    SPOOL_THRESHOLD: Optional[int] = None
+    TRANSPORT_MODE = LIVE
+    REPLAY_ERROR_STATUS = 503
 
     def __init__(
         self,
@@ -115,6 +165,34 @@ class HTTPClientAsyncChannel:
         address: str,
         port: int,
         connection_id: PublicId,
+        dialogue_ttl: Optional[float] = None,
+        dialogue_ring_size: int = 0,
+        connection_limit: int = CONNECTION_LIMIT,
+        connection_limit_per_host: int = CONNECTION_LIMIT_PER_HOST,
+        dns_cache_ttl: Optional[int] = DNS_CACHE_TTL,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        max_in_flight_per_host: int = MAX_IN_FLIGHT_PER_HOST,
+        cache_size: int = CACHE_SIZE,
+        cache_dir: Optional[str] = None,
+        cache_max_body_size: int = CACHE_MAX_BODY_SIZE,
+        max_retries: int = MAX_RETRIES,
+        retry_backoff: float = RETRY_BACKOFF,
+        retry_max_backoff: float = RETRY_MAX_BACKOFF,
+        retry_budget: float = RETRY_BUDGET,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_budget: float = HEDGE_BUDGET,
+        hedge_min_delay: float = HEDGE_MIN_DELAY,
+        spool_threshold: Optional[int] = SPOOL_THRESHOLD,
+        spool_dir: Optional[str] = None,
+        transport_mode: str = TRANSPORT_MODE,
+        cassette_path: Optional[str] = None,
+        replay_latency: Optional[float] = None,
+        replay_error_rate: float = 0.0,
+        replay_error_status: int = REPLAY_ERROR_STATUS,
+        replay_seed: Optional[int] = None,
+        request_timeout: Optional[float] = DEFAULT_TIMEOUT,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
     ):
         """
         Initialize an http client channel.
@@ -123,12 +201,64 @@ class HTTPClientAsyncChannel:
         :param address: server hostname / IP address
         :param port: server port number
         :param connection_id: the id of the connection
+        :param dialogue_ttl: the seconds after which unanswered dialogues expire, from the request timeout if None.
+        :param dialogue_ring_size: the number of completed or expired dialogues to keep for debugging.
+        :param connection_limit: the maximum number of pooled connections, unbounded if 0.
+        :param connection_limit_per_host: the maximum number of pooled connections to a single host, unbounded if 0.
+        :param dns_cache_ttl: the seconds the resolved host names are cached for, forever if None.
+        :param keepalive_timeout: the seconds idle connections are kept open in the pool.
+        :param max_in_flight_per_host: the maximum number of requests in flight to a host, unbounded if not positive.
+        :param cache_size: the number of responses cached in memory, the cache is disabled if 0.
+        :param cache_dir: the directory the cached responses are also kept in across restarts, none if not set.
+        :param cache_max_body_size: the size of the largest response body to cache.
+        :param max_retries: the number of retries of the transient failures of a request, none if 0.
+        :param retry_backoff: the upper bound of the delay before the first retry, doubled on each retry.
+        :param retry_max_backoff: the upper bound of the delay before any retry.
+        :param retry_budget: the seconds a request can spend waiting for its retries in total.
+        :param hedge_percentile: the percentile of the latencies of a host after which a GET is hedged, none if 0.
+        :param hedge_budget: the share of the requests which can be hedged.
+        :param hedge_min_delay: the smallest delay before a hedge.
+        :param spool_threshold: the size above which response bodies are spooled to a temporary file, never if None.
+        :param spool_dir: the directory of the spooled response bodies, the temporary directory if not set.
+        :param transport_mode: live, record to record the responses to the cassette, or replay to serve them from it.
+        :param cassette_path: the path of the cassette, required to record or replay.
+        :param replay_latency: the latency of the replayed responses, their recorded latency if None.
+        :param replay_error_rate: the share of the replayed requests answered with an injected error.
+        :param replay_error_status: the status of the injected errors.
+        :param replay_seed: the seed of the error injection, for reproducible runs.
+        :param request_timeout: the total seconds of a request, retries included, unbounded if None.
+        :param connect_timeout: the seconds to connect to the server on each attempt, unbounded if None.
+        :param read_timeout: the seconds between two reads from the server on each attempt, unbounded if None.
         """
         self.agent_address = agent_address
         self.address = address
         self.port = port
         self.connection_id = connection_id
-        self._dialogues = HttpDialogues()
+        if dialogue_ttl is None:
+            # every request gets a response within its timeout, so only the dialogues whose response was lost expire
+            dialogue_ttl = 0.0 if request_timeout is None else request_timeout + retry_budget
+        self._dialogues = HttpDialogues(dialogue_ttl, dialogue_ring_size)
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.scheduler = HostScheduler(max_in_flight_per_host)
+        self.cache = ClientCache(cache_size, cache_max_body_size, cache_dir)
+        self.retry_policy = RetryPolicy(max_retries, retry_backoff, retry_max_backoff, retry_budget)
+        self.hedging = HedgingPolicy(hedge_percentile, hedge_budget, hedge_min_delay)
+        self.spool_threshold = spool_threshold
+        self.spool_dir = spool_dir
+        if transport_mode not in TRANSPORT_MODES:
+            raise ValueError(f"transport_mode must be one of {TRANSPORT_MODES}, got {transport_mode!r}.")
+        self.timeouts = RequestTimeouts(request_timeout, connect_timeout, read_timeout)
+        self.cassette: Optional[Cassette] = None
+        if transport_mode != LIVE:
+            if cassette_path is None:
+                raise ValueError(f"cassette_path must be set to {transport_mode}.")
+            self.cassette = Cassette(
+                cassette_path, transport_mode, replay_latency, replay_error_rate, replay_error_status, replay_seed
+            )
 
         self._in_queue = None  # type: Optional[asyncio.Queue]  # pragma: no cover
         self._loop = None  # type: Optional[asyncio.AbstractEventLoop]  # pragma: no cover
@@ -146,6 +276,18 @@ class HTTPClientAsyncChannel:
         """
         self._loop = loop
         self._in_queue = asyncio.Queue()
+        # one pooled session per channel, so that requests reuse the connections, resolved hosts and TLS sessions
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+            ssl=ssl_context,
+        )
+        # cookies are not shared across requests, as with a session per request
+        self._session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        if self.cassette is not None:
+            self.cassette.open()
         self.is_stopped = False
 
     def _get_message_and_dialogue(self, envelope: Envelope) -> Tuple[HttpMessage, Optional[HttpDialogue]]:
@@ -175,58 +317,257 @@ class HTTPClientAsyncChannel:
             self.logger.warning("Could not create dialogue for message={}".format(request_http_message))
             return
 
+        # the request is given up once its round is over, instead of holding a task and a socket uselessly
+        remaining = self._timeouts(request_http_message).remaining(time.time())
+        resp: Optional[StoredResponse] = None
         try:
-            resp = await asyncio.wait_for(
-                self._perform_http_request(request_http_message),
-                timeout=self.DEFAULT_TIMEOUT,
-            )
-            envelope = self.to_envelope(
-                request_http_message,
-                status_code=resp.status,
-                headers=resp.headers,
-                status_text=resp.reason,
-                body=resp._body if resp._body is not None else b"",  # noqa  # noqa
-                dialogue=dialogue,
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError("The deadline of the request passed before it was sent.")
+            resp = await asyncio.wait_for(self._fetch(request_http_message), timeout=remaining)
+            headers = resp.headers
+            if resp.body_path is not None:
+                # the skill reads the body from the file, and removes it once done
+                headers = CIMultiDictProxy(CIMultiDict(headers, **{SPOOLED_BODY_HEADER: resp.body_path}))
+            response: Dict[str, Any] = {
+                "status_code": resp.status,
+                "headers": headers,
+                "status_text": resp.reason,
+                "body": resp.body,
+            }
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Timed out during http call: {request_http_message.method} {request_http_message.url}"
             )
+            response = {
+                "status_code": REQUEST_TIMEOUT,
+                "headers": CIMultiDictProxy(CIMultiDict()),
+                "status_text": "HTTPConnection request timed out.",
+                "body": b"",
+            }
         except Exception:  # noqa
             self.logger.exception(
                 f"Exception raised during http call: {request_http_message.method} {request_http_message.url}"
             )
-            envelope = self.to_envelope(
-                request_http_message,
-                status_code=self.DEFAULT_EXCEPTION_CODE,
-                headers=CIMultiDictProxy(CIMultiDict()),
-                status_text="HTTPConnection request error.",
-                body=format_exc().encode("utf-8"),
-                dialogue=dialogue,
+            response = {
+                "status_code": self.DEFAULT_EXCEPTION_CODE,
+                "headers": CIMultiDictProxy(CIMultiDict()),
+                "status_text": "HTTPConnection request error.",
+                "body": format_exc().encode("utf-8"),
+            }
+
+        if self._dialogues.is_expired(dialogue):
+            # the storage no longer holds the dialogue, so the skill gave up on its response
+            self.logger.warning(
+                f"Dropped the response of an expired dialogue: {request_http_message.method} {request_http_message.url}"
             )
-
+            if resp is not None:
+                # no skill will read the spooled body
+                resp.cleanup()
+            return
+        envelope = self.to_envelope(request_http_message, dialogue=dialogue, **response)
         if self._in_queue is not None:
             await self._in_queue.put(envelope)
 
-    async def _perform_http_request(self, request_http_message: HttpMessage) -> ClientResponse:
+    async def _fetch(self, request_http_message: HttpMessage) -> StoredResponse:
+        """
+        Get the response to a request, from the cache while it is fresh and from the network otherwise.
+
+        Stale cached responses are revalidated, so that only the changed resources are downloaded again.
+
+        :param request_http_message: HttpMessage with http request constructed.
+
+        :return: the response.
+        """
+        if not self.cache.enabled:
+            return await self._send(request_http_message)
+        method = request_http_message.method.upper()
+        url = request_http_message.url
+        headers = self._request_headers(request_http_message) or CIMultiDict()
+        if method != "GET" or any(name in headers for name in CONDITIONAL_HEADERS):
+            # the conditional requests of the skills get the response of the server, 304 included
+            resp = await self._send(request_http_message)
+            if method not in SAFE_METHODS and resp.status < 400:
+                await self.cache.invalidate(url)
+            return resp
+
+        entry, fresh = await self.cache.lookup(url, headers)
+        if entry is not None and fresh:
+            self.logger.debug(f"Cache hit for {url}")
+            return entry
+        validators = ClientCache.conditional_headers(entry) if entry is not None else {}
+        resp = await self._send(request_http_message, validators)
+        if entry is not None and resp.status == NOT_MODIFIED:
+            self.logger.debug(f"Cached response for {url} revalidated")
+            return await self.cache.refresh(url, entry, resp.headers)
+        await self.cache.store(url, headers, resp)
+        return resp
+
+    async def _send(
+        self, request_http_message: HttpMessage, extra_headers: Optional[Mapping[str, str]] = None
+    ) -> StoredResponse:
+        """
+        Perform http request, retrying its transient failures.
+
+        The connect errors are retried for every request, since the server never received it,
+        while the 429 and 5xx responses are only retried for the idempotent requests.
+
+        :param request_http_message: HttpMessage with http request constructed.
+        :param extra_headers: the headers added to those of the request.
+
+        :return: the response.
+        """
+        if not self.retry_policy.enabled:
+            return await self._attempt(request_http_message, extra_headers)
+        idempotent = is_idempotent(request_http_message.method, self._request_headers(request_http_message))
+        retries, waited = 0, 0.0
+        while True:
+            try:
+                resp = await self._attempt(request_http_message, extra_headers)
+            except aiohttp.ClientConnectorError as error:
+                delay = self.retry_policy.delay(retries, waited)
+                if delay is None:
+                    raise
+                failure = str(error)
+            else:
+                if not idempotent or not is_retryable_status(resp.status):
+                    return resp
+                delay = self.retry_policy.delay(retries, waited, parse_retry_after(resp.headers.get("Retry-After")))
+                if delay is None:
+                    return resp
+                failure = f"status {resp.status}"
+                resp.cleanup()
+            retries += 1
+            waited += delay
+            self.logger.warning(
+                f"Retry {retries}/{self.retry_policy.max_retries} of {request_http_message.method} "
+                f"{request_http_message.url} in {delay:.2f}s after {failure}"
+            )
+            await asyncio.sleep(delay)
+
+    async def _attempt(
+        self, request_http_message: HttpMessage, extra_headers: Optional[Mapping[str, str]] = None
+    ) -> StoredResponse:
+        """
+        Perform http request once, sending a duplicate of the slow GET requests when hedging.
+
+        Only the response which is used is recorded to the cassette, with the latency the agent waited for it.
+
+        :param request_http_message: HttpMessage with http request constructed.
+        :param extra_headers: the headers added to those of the request.
+
+        :return: the response.
+        """
+        started_at = time.monotonic()
+        if not self.hedging.enabled or request_http_message.method.upper() != "GET":
+            response = await self._perform_http_request(request_http_message, extra_headers)
+        else:
+            response = await self.hedging.run(
+                urlparse(request_http_message.url).netloc,
+                lambda: self._perform_http_request(request_http_message, extra_headers),
+                time.monotonic,
+                discard=StoredResponse.cleanup,
+            )
+        if self.cassette is not None and self.cassette.mode == RECORD:
+            self.cassette.record(
+                request_http_message.method,
+                request_http_message.url,
+                request_http_message.body,
+                response,
+                time.monotonic() - started_at,
+            )
+        return response
+
+    @staticmethod
+    def _request_headers(request_http_message: HttpMessage) -> Optional[CIMultiDict]:
+        """Get the headers of a request sent upstream, none if not set."""
+        if request_http_message.is_set("headers") and request_http_message.headers:
+            return strip_reserved_headers(decode_headers(request_http_message.headers))
+        return None
+
+    def _timeouts(self, request_http_message: HttpMessage) -> RequestTimeouts:
+        """Get the timeouts of a request, from its reserved headers or the defaults of the channel."""
+        if request_http_message.is_set("headers") and request_http_message.headers:
+            return RequestTimeouts.from_headers(decode_headers(request_http_message.headers), self.timeouts)
+        return self.timeouts
+
+    async def _read_body(self, resp: ClientResponse) -> Tuple[bytes, Optional[str]]:
+        """
+        Stream the body of a response, spooling it to a temporary file once it is larger than the spool threshold.
+
+        :param resp: the response.
+        :return: the in-memory body and the path of the spooled body, if any.
+        """
+        if self.spool_threshold is None:
+            return await resp.read(), None
+
+        chunks: List[bytes] = []
+        size = 0
+        body_file: Optional[BinaryIO] = None
+        try:
+            async for chunk in resp.content.iter_chunked(BODY_CHUNK_SIZE):
+                size += len(chunk)
+                if body_file is None and size > self.spool_threshold:
+                    body_file = cast(
+                        BinaryIO,
+                        tempfile.NamedTemporaryFile(prefix="http_client_body_", dir=self.spool_dir, delete=False),
+                    )
+                    body_file.writelines(chunks)
+                    chunks.clear()
+                if body_file is not None:
+                    body_file.write(chunk)
+                else:
+                    chunks.append(chunk)
+        except BaseException:
+            if body_file is not None:
+                body_file.close()
+                os.remove(body_file.name)
+            raise
+
+        if body_file is None:
+            return b"".join(chunks), None
+        body_file.close()
+        return b"", body_file.name
+
+    async def _perform_http_request(
+        self, request_http_message: HttpMessage, extra_headers: Optional[Mapping[str, str]] = None
+    ) -> StoredResponse:
         """
         Perform http request and return response.
 
         :param request_http_message: HttpMessage with http request constructed.
+        :param extra_headers: the headers added to those of the request, such as the cache validators.
 
-        :return: aiohttp.ClientResponse
+        :return: the response, read.
         """
+        if self._session is None:  # pragma: nocover
+            raise ValueError("Channel is not connected")
         try:
-            if request_http_message.is_set("headers") and request_http_message.headers:
-                headers: Optional[dict] = dict(email.message_from_string(request_http_message.headers).items())
-            else:
-                headers = None
-            async with aiohttp.ClientSession() as session:
-                async with session.request(
+            headers = self._request_headers(request_http_message)
+            if extra_headers:
+                headers = CIMultiDict(headers or {})
+                headers.update(extra_headers)
+            # the requests beyond the in-flight limit of their host wait for a slot, the most urgent first
+            host = urlparse(request_http_message.url).netloc
+            queue_time = await self.scheduler.acquire(host, parse_urgency(headers))
+            if queue_time:
+                self.logger.debug(f"Request to {host} queued for {queue_time:.3f}s")
+            try:
+                if self.cassette is not None and self.cassette.mode == REPLAY:
+                    return await self.cassette.replay(
+                        request_http_message.method, request_http_message.url, request_http_message.body
+                    )
+                async with self._session.request(
                     method=request_http_message.method,
                     url=request_http_message.url,
                     headers=headers,
                     data=request_http_message.body,
-                    ssl=ssl_context,
+                    timeout=self._timeouts(request_http_message).client_timeout(),
                 ) as resp:
-                    await resp.read()
-                return resp
+                    body, body_path = await self._read_body(resp)
+                response = StoredResponse(resp.status, resp.reason, resp.headers, body, body_path=body_path)
+            finally:
+                self.scheduler.release(host)
+            return response
         except Exception:  # pragma: nocover # pylint: disable=broad-except
             self.logger.exception(
                 f"Exception raised during http call: {request_http_message.method} {request_http_message.url}"
@@ -351,6 +692,12 @@ class HTTPClientAsyncChannel:
             self.is_stopped = True
 
             await self._cancel_tasks()
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+            if self.cassette is not None:
+                self.cassette.close()
+            self.cache.close()
 
 
 class HTTPClientConnection(Connection):
@@ -374,6 +721,50 @@ class HTTPClientConnection(Connection):
             host,
             port,
             connection_id=self.connection_id,
+            dialogue_ttl=self.configuration.config.get("dialogue_ttl"),
+            dialogue_ring_size=self.configuration.config.get("dialogue_ring_size", 0),
+            connection_limit=self.configuration.config.get(
+                "connection_limit", HTTPClientAsyncChannel.CONNECTION_LIMIT
+            ),
+            connection_limit_per_host=self.configuration.config.get(
+                "connection_limit_per_host", HTTPClientAsyncChannel.CONNECTION_LIMIT_PER_HOST
+            ),
+            dns_cache_ttl=self.configuration.config.get("dns_cache_ttl", HTTPClientAsyncChannel.DNS_CACHE_TTL),
+            keepalive_timeout=self.configuration.config.get(
+                "keepalive_timeout", HTTPClientAsyncChannel.KEEPALIVE_TIMEOUT
+            ),
+            max_in_flight_per_host=self.configuration.config.get(
+                "max_in_flight_per_host", HTTPClientAsyncChannel.MAX_IN_FLIGHT_PER_HOST
+            ),
+            cache_size=self.configuration.config.get("cache_size", HTTPClientAsyncChannel.CACHE_SIZE),
+            cache_dir=self.configuration.config.get("cache_dir"),
+            cache_max_body_size=self.configuration.config.get(
+                "cache_max_body_size", HTTPClientAsyncChannel.CACHE_MAX_BODY_SIZE
+            ),
+            max_retries=self.configuration.config.get("max_retries", HTTPClientAsyncChannel.MAX_RETRIES),
+            retry_backoff=self.configuration.config.get("retry_backoff", HTTPClientAsyncChannel.RETRY_BACKOFF),
+            retry_max_backoff=self.configuration.config.get(
+                "retry_max_backoff", HTTPClientAsyncChannel.RETRY_MAX_BACKOFF
+            ),
+            retry_budget=self.configuration.config.get("retry_budget", HTTPClientAsyncChannel.RETRY_BUDGET),
+            hedge_percentile=self.configuration.config.get(
+                "hedge_percentile", HTTPClientAsyncChannel.HEDGE_PERCENTILE
+            ),
+            hedge_budget=self.configuration.config.get("hedge_budget", HTTPClientAsyncChannel.HEDGE_BUDGET),
+            hedge_min_delay=self.configuration.config.get("hedge_min_delay", HTTPClientAsyncChannel.HEDGE_MIN_DELAY),
+            spool_threshold=self.configuration.config.get("spool_threshold", HTTPClientAsyncChannel.SPOOL_THRESHOLD),
+            spool_dir=self.configuration.config.get("spool_dir"),
+            transport_mode=self.configuration.config.get("transport_mode", HTTPClientAsyncChannel.TRANSPORT_MODE),
+            cassette_path=self.configuration.config.get("cassette_path"),
+            replay_latency=self.configuration.config.get("replay_latency"),
+            replay_error_rate=self.configuration.config.get("replay_error_rate", 0.0),
+            replay_error_status=self.configuration.config.get(
+                "replay_error_status", HTTPClientAsyncChannel.REPLAY_ERROR_STATUS
+            ),
+            replay_seed=self.configuration.config.get("replay_seed"),
+            request_timeout=self.configuration.config.get("request_timeout", HTTPClientAsyncChannel.DEFAULT_TIMEOUT),
+            connect_timeout=self.configuration.config.get("connect_timeout"),
+            read_timeout=self.configuration.config.get("read_timeout"),
         )
 
     async def connect(self) -> None:
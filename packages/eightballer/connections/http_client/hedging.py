@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Hedging of the slow requests of the http client."""
+
+import math
+import asyncio
+from typing import Any, Set, Dict, Deque, Union, Callable, Optional, Awaitable
+from collections import deque
+
+
+class HedgingPolicy:
+    """
+    Send a duplicate of a request which is slower than a percentile of the latencies of its host.
+
+    The first of the two responses is used and the other request is cancelled, or discarded if it completed too.
+    Each request adds a share
+    of a hedge to the budget, and each hedge spends a whole one, which caps the extra load at that share.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        budget: float = 0.05,
+        min_delay: float = 0.01,
+        window: int = 1000,
+        min_samples: int = 20,
+        max_tokens: float = 10.0,
+    ) -> None:
+        """
+        Initialize the policy.
+
+        :param percentile: the percentile of the latencies of a host after which a request is hedged, none if 0.
+        :param budget: the share of the requests which can be hedged.
+        :param min_delay: the smallest delay before a hedge.
+        :param window: the number of latencies of a host the percentile is computed over.
+        :param min_samples: the number of latencies of a host needed before hedging its requests.
+        :param max_tokens: the number of hedges which can be saved up for a burst of slow requests.
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Check whether the requests are hedged."""
+        return self.percentile > 0
+
+    @property
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Get the statistics of the hedging."""
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "tokens": self._tokens,
+        }
+
+    def record(self, host: str, latency: float) -> None:
+        """Record the latency of a successful request to a host."""
+        self._latencies.setdefault(host, deque(maxlen=self.window)).append(latency)
+
+    def delay(self, host: str) -> Optional[float]:
+        """
+        Get the delay after which a request to a host is hedged.
+
+        :param host: the host of the request.
+        :return: the delay, None if not enough latencies of the host are known yet.
+        """
+        latencies = self._latencies.get(host)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(max(math.ceil(self.percentile / 100 * len(ordered)) - 1, 0), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def deposit(self) -> None:
+        """Add the share of a hedge of a new request to the budget."""
+        self.requests += 1
+        self._tokens = min(self._tokens + self.budget, self.max_tokens)
+
+    def spend(self) -> bool:
+        """Spend a hedge of the budget, if any is left."""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.hedges += 1
+        return True
+
+    async def run(
+        self,
+        host: str,
+        request: Callable[[], Awaitable[Any]],
+        clock: Callable[[], float],
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Run a request, hedging it if it is slow.
+
+        :param host: the host of the request.
+        :param request: the factory of the request, called once more for the hedge.
+        :param clock: the clock the latencies are measured with.
+        :param discard: the callback releasing the result of a request which completed but is not used, if any.
+        :return: the result of the first request to succeed.
+        """
+        self.deposit()
+
+        async def timed() -> Any:
+            started_at = clock()
+            result = await request()
+            self.record(host, clock() - started_at)
+            return result
+
+        primary = asyncio.ensure_future(timed())
+        pending: Set[asyncio.Future] = {primary}
+        try:
+            delay = self.delay(host)
+            if delay is not None:
+                await asyncio.wait(pending, timeout=delay)
+                if not primary.done() and self.spend():
+                    pending.add(asyncio.ensure_future(timed()))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # the primary wins a tie, and the result of the other request is discarded
+                succeeded = sorted(
+                    (task for task in done if task.exception() is None), key=lambda task: task is not primary
+                )
+                if succeeded:
+                    winner, *losers = succeeded
+                    if winner is not primary:
+                        self.hedges_won += 1
+                    if discard is not None:
+                        for task in losers:
+                            discard(task.result())
+                    return winner.result()
+                error = error or next(task.exception() for task in done)
+            raise error  # type: ignore  # every request failed
+        finally:
+            for task in pending:
+                task.cancel()
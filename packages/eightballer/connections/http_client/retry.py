@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Retries of the transient failures of the http client requests."""
+
+import time
+import random
+from typing import Mapping, Callable, Optional
+
+from packages.eightballer.connections.http_client.cache import parse_http_date
+
+
+# the methods which can be sent again without side effects, as defined by RFC 7231
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE"})
+TOO_MANY_REQUESTS = 429
+# the server errors which another attempt will not fix
+PERMANENT_SERVER_ERRORS = frozenset({501, 505})
+
+
+def is_idempotent(method: str, headers: Optional[Mapping[str, str]]) -> bool:
+    """
+    Check whether a request can be retried after the server received it.
+
+    :param method: the method of the request.
+    :param headers: the headers of the request, where an Idempotency-Key makes any method idempotent.
+    :return: whether the request is idempotent.
+    """
+    return method.upper() in IDEMPOTENT_METHODS or bool(headers and "Idempotency-Key" in headers)
+
+
+def is_retryable_status(status: int) -> bool:
+    """Check whether a response status is a transient failure."""
+    return status == TOO_MANY_REQUESTS or (status >= 500 and status not in PERMANENT_SERVER_ERRORS)
+
+
+def parse_retry_after(value: Optional[str], clock: Callable[[], float] = time.time) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+
+    :param value: the header, either seconds or an http date.
+    :param clock: the wall clock the http dates are relative to.
+    :return: the seconds to wait, None if missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    date = parse_http_date(value)
+    return None if date is None else max(date - clock(), 0.0)
+
+
+class RetryPolicy:  # pylint: disable=too-few-public-methods
+    """
+    Exponential backoff with full jitter, bounded by a number of retries and a time budget per request.
+
+    A Retry-After of the server replaces the backoff, and the request is not retried if it is beyond the budget.
+    """
+
+    def __init__(
+        self,
+        max_retries: int,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        budget: float = 60.0,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Initialize the policy.
+
+        :param max_retries: the number of retries of a request, retries are disabled if not positive.
+        :param backoff: the upper bound of the delay before the first retry, doubled on each retry.
+        :param max_backoff: the upper bound of the delay before any retry.
+        :param budget: the seconds a request can spend waiting for its retries in total.
+        :param rng: the source of the jitter, in [0, 1).
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self._rng = rng
+
+    @property
+    def enabled(self) -> bool:
+        """Check whether the requests are retried."""
+        return self.max_retries > 0
+
+    def delay(self, retries: int, waited: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Get the delay before the next retry of a request.
+
+        :param retries: the number of retries of the request so far.
+        :param waited: the seconds the request already waited for its retries.
+        :param retry_after: the delay asked by the server, if any.
+        :return: the delay, None if the request is out of retries or of budget.
+        """
+        if retries >= self.max_retries:
+            return None
+        if retry_after is None:
+            retry_after = self._rng() * min(self.max_backoff, self.backoff * 2**retries)
+        if waited + retry_after > self.budget:
+            return None
+        return retry_after
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Per-host scheduling of the requests of the http client."""
+
+import time
+import heapq
+import asyncio
+import itertools
+from typing import Dict, List, Tuple, Union, Mapping, Callable, Optional
+
+
+# the urgency of the requests without a Priority header, as in RFC 9218
+DEFAULT_URGENCY = 3
+MIN_URGENCY = 0
+MAX_URGENCY = 7
+
+
+def parse_urgency(headers: Optional[Mapping[str, str]]) -> int:
+    """
+    Get the urgency of a request from its Priority header, as defined by RFC 9218.
+
+    :param headers: the headers of the request.
+    :return: the urgency, from 0 for the most urgent to 7, the default urgency if not given or malformed.
+    """
+    priority = headers.get("Priority") if headers else None
+    if not priority:
+        return DEFAULT_URGENCY
+    for parameter in priority.split(","):
+        name, _, value = parameter.strip().partition("=")
+        if name.strip().lower() == "u":
+            try:
+                urgency = int(value.strip())
+            except ValueError:
+                return DEFAULT_URGENCY
+            return min(max(urgency, MIN_URGENCY), MAX_URGENCY)
+    return DEFAULT_URGENCY
+
+
+class HostQueue:  # pylint: disable=too-few-public-methods
+    """The requests in flight and waiting for a host."""
+
+    def __init__(self) -> None:
+        """Initialize the queue."""
+        self.in_flight = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.requests = 0
+        self.queued_requests = 0
+        self.total_queue_time = 0.0
+        self.max_queue_time = 0.0
+
+
+class HostScheduler:
+    """
+    Limit the requests in flight to each host, queueing the others by urgency then in arrival order.
+
+    A burst of requests to one host is spread over the in-flight limit instead of opening as many connections,
+    while the requests to the other hosts are not held back.
+    """
+
+    def __init__(self, max_in_flight_per_host: int, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initialize the scheduler.
+
+        :param max_in_flight_per_host: the maximum number of requests in flight to a host, unbounded if not positive.
+        :param clock: the clock the queue time is measured with.
+        """
+        self.max_in_flight_per_host = max_in_flight_per_host
+        self._clock = clock
+        self._hosts: Dict[str, HostQueue] = {}
+        self._sequence = itertools.count()
+
+    def _has_capacity(self, queue: HostQueue) -> bool:
+        """Check whether another request can be sent to a host."""
+        return self.max_in_flight_per_host <= 0 or queue.in_flight < self.max_in_flight_per_host
+
+    async def acquire(self, host: str, urgency: int = DEFAULT_URGENCY) -> float:
+        """
+        Wait for a request to a host to be allowed in flight.
+
+        :param host: the host of the request.
+        :param urgency: the urgency of the request, the lower the sooner.
+        :return: the seconds the request was queued for.
+        """
+        queue = self._hosts.setdefault(host, HostQueue())
+        queue.requests += 1
+        if self._has_capacity(queue):
+            # the slots are handed over as soon as they are released, so any request left waiting was cancelled
+            queue.waiters.clear()
+            queue.in_flight += 1
+            return 0.0
+
+        started_at = self._clock()
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.waiters, (urgency, next(self._sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just before the cancellation, pass it on
+                self.release(host)
+            raise
+        queue_time = self._clock() - started_at
+        queue.queued_requests += 1
+        queue.total_queue_time += queue_time
+        queue.max_queue_time = max(queue.max_queue_time, queue_time)
+        return queue_time
+
+    def release(self, host: str) -> None:
+        """
+        Release the slot of a request to a host which is done, handing it over to the most urgent waiting request.
+
+        :param host: the host of the request.
+        """
+        queue = self._hosts[host]
+        queue.in_flight -= 1
+        while queue.waiters and self._has_capacity(queue):
+            _, _, waiter = heapq.heappop(queue.waiters)
+            if waiter.done():
+                # cancelled while waiting
+                continue
+            queue.in_flight += 1
+            waiter.set_result(None)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get the in-flight and queue-time metrics of each host."""
+        return {
+            host: {
+                "in_flight": queue.in_flight,
+                "waiting": sum(not waiter.done() for _, _, waiter in queue.waiters),
+                "requests": queue.requests,
+                "queued_requests": queue.queued_requests,
+                "mean_queue_time": queue.total_queue_time / queue.queued_requests if queue.queued_requests else 0.0,
+                "max_queue_time": queue.max_queue_time,
+            }
+            for host, queue in self._hosts.items()
+        }
@@ -0,0 +1,207 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the response cache of the http client."""
+
+import asyncio
+from typing import Dict, List
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_client.cache import ClientCache, StoredResponse
+from packages.eightballer.connections.http_client.connection import (
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+URL = "https://api.example.com/api/search"
+NOW = 1_700_000_000.0
+
+
+class Clock:  # pylint: disable=too-few-public-methods
+    """A clock moved by hand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = NOW
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+def response(headers: Dict[str, str], status: int = 200, body: bytes = b"casts") -> StoredResponse:
+    """Get a response of the server."""
+    return StoredResponse(status, "OK", headers, body)
+
+
+@pytest.mark.asyncio
+async def test_fresh_for_max_age_then_stale() -> None:
+    """Test that a response is served while fresh, with its age, then needs revalidation."""
+    clock = Clock()
+    cache = ClientCache(8, clock=clock)
+    await cache.store(URL, {}, response({"Cache-Control": "max-age=60", "ETag": '"v1"'}))
+
+    clock.now += 30
+    entry, fresh = await cache.lookup(URL, {})
+    assert fresh and entry is not None
+    assert (entry.body, entry.headers["Age"]) == (b"casts", "30")
+
+    clock.now += 31
+    entry, fresh = await cache.lookup(URL, {})
+    assert not fresh and entry is not None
+    assert ClientCache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+    assert cache.stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fresh_until_expires() -> None:
+    """Test that the Expires header is relative to the Date of the response."""
+    clock = Clock()
+    cache = ClientCache(8, clock=clock)
+    headers = {"Date": "Tue, 14 Nov 2023 22:13:20 GMT", "Expires": "Tue, 14 Nov 2023 22:14:20 GMT"}
+    await cache.store(URL, {}, response(headers))
+    clock.now += 59
+    assert (await cache.lookup(URL, {}))[1]
+    clock.now += 2
+    assert not (await cache.lookup(URL, {}))[1]
+
+
+@pytest.mark.parametrize(
+    "headers, status",
+    [
+        ({"Cache-Control": "no-store, max-age=60"}, 200),
+        ({"Cache-Control": "max-age=60"}, 500),
+        ({"Cache-Control": "max-age=60", "Vary": "*"}, 200),
+        ({}, 200),
+    ],
+)
+@pytest.mark.asyncio
+async def test_not_stored(headers: Dict[str, str], status: int) -> None:
+    """Test that the responses which are not cacheable, or neither fresh nor revalidatable, are not stored."""
+    cache = ClientCache(8)
+    await cache.store(URL, {}, response(headers, status))
+    assert await cache.lookup(URL, {}) == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_no_cache_requests_revalidate() -> None:
+    """Test that the no-cache responses and requests are always revalidated."""
+    cache = ClientCache(8)
+    await cache.store(URL, {}, response({"Cache-Control": "no-cache", "Last-Modified": "Tue, 14 Nov 2023 22:13:20 GMT"}))
+    assert not (await cache.lookup(URL, {}))[1]
+    await cache.store(URL, {}, response({"Cache-Control": "max-age=60", "ETag": '"v1"'}))
+    assert not (await cache.lookup(URL, {"Cache-Control": "no-cache"}))[1]
+    assert (await cache.lookup(URL, {}))[1]
+
+
+@pytest.mark.asyncio
+async def test_vary_on_request_headers() -> None:
+    """Test that a response is only served to the requests with the same varying headers."""
+    cache = ClientCache(8)
+    await cache.store(URL, {"Accept": "application/json"}, response({"Cache-Control": "max-age=60", "Vary": "Accept"}))
+    assert (await cache.lookup(URL, {"Accept": "application/json"}))[1]
+    assert await cache.lookup(URL, {"Accept": "text/html"}) == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_the_body() -> None:
+    """Test that a 304 refreshes the freshness and the headers of the stored response, not its body."""
+    clock = Clock()
+    cache = ClientCache(8, clock=clock)
+    await cache.store(URL, {}, response({"Cache-Control": "max-age=0", "ETag": '"v1"', "Content-Type": "text/plain"}))
+    entry, _ = await cache.lookup(URL, {})
+    assert entry is not None
+    not_modified = CIMultiDictProxy(CIMultiDict({"Cache-Control": "max-age=60", "Content-Type": "text/html"}))
+    refreshed = await cache.refresh(URL, entry, not_modified)
+    assert refreshed.body == b"casts"
+    assert refreshed.headers["Content-Type"] == "text/plain"
+    assert (await cache.lookup(URL, {}))[1]
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_evicted() -> None:
+    """Test that the memory tier evicts the least recently used response."""
+    cache = ClientCache(2)
+    for url in ("/a", "/b"):
+        await cache.store(url, {}, response({"Cache-Control": "max-age=60"}))
+    await cache.lookup("/a", {})
+    await cache.store("/c", {}, response({"Cache-Control": "max-age=60"}))
+    assert [(await cache.lookup(url, {}))[1] for url in ("/a", "/b", "/c")] == [True, False, True]
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restarts(tmp_path: Path) -> None:
+    """Test that the responses kept on disk are served by a new cache, and removed with their url."""
+    await ClientCache(1, cache_dir=str(tmp_path)).store(URL, {}, response({"Cache-Control": "max-age=60"}))
+    cache = ClientCache(1, cache_dir=str(tmp_path))
+    entry, fresh = await cache.lookup(URL, {})
+    assert fresh and entry is not None and entry.body == b"casts"
+    await cache.invalidate(URL)
+    assert await ClientCache(1, cache_dir=str(tmp_path)).lookup(URL, {}) == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_channel_serves_hits_and_revalidates() -> None:
+    """Test that the channel answers fresh hits without a request, and only downloads changed resources again."""
+    requests: List[Dict[str, str]] = []
+    etag = '"v1"'
+
+    async def handler(request: web.BaseRequest) -> web.Response:
+        requests.append(dict(request.headers))
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag, "Cache-Control": "max-age=0"})
+        return web.Response(text="casts", headers={"ETag": etag, "Cache-Control": "max-age=0"})
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    port = runner.addresses[0][1]
+    message = HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://{HOST}:{port}/api/search",
+        headers="",
+        version="",
+        body=b"",
+    )
+
+    channel = HTTPClientAsyncChannel("agent", HOST, port, HTTPClientConnection.connection_id, cache_size=8)
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        first = await channel._fetch(message)  # pylint: disable=protected-access
+        second = await channel._fetch(message)  # pylint: disable=protected-access
+        await channel.cache.store(message.url, {}, StoredResponse(200, "OK", {"Cache-Control": "max-age=60"}, b"fresh"))
+        third = await channel._fetch(message)  # pylint: disable=protected-access
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+    assert [resp.status for resp in (first, second, third)] == [200, 200, 200]
+    assert [resp.body for resp in (first, second, third)] == [b"casts", b"casts", b"fresh"]
+    assert len(requests) == 2
+    assert "If-None-Match" not in requests[0]
+    assert requests[1]["If-None-Match"] == etag
+    assert channel.cache.stats["revalidations"] == 1
@@ -0,0 +1,143 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the record and replay of the http client requests."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_client.cache import StoredResponse
+from packages.eightballer.connections.http_client.cassette import (
+    RECORD,
+    REPLAY,
+    Cassette,
+    CassetteMiss,
+)
+from packages.eightballer.connections.http_client.connection import (
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+URL = "https://api.example.com/api/search?text=idriss"
+
+
+def recorded(path: Path, *bodies: bytes) -> Cassette:
+    """Record responses to the same request, then open the cassette to replay them."""
+    cassette = Cassette(str(path), RECORD)
+    cassette.open()
+    for body in bodies:
+        cassette.record("get", URL, b"", StoredResponse(200, "OK", {"Content-Type": "text/plain"}, body), 0.2)
+    cassette.close()
+    return cassette
+
+
+@pytest.mark.asyncio
+async def test_replayed_in_recorded_order(tmp_path: Path) -> None:
+    """Test that the responses to a request are replayed in order, then start over."""
+    recorded(tmp_path / "cassette.jsonl", b"first", b"second")
+    cassette = Cassette(str(tmp_path / "cassette.jsonl"), REPLAY, latency=0.0)
+    cassette.open()
+    bodies = [(await cassette.replay("GET", URL, None)).body for _ in range(3)]
+    assert bodies == [b"first", b"second", b"first"]
+    response = await cassette.replay("GET", URL, None)
+    assert (response.status, response.headers["content-type"]) == (200, "text/plain")
+    with pytest.raises(CassetteMiss):
+        await cassette.replay("POST", URL, b"{}")
+
+
+@pytest.mark.asyncio
+async def test_recorded_latency_and_injected_errors(tmp_path: Path) -> None:
+    """Test that the recorded latency is replayed, and that errors are injected at the given rate."""
+    recorded(tmp_path / "cassette.jsonl", b"casts")
+    cassette = Cassette(str(tmp_path / "cassette.jsonl"), REPLAY)
+    cassette.open()
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await cassette.replay("GET", URL, b"")
+    assert loop.time() - started_at >= 0.19
+
+    cassette = Cassette(str(tmp_path / "cassette.jsonl"), REPLAY, latency=0.0, error_rate=0.5, seed=1)
+    cassette.open()
+    statuses = [(await cassette.replay("GET", URL, b"")).status for _ in range(100)]
+    assert set(statuses) == {200, 503}
+    assert statuses.count(503) == cassette.injected_errors
+    assert 30 < cassette.injected_errors < 70
+
+
+def test_unknown_mode_rejected(tmp_path: Path) -> None:
+    """Test that the cassette and the channel reject unknown modes, and a missing cassette path."""
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "cassette.jsonl"), "live")
+    with pytest.raises(ValueError):
+        HTTPClientAsyncChannel("agent", HOST, 0, HTTPClientConnection.connection_id, transport_mode=REPLAY)
+
+
+@pytest.mark.asyncio
+async def test_channel_records_then_replays_offline(tmp_path: Path) -> None:
+    """Test that a channel replays the responses another channel recorded, without any server."""
+    cassette_path = str(tmp_path / "cassette.jsonl")
+
+    async def handler(request: web.BaseRequest) -> web.Response:
+        return web.Response(text=f"casts of {request.query['text']}")
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    port = runner.addresses[0][1]
+    message = HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://{HOST}:{port}/api/search?text=idriss",
+        headers="",
+        version="",
+        body=b"",
+    )
+
+    recorder = HTTPClientAsyncChannel(
+        "agent", HOST, port, HTTPClientConnection.connection_id, transport_mode=RECORD, cassette_path=cassette_path
+    )
+    await recorder.connect(asyncio.get_running_loop())
+    try:
+        live = await recorder._fetch(message)  # pylint: disable=protected-access
+    finally:
+        await recorder.disconnect()
+        await runner.cleanup()
+
+    replayer = HTTPClientAsyncChannel(
+        "agent",
+        HOST,
+        port,
+        HTTPClientConnection.connection_id,
+        transport_mode=REPLAY,
+        cassette_path=cassette_path,
+        replay_latency=0.0,
+    )
+    await replayer.connect(asyncio.get_running_loop())
+    try:
+        replayed = await replayer._fetch(message)  # pylint: disable=protected-access
+    finally:
+        await replayer.disconnect()
+
+    assert (replayed.status, replayed.body) == (live.status, live.body) == (200, b"casts of idriss")
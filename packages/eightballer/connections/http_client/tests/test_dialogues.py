@@ -0,0 +1,151 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the stateless mode of the http dialogues."""
+
+import copy
+from typing import Any, Tuple
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.protocols.http.dialogues import HttpDialogue
+from packages.eightballer.connections.http_client.connection import (
+    HttpDialogues,
+    HTTPClientConnection,
+    HTTPClientAsyncChannel,
+)
+
+
+TTL = 10.0
+HOST = "127.0.0.1"
+SKILL = "some_author/some_skill:0.1.0"
+
+
+class Clock:  # pylint: disable=too-few-public-methods
+    """A clock the tests move forward by hand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+def make_dialogues(ring_size: int = 0) -> Tuple[HttpDialogues, Clock]:
+    """Make the dialogues of the connection, with a clock of the tests."""
+    clock = Clock()
+    dialogues = HttpDialogues(TTL, ring_size)
+    dialogues._clock = clock  # pylint: disable=protected-access
+    return dialogues, clock
+
+
+def receive_request(dialogues: HttpDialogues, nonce: str) -> Tuple[HttpMessage, HttpDialogue]:
+    """Receive a request from a skill."""
+    message = HttpMessage(
+        dialogue_reference=(nonce, ""),
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url="http://localhost/api",
+        headers="",
+        version="",
+        body=b"",
+    )
+    message.sender = SKILL
+    message.to = dialogues.self_address
+    dialogue = dialogues.update(copy.copy(message))
+    assert dialogue is not None
+    return message, dialogue
+
+
+def respond(dialogue: HttpDialogue) -> HttpMessage:
+    """Respond to the request of a dialogue."""
+    return dialogue.reply(
+        performative=HttpMessage.Performative.RESPONSE,
+        version="",
+        status_code=200,
+        status_text="OK",
+        headers="",
+        body=b"",
+    )
+
+
+def storage_size(dialogues: HttpDialogues) -> int:
+    """Get the number of dialogues in the storage."""
+    return len(dialogues._dialogues_storage._dialogues_by_dialogue_label)  # pylint: disable=protected-access
+
+
+def test_completed_dialogues_leave_the_storage() -> None:
+    """Test that the storage stays flat under sustained load, keeping the recent dialogues in the ring."""
+    dialogues, _ = make_dialogues(ring_size=4)
+    for nonce in range(100):
+        _, dialogue = receive_request(dialogues, str(nonce))
+        respond(dialogue)
+
+    assert storage_size(dialogues) == 0
+    assert dialogues.stateless_stats == {"open_dialogues": 0, "expired_dialogues": 0, "recent_dialogues": 4}
+    assert [dialogue.dialogue_label.dialogue_reference[0] for dialogue in dialogues.recent_dialogues] == [
+        "96",
+        "97",
+        "98",
+        "99",
+    ]
+
+
+def test_dialogues_without_response_expire() -> None:
+    """Test that the dialogues which never get a response are expired after the TTL."""
+    dialogues, clock = make_dialogues(ring_size=4)
+    _, stale = receive_request(dialogues, "stale")
+    clock.now = TTL
+    _, fresh = receive_request(dialogues, "fresh")
+
+    assert storage_size(dialogues) == 1
+    assert dialogues.stateless_stats["expired_dialogues"] == 1
+    assert dialogues.recent_dialogues == [stale]
+
+    # the response of the expired dialogue is dropped, while the fresh one still gets its response
+    assert dialogues.is_expired(stale)
+    assert not dialogues.is_expired(fresh)
+    respond(fresh)
+    assert storage_size(dialogues) == 0
+    assert not dialogues.is_expired(fresh)
+
+    clock.now = 2 * TTL + 1
+    assert not dialogues.recent_dialogues
+
+
+def test_stateless_mode_disabled() -> None:
+    """Test that no dialogue is expired without a TTL."""
+    dialogues = HttpDialogues()
+    receive_request(dialogues, "first")
+    receive_request(dialogues, "second")
+    assert storage_size(dialogues) == 2
+    assert dialogues.stateless_stats["open_dialogues"] == 0
+
+
+def test_dialogue_ttl_from_request_timeout() -> None:
+    """Test that the dialogues expire once their request timed out, unless the requests are unbounded."""
+
+    def make_channel(**kwargs: Any) -> HTTPClientAsyncChannel:
+        """Make a channel with a retry budget of a minute."""
+        return HTTPClientAsyncChannel("agent", HOST, 8000, HTTPClientConnection.connection_id, retry_budget=60.0, **kwargs)
+
+    assert make_channel(request_timeout=300)._dialogues.dialogue_ttl == 360.0  # pylint: disable=protected-access
+    assert make_channel(request_timeout=None)._dialogues.dialogue_ttl == 0.0  # pylint: disable=protected-access
+    assert make_channel(dialogue_ttl=5.0)._dialogues.dialogue_ttl == 5.0  # pylint: disable=protected-access
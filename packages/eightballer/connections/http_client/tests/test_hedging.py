@@ -0,0 +1,250 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the hedging of the http client requests."""
+
+import time
+import asyncio
+from typing import List
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_client.hedging import HedgingPolicy
+from packages.eightballer.connections.http_client.cassette import RECORD
+from packages.eightballer.connections.http_client.connection import (
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "api.example.com"
+
+
+def warmed_up(policy: HedgingPolicy, latency: float = 0.01) -> HedgingPolicy:
+    """Record enough latencies for the policy to hedge."""
+    for _ in range(policy.min_samples):
+        policy.record(HOST, latency)
+    return policy
+
+
+def test_delay_is_the_percentile_of_the_host() -> None:
+    """Test that the delay is only known after enough samples, and is the percentile of the latencies."""
+    policy = HedgingPolicy(90, min_samples=10, min_delay=0.0)
+    for latency in range(1, 10):
+        policy.record(HOST, latency)
+    assert policy.delay(HOST) is None
+    policy.record(HOST, 10)
+    assert policy.delay(HOST) == 9
+    assert policy.delay("other.example.com") is None
+
+
+def test_budget_caps_the_hedges() -> None:
+    """Test that each hedge spends the share of the budget of several requests."""
+    policy = HedgingPolicy(95, budget=0.25)
+    spent = []
+    for _ in range(8):
+        policy.deposit()
+        spent.append(policy.spend())
+    assert spent == [False, False, False, True, False, False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_slow_request_hedged_and_cancelled() -> None:
+    """Test that a slow request is hedged, the hedge used, and the slow request cancelled."""
+    policy = warmed_up(HedgingPolicy(95, budget=1.0))
+    delays = [10.0, 0.0]
+    cancelled: List[bool] = []
+
+    async def request() -> float:
+        delay = delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return delay
+
+    assert await asyncio.wait_for(policy.run(HOST, request, time.monotonic), timeout=5) == 0.0
+    await asyncio.sleep(0)
+    assert cancelled == [True]
+    assert (policy.stats["hedges"], policy.stats["hedges_won"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_fast_request_not_hedged() -> None:
+    """Test that the requests answered within the delay, or beyond the budget, are not hedged."""
+    policy = warmed_up(HedgingPolicy(95, budget=1.0), latency=1.0)
+    calls = 0
+
+    async def request() -> str:
+        nonlocal calls
+        calls += 1
+        return "ok"
+
+    assert await policy.run(HOST, request, time.monotonic) == "ok"
+    policy = warmed_up(HedgingPolicy(95, budget=0.0))
+
+    async def slow_request() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert await policy.run(HOST, slow_request, time.monotonic) == "ok"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_hedge_survives_a_failed_request() -> None:
+    """Test that a request failing after its hedge was sent does not fail the run."""
+    policy = warmed_up(HedgingPolicy(95, budget=1.0))
+    outcomes = ["fail", "ok"]
+
+    async def request() -> str:
+        outcome = outcomes.pop(0)
+        if outcome == "fail":
+            await asyncio.sleep(0.05)
+            raise ConnectionError("reset")
+        await asyncio.sleep(0.1)
+        return outcome
+
+    assert await policy.run(HOST, request, time.monotonic) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_tied_requests_discard_the_unused_result() -> None:
+    """Test that when the request and its hedge complete together, the primary is used and the hedge discarded."""
+    policy = warmed_up(HedgingPolicy(95, budget=1.0))
+    names = ["primary", "hedge"]
+    started: List[str] = []
+    release = asyncio.Event()
+    discarded: List[str] = []
+
+    async def request() -> str:
+        name = names.pop(0)
+        started.append(name)
+        if len(started) == 2:
+            release.set()
+        await release.wait()
+        return name
+
+    assert await policy.run(HOST, request, time.monotonic, discard=discarded.append) == "primary"
+    assert discarded == ["hedge"]
+    assert (policy.stats["hedges"], policy.stats["hedges_won"]) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_channel_hedges_slow_gets() -> None:
+    """Test that the channel answers a slow GET with the response to its hedge."""
+    calls = 0
+    release = asyncio.Event()
+
+    async def handler(_request: web.BaseRequest) -> web.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await release.wait()
+        return web.Response(text="casts")
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+    channel = HTTPClientAsyncChannel(
+        "agent", "127.0.0.1", port, HTTPClientConnection.connection_id, hedge_percentile=95, hedge_budget=1.0
+    )
+    for _ in range(channel.hedging.min_samples):
+        channel.hedging.record(f"127.0.0.1:{port}", 0.01)
+    message = HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://127.0.0.1:{port}/api/search",
+        headers="",
+        version="",
+        body=b"",
+    )
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        resp = await asyncio.wait_for(channel._fetch(message), timeout=5)  # pylint: disable=protected-access
+    finally:
+        release.set()
+        await channel.disconnect()
+        await runner.cleanup()
+    assert (resp.status, resp.body, calls) == (200, b"casts", 2)
+
+
+@pytest.mark.asyncio
+async def test_hedged_get_records_and_spools_only_the_used_response(tmp_path: Path) -> None:
+    """Test that only the response which is used is recorded, and the body spooled for the other is removed."""
+    calls = 0
+    release = asyncio.Event()
+    body = "casts" * 100
+
+    async def handler(_request: web.BaseRequest) -> web.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            release.set()
+        await release.wait()
+        return web.Response(text=body)
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    cassette_path = tmp_path / "cassette.jsonl"
+    channel = HTTPClientAsyncChannel(
+        "agent",
+        "127.0.0.1",
+        port,
+        HTTPClientConnection.connection_id,
+        hedge_percentile=95,
+        hedge_budget=1.0,
+        spool_threshold=16,
+        spool_dir=str(spool_dir),
+        transport_mode=RECORD,
+        cassette_path=str(cassette_path),
+    )
+    for _ in range(channel.hedging.min_samples):
+        channel.hedging.record(f"127.0.0.1:{port}", 0.01)
+    message = HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://127.0.0.1:{port}/api/search",
+        headers="",
+        version="",
+        body=b"",
+    )
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        resp = await asyncio.wait_for(channel._fetch(message), timeout=5)  # pylint: disable=protected-access
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+    assert calls == 2
+    assert resp.body_path is not None and Path(resp.body_path).read_text() == body
+    assert list(spool_dir.iterdir()) == [Path(resp.body_path)]
+    assert len(cassette_path.read_text().splitlines()) == 1
+    resp.cleanup()
@@ -0,0 +1,163 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the retries of the http client requests."""
+
+import socket
+import asyncio
+from typing import List, Optional
+
+import pytest
+import aiohttp
+from aiohttp import web
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_client.retry import (
+    RetryPolicy,
+    is_idempotent,
+    parse_retry_after,
+    is_retryable_status,
+)
+from packages.eightballer.connections.http_client.connection import (
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+
+
+def request(port: int, method: str = "get", headers: str = "") -> HttpMessage:
+    """Get a request message to the local server."""
+    return HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method=method,
+        url=f"http://{HOST}:{port}/api/search",
+        headers=headers,
+        version="",
+        body=b"",
+    )
+
+
+def test_idempotency_and_retryable_statuses() -> None:
+    """Test which requests and responses are retried."""
+    assert is_idempotent("get", None) and is_idempotent("PUT", {})
+    assert not is_idempotent("POST", {}) and is_idempotent("POST", {"Idempotency-Key": "1"})
+    assert [is_retryable_status(status) for status in (200, 404, 429, 500, 501, 503)] == [
+        False,
+        False,
+        True,
+        True,
+        False,
+        True,
+    ]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, None), ("120", 120.0), ("Tue, 14 Nov 2023 22:14:20 GMT", 60.0), ("soon", None)],
+)
+def test_parse_retry_after(value: Optional[str], expected: Optional[float]) -> None:
+    """Test that Retry-After is read as seconds or as an http date."""
+    assert parse_retry_after(value, clock=lambda: 1_700_000_000.0) == expected
+
+
+def test_backoff_bounded_by_retries_and_budget() -> None:
+    """Test that the backoff doubles up to its bound, and stops with the retries or the budget."""
+    policy = RetryPolicy(4, backoff=1.0, max_backoff=3.0, budget=10.0, rng=lambda: 0.999)
+    assert [round(policy.delay(retries, 0.0) or 0, 1) for retries in range(4)] == [1.0, 2.0, 3.0, 3.0]
+    assert policy.delay(4, 0.0) is None
+    assert policy.delay(0, 0.0, retry_after=20.0) is None
+    assert policy.delay(1, 9.5) is None
+
+
+async def serve(statuses: List[int], retry_after: str = "0") -> web.ServerRunner:
+    """Start a server answering with the given statuses, then with 200."""
+
+    async def handler(_request: web.BaseRequest) -> web.Response:
+        status = statuses.pop(0) if statuses else 200
+        return web.Response(status=status, text=str(status), headers={"Retry-After": retry_after})
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    return runner
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_absorbed() -> None:
+    """Test that the transient failures of idempotent requests are retried, and the others returned as is."""
+    statuses = [503, 429]
+    runner = await serve(statuses)
+    port = runner.addresses[0][1]
+    channel = HTTPClientAsyncChannel(
+        "agent", HOST, port, HTTPClientConnection.connection_id, max_retries=2, retry_backoff=0.01
+    )
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        assert (await channel._send(request(port))).status == 200  # pylint: disable=protected-access
+        statuses.append(503)
+        assert (await channel._send(request(port, "post"))).status == 503  # pylint: disable=protected-access
+        statuses.extend([503, 503, 503])
+        assert (await channel._send(request(port))).status == 503  # pylint: disable=protected-access
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_beyond_budget_returned() -> None:
+    """Test that a Retry-After beyond the budget of the request is returned to the skill instead of waited for."""
+    runner = await serve([429], retry_after="120")
+    port = runner.addresses[0][1]
+    channel = HTTPClientAsyncChannel("agent", HOST, port, HTTPClientConnection.connection_id, max_retries=2)
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        resp = await asyncio.wait_for(channel._send(request(port)), timeout=5)  # pylint: disable=protected-access
+        assert resp.status == 429
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_connect_errors_retried_for_any_method() -> None:
+    """Test that connect errors are retried even for non-idempotent requests, then raised."""
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        port = sock.getsockname()[1]
+    channel = HTTPClientAsyncChannel(
+        "agent", HOST, port, HTTPClientConnection.connection_id, max_retries=2, retry_backoff=0.01
+    )
+    await channel.connect(asyncio.get_running_loop())
+    attempts = 0
+    perform = channel._perform_http_request  # pylint: disable=protected-access
+
+    async def counted(*args, **kwargs):  # type: ignore
+        nonlocal attempts
+        attempts += 1
+        return await perform(*args, **kwargs)
+
+    channel._perform_http_request = counted  # type: ignore  # pylint: disable=protected-access
+    try:
+        with pytest.raises(aiohttp.ClientConnectorError):
+            await channel._send(request(port, "post"))  # pylint: disable=protected-access
+    finally:
+        await channel.disconnect()
+    assert attempts == 3
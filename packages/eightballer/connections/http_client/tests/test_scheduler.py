@@ -0,0 +1,95 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the per-host scheduling of the http client requests."""
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from packages.eightballer.connections.http_client.scheduler import (
+    DEFAULT_URGENCY,
+    HostScheduler,
+    parse_urgency,
+)
+
+
+HOST = "api.example.com"
+
+
+@pytest.mark.parametrize(
+    "priority, expected",
+    [(None, DEFAULT_URGENCY), ("u=0", 0), ("i, u=5", 5), ("u=9", 7), ("u=high", DEFAULT_URGENCY)],
+)
+def test_parse_urgency(priority: Optional[str], expected: int) -> None:
+    """Test that the urgency is read from the Priority header."""
+    headers = {} if priority is None else {"Priority": priority}
+    assert parse_urgency(headers) == expected
+
+
+@pytest.mark.asyncio
+async def test_requests_wait_by_urgency_then_arrival() -> None:
+    """Test that the requests beyond the limit wait, and are let in the most urgent first."""
+    scheduler = HostScheduler(1)
+    order: List[str] = []
+
+    async def request(name: str, urgency: int) -> None:
+        await scheduler.acquire(HOST, urgency)
+        order.append(name)
+        await asyncio.sleep(0)
+        scheduler.release(HOST)
+
+    await scheduler.acquire(HOST)
+    tasks = [
+        asyncio.ensure_future(request(name, urgency))
+        for name, urgency in (("late", 5), ("first", 3), ("urgent", 0), ("second", 3))
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.stats[HOST]["waiting"] == 4
+    scheduler.release(HOST)
+    await asyncio.gather(*tasks)
+
+    assert order == ["urgent", "first", "second", "late"]
+    stats = scheduler.stats[HOST]
+    assert (stats["in_flight"], stats["requests"], stats["queued_requests"]) == (0, 5, 4)
+
+
+@pytest.mark.asyncio
+async def test_hosts_do_not_hold_each_other_back() -> None:
+    """Test that a saturated host does not delay the requests to another host."""
+    scheduler = HostScheduler(1)
+    await scheduler.acquire(HOST)
+    assert await asyncio.wait_for(scheduler.acquire("other.example.com"), timeout=1) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_requests_give_up_their_turn() -> None:
+    """Test that cancelled waiting requests neither hold a slot nor block the next requests."""
+    scheduler = HostScheduler(1)
+    await scheduler.acquire(HOST)
+    waiting = asyncio.ensure_future(scheduler.acquire(HOST))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    scheduler.release(HOST)
+    assert scheduler.stats[HOST]["in_flight"] == 0
+    assert await asyncio.wait_for(scheduler.acquire(HOST), timeout=1) == 0.0
@@ -0,0 +1,74 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the pooled session of the HTTP Client connection."""
+
+import asyncio
+from typing import Set
+
+import pytest
+from aiohttp import web
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_client.connection import (
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_requests_reuse_the_pooled_connection() -> None:
+    """Test that the requests of a channel reuse one connection, and that disconnecting closes the session."""
+    peers: Set[str] = set()
+
+    async def handler(request: web.BaseRequest) -> web.Response:
+        peers.add(str(request.transport.get_extra_info("peername")))
+        return web.Response(text="ok", headers={"Set-Cookie": "session=1"})
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    port = runner.addresses[0][1]
+    message = HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://{HOST}:{port}/",
+        headers="",
+        version="",
+        body=b"",
+    )
+
+    channel = HTTPClientAsyncChannel("agent", HOST, port, HTTPClientConnection.connection_id, keepalive_timeout=30)
+    await channel.connect(asyncio.get_running_loop())
+    session = channel._session  # pylint: disable=protected-access
+    try:
+        for _ in range(3):
+            response = await channel._perform_http_request(message)  # pylint: disable=protected-access
+            assert response.status == 200
+        assert len(peers) == 1
+        assert not list(session.cookie_jar)
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+    assert session.closed
+    assert channel._session is None  # pylint: disable=protected-access
@@ -0,0 +1,118 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the spooling of the large response bodies of the http client."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aea.mail.base import Envelope
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_client.connection import (
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+LARGE_BODY = b"cast" * 100_000
+
+
+@pytest.mark.asyncio
+async def test_large_bodies_spooled_to_a_file(tmp_path: Path) -> None:
+    """Test that the bodies above the spool threshold are written to a file, and the others kept in memory."""
+
+    async def handler(request: web.BaseRequest) -> web.Response:
+        return web.Response(body=LARGE_BODY if request.path == "/large" else b"small")
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    port = runner.addresses[0][1]
+
+    def request(path: str) -> HttpMessage:
+        return HttpMessage(
+            performative=HttpMessage.Performative.REQUEST,
+            method="get",
+            url=f"http://{HOST}:{port}{path}",
+            headers="",
+            version="",
+            body=b"",
+        )
+
+    channel = HTTPClientAsyncChannel(
+        "agent", HOST, port, HTTPClientConnection.connection_id, spool_threshold=1024, spool_dir=str(tmp_path)
+    )
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        large = await channel._fetch(request("/large"))  # pylint: disable=protected-access
+        small = await channel._fetch(request("/small"))  # pylint: disable=protected-access
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+    assert (small.body, small.body_path) == (b"small", None)
+    assert large.body == b"" and large.body_path is not None
+    assert Path(large.body_path).parent == tmp_path
+    assert Path(large.body_path).read_bytes() == LARGE_BODY
+    large.cleanup()
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_spooled_body_of_an_expired_dialogue_is_removed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the body spooled for a response which is dropped, as its dialogue expired, is removed."""
+
+    async def handler(_: web.BaseRequest) -> web.Response:
+        return web.Response(body=LARGE_BODY)
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    port = runner.addresses[0][1]
+
+    channel = HTTPClientAsyncChannel(
+        "agent", HOST, port, HTTPClientConnection.connection_id, spool_threshold=1024, spool_dir=str(tmp_path)
+    )
+    await channel.connect(asyncio.get_running_loop())
+    monkeypatch.setattr(channel._dialogues, "is_expired", lambda _: True)  # pylint: disable=protected-access
+    message = HttpMessage(
+        dialogue_reference=("1", ""),
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://{HOST}:{port}/large",
+        headers="",
+        version="",
+        body=b"",
+    )
+    message.sender = "some_author/some_skill:0.1.0"
+    message.to = str(HTTPClientConnection.connection_id)
+    try:
+        await channel._http_request_task(  # pylint: disable=protected-access
+            Envelope(to=message.to, sender=message.sender, message=message)
+        )
+        assert channel._in_queue.empty()  # pylint: disable=protected-access
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+    assert not list(tmp_path.iterdir())
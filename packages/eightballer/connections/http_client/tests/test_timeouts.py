@@ -0,0 +1,122 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the per-request timeouts and deadlines of the http client."""
+
+import time
+import asyncio
+from typing import Dict, List
+
+import pytest
+from aiohttp import web
+from multidict import CIMultiDict
+from aea.mail.base import Envelope
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.connections.http_common.headers import encode_headers
+from packages.eightballer.connections.http_client.timeouts import (
+    DEADLINE_HEADER,
+    TIMEOUT_HEADER,
+    READ_TIMEOUT_HEADER,
+    RequestTimeouts,
+    strip_reserved_headers,
+)
+from packages.eightballer.connections.http_client.connection import (
+    REQUEST_TIMEOUT,
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+SKILL = "some_author/some_skill:0.1.0"
+DEFAULTS = RequestTimeouts(total=300.0, connect=5.0)
+
+
+def test_timeouts_from_reserved_headers() -> None:
+    """Test that the reserved headers override the defaults, and malformed ones are ignored."""
+    timeouts = RequestTimeouts.from_headers(
+        {TIMEOUT_HEADER: "2.5", READ_TIMEOUT_HEADER: "soon", DEADLINE_HEADER: "1700000010"}, DEFAULTS
+    )
+    assert timeouts == RequestTimeouts(total=2.5, connect=5.0, read=None, deadline=1_700_000_010.0)
+    assert timeouts.remaining(1_700_000_000.0) == 2.5
+    assert timeouts.remaining(1_700_000_009.0) == 1.0
+    assert timeouts.remaining(1_700_000_011.0) == -1.0
+    assert RequestTimeouts().remaining(0.0) is None
+    assert RequestTimeouts.from_headers({TIMEOUT_HEADER: "-1"}, DEFAULTS) == DEFAULTS
+
+
+def test_reserved_headers_not_sent_upstream() -> None:
+    """Test that only the reserved headers are removed from the request."""
+    headers = CIMultiDict({"Accept": "application/json", "x-request-timeout": "1"})
+    assert dict(strip_reserved_headers(headers) or {}) == {"Accept": "application/json"}
+    assert strip_reserved_headers(None) is None
+
+
+async def exchange(channel: HTTPClientAsyncChannel, port: int, headers: Dict[str, str]) -> HttpMessage:
+    """Send a request through the channel, and get the response sent back to the skill."""
+    message = HttpMessage(
+        dialogue_reference=(str(time.monotonic_ns()), ""),
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=f"http://{HOST}:{port}/api/search",
+        headers=encode_headers(headers),
+        version="",
+        body=b"",
+    )
+    message.sender = SKILL
+    message.to = str(HTTPClientConnection.connection_id)
+    channel.send(Envelope(to=message.to, sender=message.sender, message=message))
+    envelope = await asyncio.wait_for(channel.get_message(), timeout=5)
+    assert envelope is not None
+    return envelope.message
+
+
+@pytest.mark.asyncio
+async def test_hung_upstream_and_passed_deadline_time_out() -> None:
+    """Test that a request is cancelled at its timeout, not sent past its deadline, and answered with a 408."""
+    received: List[Dict[str, str]] = []
+    release = asyncio.Event()
+
+    async def handler(request: web.BaseRequest) -> web.Response:
+        received.append(dict(request.headers))
+        await release.wait()
+        return web.Response(text="late")
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    port = runner.addresses[0][1]
+    channel = HTTPClientAsyncChannel("agent", HOST, port, HTTPClientConnection.connection_id)
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        started_at = time.monotonic()
+        response = await exchange(channel, port, {TIMEOUT_HEADER: "0.2"})
+        assert response.status_code == REQUEST_TIMEOUT
+        assert time.monotonic() - started_at < 2
+
+        response = await exchange(channel, port, {DEADLINE_HEADER: str(time.time() - 1)})
+        assert response.status_code == REQUEST_TIMEOUT
+    finally:
+        release.set()
+        await channel.disconnect()
+        await runner.cleanup()
+
+    assert len(received) == 1
+    assert TIMEOUT_HEADER not in received[0]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Per-request timeouts and deadlines of the http client."""
+
+import math
+from typing import Mapping, Optional
+from dataclasses import dataclass
+
+import aiohttp
+from multidict import CIMultiDict
+
+
+# the reserved headers the skills set the timeouts of a request with, in seconds, never sent upstream
+TIMEOUT_HEADER = "X-Request-Timeout"
+CONNECT_TIMEOUT_HEADER = "X-Connect-Timeout"
+READ_TIMEOUT_HEADER = "X-Read-Timeout"
+# the absolute deadline of a request, as a unix timestamp, such as the end of the round it was sent in
+DEADLINE_HEADER = "X-Request-Deadline"
+RESERVED_HEADERS = (TIMEOUT_HEADER, CONNECT_TIMEOUT_HEADER, READ_TIMEOUT_HEADER, DEADLINE_HEADER)
+
+
+def _seconds(headers: Mapping[str, str], name: str, default: Optional[float]) -> Optional[float]:
+    """Parse a positive number of seconds from a header, the default if missing or malformed."""
+    try:
+        value = float(headers[name])
+    except (KeyError, ValueError):
+        return default
+    return value if value > 0 and math.isfinite(value) else default
+
+
+def strip_reserved_headers(headers: Optional[CIMultiDict]) -> Optional[CIMultiDict]:
+    """
+    Remove the reserved headers of the http client from the headers of a request.
+
+    :param headers: the headers of the request.
+    :return: the headers sent upstream.
+    """
+    if headers is None or not any(name in headers for name in RESERVED_HEADERS):
+        return headers
+    headers = CIMultiDict(headers)
+    for name in RESERVED_HEADERS:
+        headers.popall(name, None)
+    return headers
+
+
+@dataclass(frozen=True)
+class RequestTimeouts:
+    """
+    The timeouts of a request.
+
+    The total timeout and the deadline bound the whole request, retries and hedges included,
+    while the connect and read timeouts bound each attempt.
+    """
+
+    total: Optional[float] = None
+    connect: Optional[float] = None
+    read: Optional[float] = None
+    deadline: Optional[float] = None
+
+    @classmethod
+    def from_headers(cls, headers: Optional[Mapping[str, str]], defaults: "RequestTimeouts") -> "RequestTimeouts":
+        """
+        Get the timeouts of a request from its reserved headers.
+
+        :param headers: the headers of the request.
+        :param defaults: the timeouts of the requests without the reserved headers.
+        :return: the timeouts.
+        """
+        if not headers:
+            return defaults
+        return cls(
+            _seconds(headers, TIMEOUT_HEADER, defaults.total),
+            _seconds(headers, CONNECT_TIMEOUT_HEADER, defaults.connect),
+            _seconds(headers, READ_TIMEOUT_HEADER, defaults.read),
+            _seconds(headers, DEADLINE_HEADER, defaults.deadline),
+        )
+
+    def remaining(self, now: float) -> Optional[float]:
+        """
+        Get the seconds left to the request.
+
+        :param now: the current unix time.
+        :return: the seconds left, which are not positive once the deadline passed, None if unbounded.
+        """
+        bounds = [] if self.total is None else [self.total]
+        if self.deadline is not None:
+            bounds.append(self.deadline - now)
+        return min(bounds) if bounds else None
+
+    def client_timeout(self) -> aiohttp.ClientTimeout:
+        """Get the timeout of each attempt of the request."""
+        return aiohttp.ClientTimeout(total=None, connect=self.connect, sock_read=self.read)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Codec of the headers carried by http messages, shared by the http connections and the components using them."""
+
+import re
+from typing import Tuple, Union, Mapping, Iterable
+
+from multidict import CIMultiDict, MultiMapping
+
+
+HEADER_SEPARATOR = "\r\n"
+# the header lines are only split on CRLF and LF, unlike with `str.splitlines`
+_LINE_SEPARATOR = re.compile(r"\r?\n")
+# characters which would let a value inject headers of its own, including every line boundary of `str.splitlines`
+_LINE_BREAKS = str.maketrans(dict.fromkeys("\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029", " "))
+
+Headers = Union[Mapping[str, str], MultiMapping[str], Iterable[Tuple[str, str]]]
+
+
+def encode_headers(headers: Headers) -> str:
+    """
+    Encode headers into the `name: value` lines of an http message.
+
+    Every value of a multi-valued header gets its own line, and line breaks within values are replaced by spaces.
+
+    :param headers: the headers, as a (multi) mapping or as pairs.
+    :return: the CRLF-joined header lines.
+    """
+    items = headers.items() if isinstance(headers, Mapping) else headers
+    return HEADER_SEPARATOR.join(f"{name}: {str(value).translate(_LINE_BREAKS)}" for name, value in items)
+
+
+def decode_headers(headers: str) -> CIMultiDict:
+    """
+    Decode the headers of an http message.
+
+    Both CRLF and LF separated lines are accepted, as well as folded lines and a trailing blank line,
+    so that headers encoded with `email.message.Message.as_string` are decoded identically.
+
+    :param headers: the header lines.
+    :return: the case-insensitive headers, keeping every value of multi-valued headers.
+    """
+    decoded: CIMultiDict = CIMultiDict()
+    name = value = None
+    for line in _LINE_SEPARATOR.split(headers):
+        if not line:
+            # a blank line ends the header section
+            break
+        if line[0] in " \t":
+            if name is not None:
+                value = f"{value} {line.strip()}"
+            continue
+        if name is not None:
+            decoded.add(name, value)
+        name, sep, value = line.partition(":")
+        if not sep:
+            name = None
+            continue
+        name, value = name.strip(), value.strip()
+    if name is not None:
+        decoded.add(name, value)
+    return decoded
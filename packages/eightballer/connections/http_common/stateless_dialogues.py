@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Stateless mode of the dialogues of the request/response http components."""
+
+import time
+from typing import Any, Dict, List, Tuple, Deque, Callable, Optional
+from collections import OrderedDict, deque
+
+from aea.protocols.base import Message
+from aea.protocols.dialogue.base import Dialogue, DialogueLabel
+
+
+DEFAULT_DIALOGUE_TTL = 300.0
+
+
+class StatelessDialoguesMixin:
+    """
+    Keep the storage of request/response dialogues bounded under sustained load.
+
+    The http dialogues leave the storage as soon as their response completes them. The mixin also expires the
+    dialogues which never get a response, once they are older than the TTL, so that the storage stays flat.
+    Completed and expired dialogues can be kept for debugging in a ring of the given size, outside the storage,
+    for at most the TTL.
+
+    The owner of an expired dialogue checks `is_expired` before replying, as the storage no longer holds it.
+    The mixin must precede the dialogues class in the bases, and be initialized explicitly.
+    """
+
+    def __init__(
+        self,
+        dialogue_ttl: float = DEFAULT_DIALOGUE_TTL,
+        dialogue_ring_size: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the stateless mode.
+
+        :param dialogue_ttl: the seconds after which dialogues without a response are expired, never if not positive.
+        :param dialogue_ring_size: the number of completed or expired dialogues to keep for debugging.
+        :param clock: the clock the age of the dialogues is measured with.
+        """
+        self.dialogue_ttl = dialogue_ttl
+        self._clock = clock
+        # the dialogues waiting for a response, oldest first
+        self._open_dialogues: "OrderedDict[DialogueLabel, Tuple[Dialogue, float]]" = OrderedDict()
+        self._recent_dialogues: Deque[Tuple[float, Dialogue]] = deque(maxlen=max(dialogue_ring_size, 0))
+        self.expired_dialogues = 0
+
+    @property
+    def recent_dialogues(self) -> List[Dialogue]:
+        """Get the dialogues which completed or expired within the TTL, oldest first."""
+        self._prune_recent(self._clock())
+        return [dialogue for _, dialogue in self._recent_dialogues]
+
+    @property
+    def stateless_stats(self) -> Dict[str, int]:
+        """Get the statistics of the stateless mode."""
+        return {
+            "open_dialogues": len(self._open_dialogues),
+            "expired_dialogues": self.expired_dialogues,
+            "recent_dialogues": len(self._recent_dialogues),
+        }
+
+    def create(self, counterparty: str, performative: Message.Performative, **kwargs: Any) -> Tuple[Message, Dialogue]:
+        """Create a dialogue, tracking it until its response."""
+        message, dialogue = super().create(counterparty, performative, **kwargs)  # type: ignore
+        self._track(dialogue)
+        return message, dialogue
+
+    def update(self, message: Message) -> Optional[Dialogue]:
+        """Update the dialogue of a message, tracking it until its response."""
+        dialogue = super().update(message)  # type: ignore
+        if dialogue is not None:
+            self._track(dialogue)
+        return dialogue
+
+    def is_expired(self, dialogue: Dialogue) -> bool:
+        """
+        Check whether a dialogue was expired before its response.
+
+        The storage no longer holds an expired dialogue, so its response must not be sent anymore.
+
+        :param dialogue: the dialogue to check.
+        :return: whether the dialogue was expired.
+        """
+        if self.dialogue_ttl <= 0:
+            return False
+        self._expire(self._clock())
+        last_message = dialogue.last_message
+        return (
+            dialogue.incomplete_dialogue_label not in self._open_dialogues
+            and last_message is not None
+            and last_message.performative not in dialogue.rules.terminal_performatives
+        )
+
+    def _track(self, dialogue: Dialogue) -> None:
+        """Track a dialogue until it completes, and expire the dialogues older than the TTL."""
+        if self.dialogue_ttl <= 0:
+            return
+        now = self._clock()
+        self._expire(now)
+        label = dialogue.incomplete_dialogue_label
+        last_message = dialogue.last_message
+        if (
+            label in self._open_dialogues
+            or last_message is None
+            or last_message.performative in dialogue.rules.terminal_performatives
+        ):
+            return
+        self._open_dialogues[label] = (dialogue, now)
+        dialogue.add_terminal_state_callback(self._on_terminal_state)
+
+    def _on_terminal_state(self, dialogue: Dialogue) -> None:
+        """Stop tracking a completed dialogue, which the storage removes itself."""
+        self._open_dialogues.pop(dialogue.incomplete_dialogue_label, None)
+        self._remember(dialogue, self._clock())
+
+    def _expire(self, now: float) -> None:
+        """Remove the dialogues older than the TTL from the storage."""
+        storage = self._dialogues_storage  # type: ignore  # pylint: disable=no-member
+        while self._open_dialogues:
+            label, (dialogue, started_at) = next(iter(self._open_dialogues.items()))
+            if now - started_at < self.dialogue_ttl:
+                break
+            del self._open_dialogues[label]
+            if storage.is_dialogue_present(dialogue.dialogue_label):
+                storage.remove(dialogue.dialogue_label)
+            self.expired_dialogues += 1
+            self._remember(dialogue, now)
+
+    def _remember(self, dialogue: Dialogue, now: float) -> None:
+        """Keep a dialogue in the ring of recent dialogues."""
+        if self._recent_dialogues.maxlen:
+            self._recent_dialogues.append((now, dialogue))
+            self._prune_recent(now)
+
+    def _prune_recent(self, now: float) -> None:
+        """Drop the recent dialogues older than the TTL."""
+        while self._recent_dialogues and 0 < self.dialogue_ttl <= now - self._recent_dialogues[0][0]:
+            self._recent_dialogues.popleft()
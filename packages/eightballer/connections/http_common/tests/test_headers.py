@@ -0,0 +1,86 @@
+# noqa: INP001
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Tests for the header codec of the http connections."""
+
+import email.message
+
+import pytest
+from multidict import CIMultiDict
+
+from packages.eightballer.connections.http_common.headers import (
+    decode_headers,
+    encode_headers,
+)
+
+
+HEADERS = {
+    "Content-Type": "application/json",
+    "X-Long": "a" * 120 + " b " + "c" * 60,
+    "Set-Cookie": "session=1; Path=/",
+}
+
+
+def test_round_trip() -> None:
+    """Test that decoding encoded headers gives back the headers."""
+    encoded = encode_headers(HEADERS)
+    assert encoded.split("\r\n")[0] == "Content-Type: application/json"
+    assert decode_headers(encoded) == HEADERS
+
+
+def test_multi_value() -> None:
+    """Test that every value of a multi-valued header is kept."""
+    headers = CIMultiDict([("Set-Cookie", "a=1"), ("Set-Cookie", "b=2")])
+    assert encode_headers(headers) == "Set-Cookie: a=1\r\nSet-Cookie: b=2"
+    assert decode_headers(encode_headers(headers)).getall("set-cookie") == ["a=1", "b=2"]
+
+
+@pytest.mark.parametrize("headers", [HEADERS, {}, {"Accept": "*/*"}])
+def test_compatible_with_email_message(headers: dict) -> None:
+    """Test that headers encoded with email.message are decoded as email.message_from_string does."""
+    message = email.message.Message()
+    for name, value in headers.items():
+        message.add_header(name, value)
+    legacy = message.as_string()
+    assert dict(decode_headers(legacy)) == dict(email.message_from_string(legacy).items())
+    assert dict(email.message_from_string(encode_headers(headers)).items()) == headers
+
+
+def test_line_breaks_cannot_inject_headers() -> None:
+    """Test that line breaks within values do not produce extra headers."""
+    decoded = decode_headers(encode_headers({"X-Value": "a\r\nX-Injected: 1"}))
+    assert "X-Injected" not in decoded
+    assert decoded["x-value"] == "a  X-Injected: 1"
+
+
+@pytest.mark.parametrize("line_break", ["\r", "\n", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029"])
+def test_every_line_boundary_is_escaped(line_break: str) -> None:
+    """Test that none of the line boundaries of str.splitlines can inject headers through a round trip."""
+    decoded = decode_headers(encode_headers({"X-Name": f"a{line_break}X-Injected: 1"}))
+    assert dict(decoded) == {"X-Name": "a X-Injected: 1"}
+    if line_break != "\n":
+        # a raw message is only split on CRLF and LF
+        raw = f"X-Name: a{line_break}X-Injected: 1"
+        assert dict(decode_headers(raw)) == {"X-Name": f"a{line_break}X-Injected: 1"}
+
+
+def test_malformed_lines_are_skipped() -> None:
+    """Test that lines without a separator, and the lines after a blank line, are ignored."""
+    decoded = decode_headers("Accept: */*\nmalformed\n folded\n\nX-Body: 1")
+    assert dict(decoded) == {"Accept": "*/*"}
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Edge cache of the responses of the http server to idempotent requests."""
+
+import time
+from typing import Dict, Tuple, Mapping, Callable, Optional
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from aiohttp import web
+from multidict import CIMultiDict
+from aiohttp.web_request import BaseRequest
+
+
+NOT_MODIFIED = 304
+CACHEABLE_METHODS = frozenset({"GET"})
+CACHEABLE_STATUSES = frozenset({200})
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE"})
+# the response directives which forbid a shared cache from storing the response
+UNCACHEABLE_DIRECTIVES = frozenset({"no-store", "no-cache", "private"})
+# the headers sent along a 304 response, in lowercase as header names are case-insensitive
+NOT_MODIFIED_HEADERS = frozenset({"cache-control", "content-location", "date", "etag", "expires", "vary"})
+
+
+def parse_cache_control(header: str) -> Dict[str, Optional[str]]:
+    """
+    Parse a Cache-Control header.
+
+    :param header: the header.
+    :return: the lowercase directives, with their value if any.
+    """
+    directives: Dict[str, Optional[str]] = {}
+    for directive in header.split(","):
+        name, sep, value = directive.strip().partition("=")
+        if name:
+            directives[name.strip().lower()] = value.strip().strip('"') if sep else None
+    return directives
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Parse an HTTP date into a unix timestamp, None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def freshness_lifetime(directives: Dict[str, Optional[str]], headers: Optional[Mapping[str, str]] = None) -> int:
+    """
+    Get the seconds a response is fresh for a shared cache.
+
+    s-maxage is preferred over max-age, then the Expires header is used relative to the Date of the response.
+
+    :param directives: the Cache-Control directives of the response.
+    :param headers: the headers of the response.
+    :return: the freshness lifetime, not positive if the response is stale.
+    """
+    for name in ("s-maxage", "max-age"):
+        value = directives.get(name)
+        if value is not None:
+            try:
+                return max(int(value), 0)
+            except ValueError:
+                return 0
+    if headers is None or "Expires" not in headers:
+        return 0
+    # a malformed Expires, such as "0", means the response is already stale
+    expires = parse_http_date(headers["Expires"])
+    if expires is None:
+        return 0
+    date = parse_http_date(headers.get("Date"))
+    return max(int(expires - (time.time() if date is None else date)), 0)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check whether an If-None-Match header matches an entity tag, with the weak comparison."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque_tag(candidate) == _opaque_tag(etag) for candidate in if_none_match.split(","))
+
+
+def _opaque_tag(etag: str) -> str:
+    """Get an entity tag without its weakness indicator."""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def response_body(response: web.Response) -> bytes:
+    """Get the body of a response, as bytes."""
+    body = response.body
+    return bytes(body) if isinstance(body, (bytes, bytearray)) else b""
+
+
+class CachedResponse:  # pylint: disable=too-few-public-methods
+    """A response stored in the cache."""
+
+    def __init__(self, response: web.Response, expires_at: float, stored_at: float) -> None:
+        """
+        Initialize the cached response.
+
+        :param response: the response, whose body must be set.
+        :param expires_at: the time the response becomes stale.
+        :param stored_at: the time the response was stored.
+        """
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = CIMultiDict(response.headers)
+        self.body = bytes(response_body(response))
+        self.expires_at = expires_at
+        self.stored_at = stored_at
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Get the entity tag of the response."""
+        return self.headers.get("ETag")
+
+    def to_response(self, now: float) -> web.Response:
+        """Build a response from the cached one."""
+        headers = CIMultiDict(self.headers)
+        headers["Age"] = str(int(now - self.stored_at))
+        return web.Response(status=self.status, reason=self.reason, body=self.body, headers=headers)
+
+    def to_not_modified(self, now: float) -> web.Response:
+        """Build a 304 response for the cached response."""
+        headers = CIMultiDict(
+            (name, value) for name, value in self.headers.items() if name.lower() in NOT_MODIFIED_HEADERS
+        )
+        headers["Age"] = str(int(now - self.stored_at))
+        return web.Response(status=NOT_MODIFIED, reason="Not Modified", headers=headers)
+
+
+class ResponseCache:
+    """
+    Shared cache of the responses to GET requests, honouring the Cache-Control and ETag headers set by the skills.
+
+    Responses are stored when they are given a freshness lifetime for a shared cache, through `s-maxage`,
+    `max-age` or `Expires`, and are not marked `private`, `no-cache` or `no-store`. They are served without reaching
+    the agent until they become stale, and requests whose If-None-Match header matches the entity tag of a
+    fresh response are answered with a 304. Unsafe requests invalidate the responses cached for their path.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_body_size: int = 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param max_entries: the number of responses to cache, the cache is disabled if not positive.
+        :param max_body_size: the size of the largest body to cache.
+        :param clock: the clock the freshness is measured with.
+        """
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Check whether the cache is enabled."""
+        return self.max_entries > 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Get the statistics of the cache."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+    @staticmethod
+    def _key(http_request: BaseRequest) -> Tuple[str, str]:
+        """Get the key of the responses to a request."""
+        return http_request.path, http_request.query_string
+
+    @staticmethod
+    def _is_cacheable_request(http_request: BaseRequest) -> bool:
+        """Check whether the responses to a request may be cached, or served from the cache."""
+        return http_request.method in CACHEABLE_METHODS and "Authorization" not in http_request.headers
+
+    def lookup(self, http_request: BaseRequest) -> Optional[web.Response]:
+        """
+        Answer a request from the cache.
+
+        :param http_request: the request.
+        :return: the cached response, a 304 response, or None if the request must reach the agent.
+        """
+        if not self.enabled:
+            return None
+        if http_request.method not in SAFE_METHODS:
+            self.invalidate(http_request.path)
+            return None
+        if not self._is_cacheable_request(http_request):
+            return None
+        request_directives = parse_cache_control(http_request.headers.get("Cache-Control", ""))
+        if "no-cache" in request_directives or "no-store" in request_directives:
+            return None
+
+        key = self._key(http_request)
+        entry = self._entries.get(key)
+        now = self._clock()
+        if entry is None or entry.expires_at <= now:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if_none_match = http_request.headers.get("If-None-Match")
+        if if_none_match is not None and entry.etag is not None and etag_matches(if_none_match, entry.etag):
+            self.not_modified += 1
+            return entry.to_not_modified(now)
+        self.hits += 1
+        return entry.to_response(now)
+
+    def store(self, http_request: BaseRequest, response: web.Response) -> None:
+        """
+        Store the response to a request, if it is cacheable.
+
+        :param http_request: the request.
+        :param response: the response, before any content coding.
+        """
+        if (
+            not self.enabled
+            or not self._is_cacheable_request(http_request)
+            or response.status not in CACHEABLE_STATUSES
+            or "Content-Encoding" in response.headers
+            or "Set-Cookie" in response.headers
+            or len(response_body(response)) > self.max_body_size
+        ):
+            return
+        vary = {name.strip().lower() for name in response.headers.get("Vary", "").split(",") if name.strip()}
+        if vary - {"accept-encoding"}:
+            return
+        directives = parse_cache_control(response.headers.get("Cache-Control", ""))
+        if UNCACHEABLE_DIRECTIVES.intersection(directives):
+            return
+        lifetime = freshness_lifetime(directives, response.headers)
+        if lifetime <= 0:
+            return
+
+        now = self._clock()
+        key = self._key(http_request)
+        self._entries[key] = CachedResponse(response, now + lifetime, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, path: str) -> None:
+        """Remove the responses cached for a path, whatever their query."""
+        for key in [key for key in self._entries if key[0] == path]:
+            del self._entries[key]
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Negotiated compression of the responses of the http server."""
+
+import gzip
+import asyncio
+import hashlib
+from typing import Dict, Tuple, Callable, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+
+try:
+    import brotli  # type: ignore  # pylint: disable=import-error
+except ImportError:  # pragma: nocover
+    brotli = None
+
+
+GZIP = "gzip"
+BROTLI = "br"
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# the media types worth compressing, besides the text ones
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "application/manifest+json",
+        "image/svg+xml",
+    }
+)
+# statuses whose responses carry no body
+BODILESS_STATUSES = frozenset({204, 304})
+
+
+def _compress_gzip(body: bytes) -> bytes:
+    """Compress a body with gzip, deterministically."""
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_brotli(body: bytes) -> bytes:
+    """Compress a body with brotli."""
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {GZIP: _compress_gzip}
+if brotli is not None:  # pragma: nocover
+    COMPRESSORS[BROTLI] = _compress_brotli
+# the preferred encoding comes first
+PREFERENCE = (BROTLI, GZIP)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Choose the content coding of a response given the Accept-Encoding header of its request.
+
+    :param accept_encoding: the Accept-Encoding header.
+    :return: the supported encoding with the highest quality value, preferring brotli on ties, or `None`.
+    """
+    qualities: Dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    candidates = [
+        (qualities.get(encoding, wildcard), -rank, encoding)
+        for rank, encoding in enumerate(PREFERENCE)
+        if encoding in COMPRESSORS
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether a content type is worth compressing."""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def add_vary(response: web.StreamResponse, name: str) -> None:
+    """Add a header name to the Vary header of a response, merging it with the names already listed."""
+    names = [
+        value.strip() for header in response.headers.getall("Vary", []) for value in header.split(",") if value.strip()
+    ]
+    if "*" in names or name.lower() in (value.lower() for value in names):
+        return
+    response.headers["Vary"] = ", ".join(names + [name])
+
+
+class ResponseCompressor:
+    """
+    Compress the responses of the http server, according to the encodings accepted by the clients.
+
+    Compressed bodies are cached by content hash, so that repeated responses are not compressed again,
+    and bodies larger than the offload threshold are compressed in a thread pool, off the event loop.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 1024,
+        cache_size: int = 64,
+        offload_threshold: int = 64 * 1024,
+        max_workers: int = 2,
+    ) -> None:
+        """
+        Initialize the compressor.
+
+        :param threshold: the minimum body size to compress, compression is disabled if not positive.
+        :param cache_size: the number of compressed bodies to cache.
+        :param offload_threshold: the body size above which the compression runs in the thread pool.
+        :param max_workers: the number of threads of the pool.
+        """
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.offload_threshold = offload_threshold
+        self.max_workers = max_workers
+        self._cache: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress a body, reusing the cached result for an identical body.
+
+        :param body: the body.
+        :param encoding: the content coding.
+        :return: the compressed body.
+        """
+        key = (hashlib.sha256(body).digest(), encoding)
+        compressed = self._cache.get(key, None)
+        if compressed is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return compressed
+
+        self.cache_misses += 1
+        compressor = COMPRESSORS[encoding]
+        if len(body) > self.offload_threshold:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="http_server_compression")
+            compressed = await asyncio.get_running_loop().run_in_executor(self._executor, compressor, body)
+        else:
+            compressed = compressor(body)
+
+        if self.cache_size > 0:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+    async def compress_response(self, accept_encoding: str, response: web.Response) -> web.Response:
+        """
+        Compress a response in place, if its request accepts a supported encoding and it is worth it.
+
+        :param accept_encoding: the Accept-Encoding header of the request.
+        :param response: the response.
+        :return: the response.
+        """
+        body = response.body
+        if (
+            self.threshold <= 0
+            or not isinstance(body, (bytes, bytearray))
+            or len(body) < self.threshold
+            or response.status in BODILESS_STATUSES
+            or "Content-Encoding" in response.headers
+            or not is_compressible(response.headers.get("Content-Type", ""))
+        ):
+            return response
+
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return response
+
+        response.body = await self.compress(bytes(body), encoding)
+        response.headers["Content-Encoding"] = encoding
+        add_vary(response, "Accept-Encoding")
+        if "Content-Length" in response.headers:
+            response.headers["Content-Length"] = str(len(response.body))
+        return response
+
+    def close(self) -> None:
+        """Shut down the thread pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -20,13 +20,15 @@
 # ------------------------------------------------------------------------------
 """HTTP server connection, channel, server, and handler."""
 
+import os
 import ssl
-import email
 import asyncio
 import logging
+import tempfile
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, BinaryIO, Optional, Sequence, cast
 from asyncio import CancelledError
+from contextlib import suppress
 from textwrap import dedent
 from traceback import format_exc
 from urllib.parse import parse_qs, urlparse
@@ -35,56 +37,79 @@ from asyncio.futures import Future
 from concurrent.futures._base import CancelledError as FuturesCancelledError  # noqa
 
 from aiohttp import web
+from multidict import CIMultiDict
 from aea.common import Address
-from openapi_core import create_spec
 from aea.mail.base import Message, Envelope
 from aiohttp.web_request import BaseRequest
 from aea.connections.base import Connection, ConnectionStates
 from aea.configurations.base import PublicId
-from werkzeug.datastructures import (
-    ImmutableMultiDict,
-)  # pylint: disable=wrong-import-order
 from aea.protocols.dialogue.base import Dialogue as BaseDialogue, DialogueLabel
-from openapi_spec_validator.schemas import (
-    read_yaml_file,
-)  # pylint: disable=wrong-import-order
-from openapi_spec_validator.exceptions import (
-    OpenAPIValidationError,
-)  # pylint: disable=wrong-import-order
-from openapi_core.validation.request.datatypes import (
-    Headers,
-    OpenAPIRequest,
-    RequestParameters,
-)
-from openapi_core.validation.request.shortcuts import validate_request
-from openapi_core.validation.request.validators import RequestValidator
 
 from packages.eightballer.protocols.http.message import HttpMessage
 from packages.eightballer.protocols.http.dialogues import (
     HttpDialogue,
     HttpDialogues as BaseHttpDialogues,
 )
+from packages.eightballer.connections.http_common.headers import (
+    decode_headers,
+    encode_headers,
+)
+from packages.eightballer.connections.http_common.stateless_dialogues import StatelessDialoguesMixin
+from packages.eightballer.connections.http_server.cache import ResponseCache
+from packages.eightballer.connections.http_server.compression import ResponseCompressor
+
+
+if TYPE_CHECKING:  # pragma: nocover
+    from openapi_core.validation.request.datatypes import OpenAPIRequest
+    from openapi_core.validation.request.validators import RequestValidator
+
+    from packages.eightballer.connections.http_server.workers import FrontEndPool
+    from packages.eightballer.connections.http_server.validation import CompiledSpec
 
 
 SUCCESS = 200
 NOT_FOUND = 404
 REQUEST_TIMEOUT = 408
+PAYLOAD_TOO_LARGE = 413
 SERVER_ERROR = 500
+SERVICE_UNAVAILABLE = 503
 
 _default_logger = logging.getLogger("aea.packages.eightballer.connections.http_server")
 
 RequestId = DialogueLabel
 PUBLIC_ID = PublicId.from_str("eightballer/http_server:0.1.0")
 
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+# spooling is opt-in, since the skills must read the spooled bodies from their file
+DEFAULT_SPOOL_THRESHOLD: Optional[int] = None
+BODY_CHUNK_SIZE = 64 * 1024
+# the header carrying the path of a request body that was spooled to a file, instead of the body itself,
+# which is only ever set by the connection
+SPOOLED_BODY_HEADER = "X-Spooled-Body-Path"
+# the header the front-end workers forward the original url of a request with
+FORWARDED_URL_HEADER = "X-Forwarded-Url"
+
 
-class HttpDialogues(BaseHttpDialogues):
+class RequestBodyTooLarge(Exception):
+    """Error raised when the body of a request exceeds the maximum body size."""
+
+
+class HttpDialogues(StatelessDialoguesMixin, BaseHttpDialogues):
     """The dialogues class keeps track of all http dialogues."""
 
-    def __init__(self, self_address: Address, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        self_address: Address,
+        dialogue_ttl: float = 0.0,
+        dialogue_ring_size: int = 0,
+        **kwargs: Any,
+    ) -> None:
         """
         Initialize dialogues.
 
         :param self_address: address of the dialogues maintainer.
+        :param dialogue_ttl: the seconds after which dialogues without a response are expired, never if not positive.
+        :param dialogue_ring_size: the number of completed or expired dialogues to keep for debugging.
         :param kwargs: keyword arguments.
         """
 
@@ -106,6 +131,7 @@ class HttpDialogues(BaseHttpDialogues):
             role_from_first_message=role_from_first_message,
             **kwargs,
         )
+        StatelessDialoguesMixin.__init__(self, dialogue_ttl, dialogue_ring_size)
 
 
 def headers_to_string(headers: Dict) -> str:
@@ -116,15 +142,98 @@ def headers_to_string(headers: Dict) -> str:
 
     :return: str
     """
-    msg = email.message.Message()
-    for name, value in headers.items():
-        msg.add_header(name, value)
-    return msg.as_string()
+    return encode_headers(headers)
+
 
+class RequestParameters:
+    """The parameters of a request, as expected by an OpenAPI request."""
 
-class Request(OpenAPIRequest):
+    def __init__(self, query: Dict[str, List[str]], header: str = "") -> None:
+        """
+        Initialize the parameters.
+
+        :param query: the query string parameters.
+        :param header: the request headers, as a string.
+        """
+        self.query = query
+        self.header = header
+
+
+class Request:
     """Generic request object."""
 
+    def __init__(
+        self,
+        full_url_pattern: str,
+        method: str,
+        parameters: RequestParameters,
+        body: bytes,
+        mimetype: str,
+    ) -> None:
+        """
+        Initialize the request.
+
+        :param full_url_pattern: the url of the request.
+        :param method: the request method, as lowercase string.
+        :param parameters: the request parameters.
+        :param body: the request body.
+        :param mimetype: the content type, without parameters.
+        """
+        self.full_url_pattern = full_url_pattern
+        self.method = method
+        self.parameters = parameters
+        self.body = body
+        self.mimetype = mimetype
+        self.body_size = len(body)
+        # the file the body was spooled to, in which case `body` is empty
+        self.body_path: Optional[str] = None
+        self._id: Optional[RequestId] = None
+
+    def read_body(self) -> bytes:
+        """Get the body of the request, reading it back from its file if it was spooled."""
+        if self.body_path is None:
+            return self.body
+        with open(self.body_path, "rb") as body_file:
+            return body_file.read()
+
+    def cleanup(self) -> None:
+        """Remove the file the body was spooled to, if any."""
+        if self.body_path is not None:
+            with suppress(FileNotFoundError):
+                os.remove(self.body_path)
+            self.body_path = None
+
+    def __repr__(self) -> str:
+        """Get the string representation of the request."""
+        return (
+            f"Request(full_url_pattern={self.full_url_pattern!r}, method={self.method!r}, "
+            f"body={self.body!r}, mimetype={self.mimetype!r})"
+        )
+
+    def to_openapi_request(self) -> "OpenAPIRequest":
+        """Convert the request into an OpenAPI request, importing the validation dependencies on first use."""
+        # pylint: disable=import-outside-toplevel
+        from werkzeug.datastructures import ImmutableMultiDict
+        from openapi_core.validation.request.datatypes import (
+            Headers,
+            OpenAPIRequest,
+            RequestParameters as OpenAPIRequestParameters,
+        )
+
+        parameters = OpenAPIRequestParameters(
+            query=ImmutableMultiDict(self.parameters.query),
+            header=Headers([]),
+            cookie={},
+        )
+        parameters.header = self.parameters.header
+        return OpenAPIRequest(
+            full_url_pattern=self.full_url_pattern,
+            method=self.method,
+            parameters=parameters,
+            body=self.read_body(),
+            mimetype=self.mimetype,
+        )
+
     @property
     def is_id_set(self) -> bool:
         """Check if id is set."""
@@ -140,31 +249,87 @@ class Request(OpenAPIRequest):
         """Set the request id."""
         self._id = request_id
 
+    @staticmethod
+    async def _read_body(
+        http_request: BaseRequest,
+        max_body_size: int,
+        spool_threshold: Optional[int],
+    ) -> Tuple[bytes, int, Optional[str]]:
+        """
+        Stream the body of a request, enforcing the maximum body size while reading.
+
+        Bodies larger than the spool threshold are written to a temporary file instead of being kept in memory.
+
+        :param http_request: http_request
+        :param max_body_size: the maximum body size, unbounded if not positive.
+        :param spool_threshold: the size above which the body is spooled to a file, never spooled if None.
+        :return: the in-memory body, the body size and the path of the spooled body, if any.
+        """
+        content_length = http_request.content_length
+        if 0 < max_body_size < (content_length or 0):
+            raise RequestBodyTooLarge(f"Declared body size {content_length} exceeds {max_body_size} bytes.")
+
+        chunks: List[bytes] = []
+        size = 0
+        body_file: Optional[BinaryIO] = None
+        try:
+            async for chunk in http_request.content.iter_chunked(BODY_CHUNK_SIZE):
+                size += len(chunk)
+                if 0 < max_body_size < size:
+                    raise RequestBodyTooLarge(f"Body size exceeds {max_body_size} bytes.")
+                if body_file is None and spool_threshold is not None and size > spool_threshold:
+                    body_file = cast(
+                        BinaryIO, tempfile.NamedTemporaryFile(prefix="http_server_body_", delete=False)
+                    )
+                    body_file.writelines(chunks)
+                    chunks.clear()
+                if body_file is not None:
+                    body_file.write(chunk)
+                else:
+                    chunks.append(chunk)
+        except BaseException:
+            if body_file is not None:
+                body_file.close()
+                os.remove(body_file.name)
+            raise
+
+        if body_file is None:
+            return b"".join(chunks), size, None
+        body_file.close()
+        return b"", size, body_file.name
+
     @classmethod
-    async def create(cls, http_request: BaseRequest, extra_headers: Dict[str, str] = None) -> "Request":
+    async def create(
+        cls,
+        http_request: BaseRequest,
+        extra_headers: Dict[str, str] = None,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        spool_threshold: Optional[int] = DEFAULT_SPOOL_THRESHOLD,
+        url: Optional[str] = None,
+    ) -> "Request":
         """
         Create a request.
 
         :param http_request: http_request
+        :param extra_headers: headers to add to those of the request
+        :param max_body_size: the maximum body size, unbounded if not positive
+        :param spool_threshold: the body size above which the body is spooled to a temporary file, never if None
+        :param url: the url the request was originally sent to, if it was forwarded
         :return: a request
         """
         method = http_request.method.lower()
 
         parsed_path = urlparse(http_request.path_qs)
 
-        url = http_request.url
+        url = url or http_request.url
 
-        body = await http_request.read()
+        body, body_size, body_path = await cls._read_body(http_request, max_body_size, spool_threshold)
 
         mimetype = http_request.content_type
 
         query_params = parse_qs(parsed_path.query, keep_blank_values=True)
 
-        parameters = RequestParameters(
-            query=ImmutableMultiDict(query_params),
-            header=Headers([]),
-            cookie={},
-        )
+        parameters = RequestParameters(query=query_params)
 
         request = Request(
             full_url_pattern=str(url),
@@ -173,11 +338,18 @@ class Request(OpenAPIRequest):
             body=body,
             mimetype=mimetype,
         )
-        all_headers = dict(http_request.headers)
+        request.body_size = body_size
+        request.body_path = body_path
+        all_headers = CIMultiDict(http_request.headers)
+        all_headers.popall(FORWARDED_URL_HEADER, None)
+        # a client must not point the skill at a file of its choosing
+        all_headers.popall(SPOOLED_BODY_HEADER, None)
         if extra_headers:
             all_headers.update(extra_headers)
             del all_headers["Sec-Fetch-Mode"]
             del all_headers["Sec-Fetch-Site"]
+        if body_path is not None:
+            all_headers[SPOOLED_BODY_HEADER] = body_path
         request.parameters.header = headers_to_string(all_headers)
         return request
 
@@ -227,7 +399,7 @@ class Response(web.Response):
         """
         if http_message.performative == HttpMessage.Performative.RESPONSE:
             if http_message.is_set("headers") and http_message.headers:
-                headers: Optional[dict] = dict(email.message_from_string(http_message.headers).items())
+                headers: Optional[CIMultiDict] = decode_headers(http_message.headers)
             else:
                 headers = None
 
@@ -254,6 +426,7 @@ class APISpec:
         api_spec_path: Optional[str] = None,
         server: Optional[str] = None,
         logger: logging.Logger = _default_logger,
+        static_asset_extensions: Sequence[str] = (),
     ):
         """
         Initialize the API spec.
@@ -261,16 +434,29 @@ class APISpec:
         :param api_spec_path: Directory API path and filename of the API spec YAML source file.
         :param server: the server url
         :param logger: the logger
+        :param static_asset_extensions: the extensions of the static assets whose GET requests skip the verification.
         """
-        self._validator = None  # type: Optional[RequestValidator]
+        self._validator: Optional["RequestValidator"] = None
+        self._compiled_spec: Optional["CompiledSpec"] = None
         self.logger = logger
+        self.static_asset_extensions = tuple(extension.lower() for extension in static_asset_extensions)
         if api_spec_path is not None:
+            # the validation dependencies are heavy, so they are only loaded when a spec is configured
+            # pylint: disable=import-outside-toplevel
+            from openapi_core import create_spec
+            from openapi_spec_validator.schemas import read_yaml_file
+            from openapi_spec_validator.exceptions import OpenAPIValidationError
+            from openapi_core.validation.request.validators import RequestValidator as _RequestValidator
+
+            from packages.eightballer.connections.http_server.validation import CompiledSpec
+
             try:
                 api_spec_dict = read_yaml_file(api_spec_path)
                 if server is not None:
                     api_spec_dict["servers"].append({"url": server})
                 api_spec = create_spec(api_spec_dict)
-                self._validator = RequestValidator(api_spec)
+                self._validator = _RequestValidator(api_spec)
+                self._compiled_spec = CompiledSpec(api_spec_dict)
             except OpenAPIValidationError as error:
                 self.logger.error(f"API specification YAML source file not correctly formatted: {str(error)}")
             except Exception:
@@ -281,6 +467,9 @@ class APISpec:
         """
         Verify a http_method, url and param against the provided API spec.
 
+        Operations are validated with their compiled schemas, cached by (method, path template).
+        Operations using features which are not compiled fall back to the full openapi_core validation.
+
         :param request: the request object
         :return: whether or not the request conforms with the API spec
         """
@@ -288,8 +477,49 @@ class APISpec:
             self.logger.debug("Skipping API verification!")
             return True
 
+        # pylint: disable=import-outside-toplevel
+        from packages.eightballer.connections.http_server.validation import (
+            RequestValidationError,
+            is_static_asset,
+        )
+
+        path = urlparse(request.full_url_pattern).path
+        if request.method == "get" and is_static_asset(path, self.static_asset_extensions):
+            return True
+
+        compiled_spec = cast("CompiledSpec", self._compiled_spec)
+        try:
+            if compiled_spec.requires_fallback:
+                return self._verify_fully(request)
+            matched = compiled_spec.match(path)
+            if matched is None:
+                raise RequestValidationError(f"Path not found for {request.full_url_pattern}")
+            template, path_values = matched
+            operation = compiled_spec.operation(request.method, template)
+            if operation is None:
+                raise RequestValidationError(f"Operation {request.method} not found for {template}")
+            if operation.requires_fallback:
+                return self._verify_fully(request)
+            operation.validate(
+                path_values,
+                request.parameters.query,
+                request.body_size,
+                request.read_body,
+                request.mimetype,
+            )
+        except RequestValidationError:
+            self.logger.exception("APISpec verify error")
+            return False
+        return True
+
+    def _verify_fully(self, request: Request) -> bool:
+        """Verify a request with the full openapi_core validation."""
+        from openapi_core.validation.request.shortcuts import (  # pylint: disable=import-outside-toplevel
+            validate_request,
+        )
+
         try:
-            validate_request(self._validator, request)
+            validate_request(self._validator, request.to_openapi_request())
         except Exception:  # pragma: nocover # pylint: disable=broad-except
             self.logger.exception("APISpec verify error")
             return False
@@ -299,18 +529,20 @@ class APISpec:
 class BaseAsyncChannel(ABC):
     """Base asynchronous channel class."""
 
-    def __init__(self, address: Address, connection_id: PublicId) -> None:
+    def __init__(self, address: Address, connection_id: PublicId, max_queue_size: int = 0) -> None:
         """
         Initialize a channel.
 
         :param address: the address of the agent.
         :param connection_id: public id of connection using this channel.
+        :param max_queue_size: the maximum number of envelopes waiting in the in-queue, unbounded if not positive.
         """
         self._in_queue = None  # type: Optional[asyncio.Queue]
         self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
         self.is_stopped = True
         self.address = address
         self.connection_id = connection_id
+        self.max_queue_size = max_queue_size
 
     @abstractmethod
     async def connect(self, loop: AbstractEventLoop) -> None:
@@ -322,7 +554,7 @@ class BaseAsyncChannel(ABC):
         :param loop: asyncio event loop
         """
         self._loop = loop
-        self._in_queue = asyncio.Queue()
+        self._in_queue = asyncio.Queue(maxsize=max(self.max_queue_size, 0))
         self.is_stopped = False
 
     async def get_message(self) -> Optional["Envelope"]:
@@ -360,6 +592,15 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
     """A wrapper for an RESTful API with an internal HTTPServer."""
 
     RESPONSE_TIMEOUT = 150.0
+    COMPRESSION_THRESHOLD = 1024
+    COMPRESSION_CACHE_SIZE = 64
+    MAX_QUEUE_SIZE = 1000
+    MAX_PENDING_REQUESTS = 1000
+    RETRY_AFTER = 1
+    WORKERS = 0
+    # the interval at which the exited front-end workers are restarted
+    WORKER_CHECK_INTERVAL = 1.0
+    RESPONSE_CACHE_SIZE = 0
 
     def __init__(
         self,
@@ -373,6 +614,19 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
         logger: logging.Logger = _default_logger,
         ssl_cert_path: Optional[str] = None,
         ssl_key_path: Optional[str] = None,
+        static_asset_extensions: Sequence[str] = (),
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        max_pending_requests: int = MAX_PENDING_REQUESTS,
+        retry_after: int = RETRY_AFTER,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        spool_threshold: Optional[int] = DEFAULT_SPOOL_THRESHOLD,
+        compression_threshold: int = COMPRESSION_THRESHOLD,
+        compression_cache_size: int = COMPRESSION_CACHE_SIZE,
+        workers: int = WORKERS,
+        worker_socket_path: Optional[str] = None,
+        response_cache_size: int = RESPONSE_CACHE_SIZE,
+        dialogue_ttl: Optional[float] = None,
+        dialogue_ring_size: int = 0,
     ):
         """
         Initialize a channel and process the initial API specification from the file path (if given).
@@ -387,8 +641,38 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
         :param logger: the logger
         :param ssl_cert_path:  optional path to ssl certificate
         :param ssl_key_path: optional path to ssl key
+        :param static_asset_extensions: the extensions of the static assets whose GET requests skip the verification.
+        :param max_queue_size: the maximum number of requests waiting for the agent, unbounded if not positive.
+        :param max_pending_requests: the maximum number of requests waiting for a response, unbounded if not positive.
+        :param retry_after: the seconds after which rejected clients are told to retry.
+        :param max_body_size: the maximum size of a request body, unbounded if not positive.
+        :param spool_threshold: the body size above which request bodies are spooled to a temporary file, never if None.
+        :param compression_threshold: the minimum size of a response body to compress, disabled if not positive.
+        :param compression_cache_size: the number of compressed response bodies to cache.
+        :param workers: the number of front-end worker processes serving the port, none if not positive.
+        :param worker_socket_path: the unix socket the workers forward the requests on, a temporary one if not set.
+        :param response_cache_size: the number of cacheable GET responses to serve without the agent, none if not positive.
+        :param dialogue_ttl: the seconds after which dialogues without a response are expired, the timeout window if not set.
+        :param dialogue_ring_size: the number of completed or expired dialogues to keep for debugging.
         """
-        super().__init__(address=address, connection_id=connection_id)
+        super().__init__(address=address, connection_id=connection_id, max_queue_size=max_queue_size)
+        self.max_pending_requests = max_pending_requests
+        self.retry_after = retry_after
+        self.rejected_requests = 0
+        self.max_body_size = max_body_size
+        self.spool_threshold = spool_threshold
+        self.compression_threshold = compression_threshold
+        self.compression_cache_size = compression_cache_size
+        self._compressor = ResponseCompressor(compression_threshold, compression_cache_size)
+        self.workers = workers
+        self.worker_socket_path = worker_socket_path
+        # the private directory of the default worker socket, removed on disconnect
+        self._worker_socket_dir: Optional[str] = None
+        self.api_spec_path = api_spec_path
+        self.static_asset_extensions = tuple(static_asset_extensions)
+        self._front_end: Optional["FrontEndPool"] = None
+        self._front_end_supervisor: Optional[asyncio.Task] = None
+        self.response_cache = ResponseCache(response_cache_size)
         self.host = host
         self.port = port
         self.ssl_cert_path = ssl_cert_path
@@ -399,11 +683,15 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
         else:
             self.server_address = f"http://{self.host}:{self.port}"
 
-        self._api_spec = APISpec(api_spec_path, self.server_address, logger)
+        self._api_spec = APISpec(api_spec_path, self.server_address, logger, static_asset_extensions)
         self.timeout_window = timeout_window
-        self.http_server: Optional[web.TCPSite] = None
+        self.http_server: Optional[web.BaseSite] = None
         self.pending_requests: Dict[RequestId, Future] = {}
-        self._dialogues = HttpDialogues(str(HTTPServerConnection.connection_id))
+        self._dialogues = HttpDialogues(
+            str(HTTPServerConnection.connection_id),
+            dialogue_ttl=timeout_window if dialogue_ttl is None else dialogue_ttl,
+            dialogue_ring_size=dialogue_ring_size,
+        )
         self.logger = logger
 
     @property
@@ -411,6 +699,34 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
         """Get the api spec."""
         return self._api_spec
 
+    @property
+    def is_saturated(self) -> bool:
+        """Check whether the channel cannot admit any more requests."""
+        if self._in_queue is not None and self._in_queue.full():
+            return True
+        return 0 < self.max_pending_requests <= len(self.pending_requests)
+
+    @property
+    def queue_gauges(self) -> Dict[str, int]:
+        """Get the gauges of the in-queue and of the pending requests."""
+        return {
+            "in_queue_depth": 0 if self._in_queue is None else self._in_queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "pending_requests": len(self.pending_requests),
+            "max_pending_requests": self.max_pending_requests,
+            "rejected_requests": self.rejected_requests,
+        }
+
+    def _reject(self) -> Response:
+        """Reject a request because the channel is saturated."""
+        self.rejected_requests += 1
+        self.logger.warning(f"Rejecting request, the channel is saturated: {self.queue_gauges}")
+        return Response(
+            status=SERVICE_UNAVAILABLE,
+            reason="Service Unavailable",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
     async def connect(self, loop: AbstractEventLoop) -> None:
         """
         Connect.
@@ -438,16 +754,61 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
 
         :return: a tuple of response code and response description
         """
-        request = await Request.create(http_request)
+        return await self._handle_request(http_request)
+
+    async def _forwarded_handler(self, http_request: BaseRequest) -> Response:
+        """
+        Send a request forwarded by a front-end worker to the Agent as an envelope.
+
+        The worker already verified the request, and compresses the response.
+
+        :param http_request: the request object
+
+        :return: a tuple of response code and response description
+        """
+        return await self._handle_request(http_request, forwarded=True)
+
+    async def _handle_request(self, http_request: BaseRequest, forwarded: bool = False) -> Response:
+        """Handle a request, either received directly or forwarded by a front-end worker."""
+        # the forwarded requests are cached here too, so that unsafe requests invalidate the cache of every worker
+        cached_response = self.response_cache.lookup(http_request)
+        if cached_response is not None:
+            if forwarded:
+                return cached_response
+            return await self._compressor.compress_response(
+                http_request.headers.get("Accept-Encoding", ""), cached_response
+            )
+
+        # reject early, before reading the body, when the agent cannot keep up
+        if self.is_saturated:
+            return self._reject()
+
+        try:
+            request = await Request.create(
+                http_request,
+                max_body_size=self.max_body_size,
+                spool_threshold=self.spool_threshold,
+                url=http_request.headers.get(FORWARDED_URL_HEADER) if forwarded else None,
+            )
+        except RequestBodyTooLarge as error:
+            self.logger.warning(f"Rejecting request: {error}")
+            return Response(status=PAYLOAD_TOO_LARGE, reason="Payload Too Large")
         if self._in_queue is None:  # pragma: nocover
+            request.cleanup()
             raise ValueError("Channel not connected!")
 
-        is_valid_request = self.api_spec.verify(request)
+        is_valid_request = forwarded or self.api_spec.verify(request)
 
         if not is_valid_request:
+            request.cleanup()
             self.logger.warning(f"request is not valid: {request}")
             return Response(status=NOT_FOUND, reason="Request Not Found")
 
+        # the agent may have fallen behind while the body was read
+        if self.is_saturated:
+            request.cleanup()
+            return self._reject()
+
         try:
             # turn request into envelope
             envelope = request.to_envelope_and_set_id(self._dialogues, self.target_skill_id)
@@ -455,7 +816,7 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
             self.pending_requests[request.id] = Future()
 
             # send the envelope to the agent's inbox (via self.in_queue)
-            await self._in_queue.put(envelope)
+            self._in_queue.put_nowait(envelope)
             # wait for response envelope within given timeout window (self.timeout_window)
             # to appear in dispatch_ready_envelopes
 
@@ -463,7 +824,11 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
                 self.pending_requests[request.id],
                 timeout=self.timeout_window,
             )
-            return Response.from_message(response_message)
+            response = Response.from_message(response_message)
+            self.response_cache.store(http_request, response)
+            if forwarded:
+                return response
+            return await self._compressor.compress_response(http_request.headers.get("Accept-Encoding", ""), response)
 
         except asyncio.TimeoutError:
             self.logger.warning(
@@ -481,9 +846,14 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
         finally:
             if request.is_id_set:
                 self.pending_requests.pop(request.id, None)
+            # the skill is done with the spooled body once it responded, or the request timed out
+            request.cleanup()
 
     async def _start_http_server(self) -> None:
         """Start http server."""
+        if self.workers > 0:
+            await self._start_front_end()
+            return
         server = web.Server(self._http_handler)
         runner = web.ServerRunner(server)
         await runner.setup()
@@ -494,6 +864,70 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
         self.http_server = web.TCPSite(runner, self.host, self.port, ssl_context=ssl_context)
         await self.http_server.start()
 
+    async def _start_front_end(self) -> None:
+        """Serve the forwarded requests on a unix socket only the agent can access, then spawn the front-end workers."""
+        # pylint: disable=import-outside-toplevel
+        from packages.eightballer.connections.http_server.workers import (
+            FrontEndPool,
+            FrontEndConfig,
+            default_socket_path,
+        )
+
+        socket_path = self.worker_socket_path
+        if socket_path is None:
+            socket_path = default_socket_path(self.port)
+            self._worker_socket_dir = os.path.dirname(socket_path)
+        with suppress(FileNotFoundError):
+            os.remove(socket_path)
+        runner = web.ServerRunner(web.Server(self._forwarded_handler))
+        await runner.setup()
+        self.http_server = web.UnixSite(runner, socket_path)
+        await self.http_server.start()
+        os.chmod(socket_path, 0o600)
+        self.worker_socket_path = socket_path
+
+        config = FrontEndConfig(
+            host=self.host,
+            port=self.port,
+            socket_path=socket_path,
+            server_address=self.server_address,
+            timeout_window=self.timeout_window,
+            api_spec_path=self.api_spec_path,
+            ssl_cert_path=self.ssl_cert_path,
+            ssl_key_path=self.ssl_key_path,
+            static_asset_extensions=self.static_asset_extensions,
+            max_body_size=self.max_body_size,
+            spool_threshold=self.spool_threshold,
+            compression_threshold=self.compression_threshold,
+            compression_cache_size=self.compression_cache_size,
+        )
+        front_end = FrontEndPool(config, self.workers, self.logger)
+        try:
+            await front_end.start()
+        except RuntimeError:
+            await self._stop_forwarded_server()
+            raise
+        self._front_end = front_end
+        self._front_end_supervisor = asyncio.ensure_future(self._supervise_front_end())
+
+    async def _supervise_front_end(self) -> None:
+        """Restart the front-end workers which exited, until the channel disconnects."""
+        while self._front_end is not None:
+            await asyncio.sleep(self.WORKER_CHECK_INTERVAL)
+            self._front_end.restart_dead()
+
+    async def _stop_forwarded_server(self) -> None:
+        """Stop serving the forwarded requests, removing the unix socket and its private directory."""
+        await cast(web.BaseSite, self.http_server).stop()
+        if self.worker_socket_path is not None:
+            with suppress(FileNotFoundError):
+                os.remove(self.worker_socket_path)
+        if self._worker_socket_dir is not None:
+            with suppress(OSError):
+                os.rmdir(self._worker_socket_dir)
+            self._worker_socket_dir = None
+            self.worker_socket_path = None
+
     def send(self, envelope: Envelope) -> None:
         """
         Send the envelope in_queue.
@@ -533,7 +967,17 @@ class HTTPChannel(BaseAsyncChannel):  # pylint: disable=too-many-instance-attrib
             raise ValueError("Server not connected, call connect first!")
 
         if not self.is_stopped:
-            await self.http_server.stop()
+            if self._front_end_supervisor is not None:
+                self._front_end_supervisor.cancel()
+                self._front_end_supervisor = None
+            if self._front_end is not None:
+                await self._front_end.stop()
+                self._front_end = None
+            if self.workers > 0:
+                await self._stop_forwarded_server()
+            else:
+                await self.http_server.stop()
+            self._compressor.close()
             self.logger.info(f"HTTP Server has shutdown on port: {self.port}.")
             self.is_stopped = True
             self._in_queue = None
@@ -572,6 +1016,27 @@ class HTTPServerConnection(Connection):
             logger=self.logger,
             ssl_cert_path=ssl_cert_path,
             ssl_key_path=ssl_key_path,
+            static_asset_extensions=self.configuration.config.get("static_asset_extensions", None) or (),
+            max_queue_size=self.configuration.config.get("max_queue_size", HTTPChannel.MAX_QUEUE_SIZE),
+            max_pending_requests=self.configuration.config.get(
+                "max_pending_requests", HTTPChannel.MAX_PENDING_REQUESTS
+            ),
+            retry_after=self.configuration.config.get("retry_after", HTTPChannel.RETRY_AFTER),
+            max_body_size=self.configuration.config.get("max_body_size", DEFAULT_MAX_BODY_SIZE),
+            spool_threshold=self.configuration.config.get("spool_threshold", DEFAULT_SPOOL_THRESHOLD),
+            compression_threshold=self.configuration.config.get(
+                "compression_threshold", HTTPChannel.COMPRESSION_THRESHOLD
+            ),
+            compression_cache_size=self.configuration.config.get(
+                "compression_cache_size", HTTPChannel.COMPRESSION_CACHE_SIZE
+            ),
+            workers=self.configuration.config.get("workers", HTTPChannel.WORKERS),
+            worker_socket_path=self.configuration.config.get("worker_socket_path", None),
+            response_cache_size=self.configuration.config.get(
+                "response_cache_size", HTTPChannel.RESPONSE_CACHE_SIZE
+            ),
+            dialogue_ttl=self.configuration.config.get("dialogue_ttl", None),
+            dialogue_ring_size=self.configuration.config.get("dialogue_ring_size", 0),
         )
 
     async def connect(self) -> None:
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+Entrypoint of the front-end worker processes.
+
+The AEA packages are loaded by the agent from their directories, so they cannot be imported by name in a spawned
+process. This module only imports the standard library and aea: the workers run it from its file path, load the
+AEA packages of the agent from their directories, and only then import and run the worker.
+"""
+
+import sys
+from typing import Any, Dict, List, Tuple
+from pathlib import Path
+
+from aea.components.base import perform_load_aea_package
+
+
+# the global the arguments of the worker are passed in, as the module is run from its file path
+WORKER_ARGS = "worker_args"
+
+
+def main(aea_packages: List[Tuple[str, str, str, str]], config: Dict[str, Any], ready: Any) -> None:
+    """
+    Load the AEA packages of the agent, then run a front-end worker.
+
+    :param aea_packages: the directory, author, type and name of the AEA packages loaded by the agent.
+    :param config: the fields of the configuration of the worker.
+    :param ready: the event the worker sets once it serves the port.
+    """
+    for directory, author, package_type_plural, name in aea_packages:
+        if f"packages.{author}.{package_type_plural}.{name}" not in sys.modules:
+            perform_load_aea_package(Path(directory), author, package_type_plural, name)
+
+    # pylint: disable=import-outside-toplevel
+    from packages.eightballer.connections.http_server.workers import FrontEndConfig, run_worker
+
+    run_worker(FrontEndConfig(**config), ready)
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main(**globals()[WORKER_ARGS])
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the edge response cache of the HTTP Server connection."""
+
+from typing import Dict, Optional
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from packages.eightballer.connections.http_server.cache import (
+    ResponseCache,
+    etag_matches,
+    freshness_lifetime,
+    parse_cache_control,
+)
+
+
+PATH = "/api/agent-info"
+BODY = b'{"service_id": "idriss"}'
+
+
+class Clock:  # pylint: disable=too-few-public-methods
+    """A clock the tests move forward by hand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+def request(method: str = "GET", path: str = PATH, headers: Optional[Dict[str, str]] = None) -> web.BaseRequest:
+    """Make a request."""
+    return make_mocked_request(method, path, headers=headers or {})
+
+
+def response(cache_control: str, status: int = 200, **headers: str) -> web.Response:
+    """Make a response of the skill."""
+    return web.Response(status=status, body=BODY, headers={"Cache-Control": cache_control, **headers})
+
+
+def test_parse_cache_control() -> None:
+    """Test the parsing of the Cache-Control directives."""
+    assert parse_cache_control('Public, max-age=60, no-cache="Set-Cookie"') == {
+        "public": None,
+        "max-age": "60",
+        "no-cache": "Set-Cookie",
+    }
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [('"a"', True), ('W/"a"', True), ('"b", "a"', True), ("*", True), ('"b"', False)],
+)
+def test_etag_matches(if_none_match: str, expected: bool) -> None:
+    """Test the weak comparison of the entity tags."""
+    assert etag_matches(if_none_match, '"a"') is expected
+
+
+def test_freshness_lifetime_from_expires() -> None:
+    """Test that Expires gives the freshness lifetime relative to the Date, unless max-age is set."""
+    headers = {"Date": "Wed, 21 Oct 2015 07:28:00 GMT", "Expires": "Wed, 21 Oct 2015 07:29:00 GMT"}
+    assert freshness_lifetime({}, headers) == 60
+    assert freshness_lifetime({"max-age": "10"}, headers) == 10
+    assert freshness_lifetime({}, {**headers, "Expires": "0"}) == 0
+    assert freshness_lifetime({}, {**headers, "Expires": "Wed, 21 Oct 2015 07:27:00 GMT"}) == 0
+    assert freshness_lifetime({}, {}) == 0
+
+
+def test_fresh_responses_are_served_until_stale() -> None:
+    """Test that the responses with a freshness lifetime are served from the cache until they become stale."""
+    clock = Clock()
+    cache = ResponseCache(8, clock=clock)
+    assert cache.lookup(request()) is None
+    cache.store(request(), response("public, max-age=10"))
+
+    clock.now = 5.0
+    cached = cache.lookup(request())
+    assert cached is not None
+    assert (cached.status, cached.body, cached.headers["Age"]) == (200, BODY, "5")
+
+    clock.now = 10.0
+    assert cache.lookup(request()) is None
+    assert cache.stats == {"entries": 0, "hits": 1, "misses": 2, "not_modified": 0}
+
+
+def test_if_none_match_is_answered_with_304() -> None:
+    """Test that a request whose If-None-Match matches the cached entity tag is answered with a 304."""
+    cache = ResponseCache(8)
+    cache.store(request(), response("max-age=60", ETag='"v1"'))
+
+    cached = cache.lookup(request(headers={"If-None-Match": '"v1"'}))
+    assert cached is not None
+    assert cached.status == 304 and not cached.body
+    assert cached.headers["ETag"] == '"v1"'
+
+    cached = cache.lookup(request(headers={"If-None-Match": '"v0"'}))
+    assert cached is not None and cached.status == 200
+
+
+def test_304_keeps_the_headers_whatever_their_case() -> None:
+    """Test that the headers sent along a 304 are selected whatever the case the skill used for their names."""
+    cache = ResponseCache(8)
+    cache.store(request(), response("max-age=60", etag='"v1"', **{"content-location": PATH, "x-request-id": "1"}))
+
+    cached = cache.lookup(request(headers={"If-None-Match": '"v1"'}))
+    assert cached is not None and cached.status == 304
+    assert cached.headers["ETag"] == '"v1"'
+    assert cached.headers["Content-Location"] == PATH
+    assert "X-Request-Id" not in cached.headers
+
+
+@pytest.mark.parametrize(
+    "stored",
+    [
+        response("no-store, max-age=60"),
+        response("private, max-age=60"),
+        response("public"),
+        response("max-age=60", status=404),
+        response("max-age=60", Vary="Cookie"),
+        response("max-age=60", **{"Set-Cookie": "session=1"}),
+    ],
+)
+def test_uncacheable_responses_are_not_stored(stored: web.Response) -> None:
+    """Test that the responses which are not cacheable by a shared cache are not stored."""
+    cache = ResponseCache(8)
+    cache.store(request(), stored)
+    assert cache.lookup(request()) is None
+
+
+def test_requests_bypassing_the_cache() -> None:
+    """Test that authorized and no-cache requests are not answered from the cache."""
+    cache = ResponseCache(8)
+    cache.store(request(), response("max-age=60"))
+    assert cache.lookup(request(headers={"Authorization": "Bearer token"})) is None
+    assert cache.lookup(request(headers={"Cache-Control": "no-cache"})) is None
+    assert cache.lookup(request()) is not None
+
+
+def test_unsafe_requests_invalidate_the_path() -> None:
+    """Test that an unsafe request invalidates the responses cached for its path, whatever their query."""
+    cache = ResponseCache(8)
+    cache.store(request(path=f"{PATH}?page=1"), response("max-age=60"))
+    cache.store(request(path="/other"), response("max-age=60"))
+    assert cache.lookup(request("POST")) is None
+
+    assert cache.lookup(request(path=f"{PATH}?page=1")) is None
+    assert cache.lookup(request(path="/other")) is not None
+
+
+def test_least_recently_used_responses_are_evicted() -> None:
+    """Test that the cache keeps the most recently used responses, and is disabled without entries."""
+    cache = ResponseCache(1)
+    cache.store(request(path="/a"), response("max-age=60"))
+    cache.store(request(path="/b"), response("max-age=60"))
+    assert cache.lookup(request(path="/a")) is None
+    assert cache.lookup(request(path="/b")) is not None
+
+    cache = ResponseCache(0)
+    cache.store(request(), response("max-age=60"))
+    assert cache.lookup(request()) is None
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the response compression of the HTTP Server connection."""
+
+import gzip
+import json
+from typing import Optional
+
+import pytest
+from aiohttp import web
+
+from packages.eightballer.connections.http_server.compression import (
+    GZIP,
+    BROTLI,
+    COMPRESSORS,
+    ResponseCompressor,
+    is_compressible,
+    negotiate_encoding,
+)
+
+
+BODY = json.dumps([{"text": "gm", "engagement": index} for index in range(100)]).encode()
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", GZIP),
+        ("gzip;q=0", None),
+        ("*", BROTLI if BROTLI in COMPRESSORS else GZIP),
+        ("deflate, gzip;q=0.5", GZIP),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, expected: Optional[str]) -> None:
+    """Test the negotiation of the content coding."""
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_is_compressible() -> None:
+    """Test the detection of the compressible content types."""
+    assert is_compressible("application/json; charset=utf-8")
+    assert is_compressible("text/html")
+    assert is_compressible("application/problem+json")
+    assert not is_compressible("image/png")
+
+
+@pytest.mark.asyncio
+async def test_compress_response() -> None:
+    """Test that a large compressible response is compressed with gzip."""
+    compressor = ResponseCompressor(threshold=16)
+    response = web.Response(body=BODY, headers={"Content-Type": "application/json"})
+    response = await compressor.compress_response("gzip", response)
+
+    assert response.headers["Content-Encoding"] == GZIP
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.body) == BODY
+
+
+@pytest.mark.parametrize(
+    "vary, expected",
+    [
+        ("Origin", "Origin, Accept-Encoding"),
+        ("Origin, accept-encoding", "Origin, accept-encoding"),
+        ("*", "*"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_vary_is_merged(vary: str, expected: str) -> None:
+    """Test that Accept-Encoding is merged into an existing Vary header instead of duplicating it."""
+    compressor = ResponseCompressor(threshold=16)
+    response = web.Response(body=BODY, headers={"Content-Type": "application/json", "Vary": vary})
+    response = await compressor.compress_response("gzip", response)
+
+    assert response.headers.getall("Vary") == [expected]
+
+
+@pytest.mark.asyncio
+async def test_small_or_binary_responses_are_not_compressed() -> None:
+    """Test that responses under the threshold or of binary types are sent as they are."""
+    compressor = ResponseCompressor(threshold=len(BODY) + 1)
+    response = await compressor.compress_response(
+        "gzip", web.Response(body=BODY, headers={"Content-Type": "application/json"})
+    )
+    assert "Content-Encoding" not in response.headers
+
+    compressor = ResponseCompressor(threshold=16)
+    response = await compressor.compress_response(
+        "gzip", web.Response(body=BODY, headers={"Content-Type": "image/png"})
+    )
+    assert response.body == BODY
+
+
+@pytest.mark.asyncio
+async def test_compressed_bodies_are_cached() -> None:
+    """Test that identical bodies are compressed once, including the ones compressed off-loop."""
+    compressor = ResponseCompressor(threshold=16, offload_threshold=16)
+    first = await compressor.compress(BODY, GZIP)
+    second = await compressor.compress(BODY, GZIP)
+    compressor.close()
+
+    assert first is second
+    assert (compressor.cache_misses, compressor.cache_hits) == (1, 1)
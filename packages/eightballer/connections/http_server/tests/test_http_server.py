@@ -44,7 +44,10 @@ from packages.eightballer.protocols.http.dialogues import (
     HttpDialogue,
     HttpDialogues as BaseHttpDialogues,
 )
+from packages.eightballer.connections.http_server.cache import ResponseCache
+from packages.eightballer.connections.http_common.headers import decode_headers
 from packages.eightballer.connections.http_server.connection import (
+    SPOOLED_BODY_HEADER,
     APISpec,
     Response,
     HTTPServerConnection,
@@ -362,6 +365,116 @@ class TestHTTPServer:
 
         assert response.status == 408 and response.reason == "Request Timeout" and await response.text() == ""
 
+    @pytest.mark.asyncio
+    async def test_get_503_when_saturated(self):
+        """Test that requests are rejected with 503 once the in-queue is full."""
+        channel = self.http_connection.channel
+        channel.timeout_window = 0.5
+        channel._in_queue = asyncio.Queue(maxsize=1)  # pylint: disable=protected-access
+        first = self.loop.create_task(self.request("get", "/pets"))
+        await asyncio.sleep(0.2)
+        response = await self.request("get", "/pets")
+
+        assert response.status == 503 and response.reason == "Service Unavailable"
+        assert response.headers["Retry-After"] == str(channel.retry_after)
+        assert channel.queue_gauges["in_queue_depth"] == 1
+        assert channel.queue_gauges["rejected_requests"] == 1
+        assert (await first).status == 408
+
+    @pytest.mark.asyncio
+    async def test_get_served_from_cache(self):
+        """Test that cacheable GET responses are served again without reaching the agent."""
+        channel = self.http_connection.channel
+        channel.response_cache = ResponseCache(8)
+        request_task = self.loop.create_task(self.request("get", "/pets"))
+        envelope = await asyncio.wait_for(self.http_connection.receive(), timeout=20)
+        incoming_message, dialogue = self._get_message_and_dialogue(envelope)
+        message = dialogue.reply(
+            target_message=incoming_message,
+            performative=HttpMessage.Performative.RESPONSE,
+            version=incoming_message.version,
+            status_code=200,
+            status_text="Success",
+            headers='Cache-Control: max-age=60\r\nETag: "v1"',
+            body=b"Response body",
+        )
+        await self.http_connection.send(
+            Envelope(to=envelope.sender, sender=envelope.to, context=envelope.context, message=message)
+        )
+        assert (await asyncio.wait_for(request_task, timeout=20)).status == 200
+
+        response = await self.request("get", "/pets")
+        assert response.status == 200 and await response.text() == "Response body"
+        response = await self.request("get", "/pets", headers={"If-None-Match": '"v1"'})
+        assert response.status == 304
+        assert channel.response_cache.stats["hits"] == 1
+        assert channel.response_cache.stats["not_modified"] == 1
+        assert channel._in_queue.empty()  # pylint: disable=protected-access
+
+    @pytest.mark.asyncio
+    async def test_post_413(self):
+        """Test that bodies larger than the maximum body size are rejected while reading."""
+        self.http_connection.channel.max_body_size = 8
+        response = await self.request("post", "/pets", data=b"x" * 64)
+
+        assert response.status == 413 and response.reason == "Payload Too Large"
+
+    @pytest.mark.asyncio
+    async def test_post_spooled_body(self):
+        """Test that bodies larger than the spool threshold reach the skill as a file."""
+        self.http_connection.channel.spool_threshold = 8
+        self.http_connection.channel.timeout_window = 2
+        request_task = self.loop.create_task(self.request("post", "/pets", data=b"x" * 64))
+        envelope = await asyncio.wait_for(self.http_connection.receive(), timeout=20)
+        incoming_message, dialogue = self._get_message_and_dialogue(envelope)
+        body_path = decode_headers(incoming_message.headers)[SPOOLED_BODY_HEADER]
+
+        assert incoming_message.body == b""
+        with open(body_path, "rb") as body_file:
+            assert body_file.read() == b"x" * 64
+
+        message = dialogue.reply(
+            target_message=incoming_message,
+            performative=HttpMessage.Performative.RESPONSE,
+            version=incoming_message.version,
+            status_code=201,
+            status_text="Created",
+            body=b"",
+        )
+        await self.http_connection.send(
+            Envelope(to=envelope.sender, sender=envelope.to, context=envelope.context, message=message)
+        )
+        response = await asyncio.wait_for(request_task, timeout=20)
+
+        assert response.status == 201
+        assert not os.path.exists(body_path)
+
+    @pytest.mark.asyncio
+    async def test_post_body_kept_in_memory(self):
+        """Test that bodies are not spooled by default, and that a spooled body path sent by the client is dropped."""
+        self.http_connection.channel.timeout_window = 2
+        request_task = self.loop.create_task(
+            self.request("post", "/pets", data=b"x" * 64, headers={SPOOLED_BODY_HEADER: "/etc/passwd"})
+        )
+        envelope = await asyncio.wait_for(self.http_connection.receive(), timeout=20)
+        incoming_message, dialogue = self._get_message_and_dialogue(envelope)
+
+        assert incoming_message.body == b"x" * 64
+        assert SPOOLED_BODY_HEADER not in decode_headers(incoming_message.headers)
+
+        message = dialogue.reply(
+            target_message=incoming_message,
+            performative=HttpMessage.Performative.RESPONSE,
+            version=incoming_message.version,
+            status_code=201,
+            status_text="Created",
+            body=b"",
+        )
+        await self.http_connection.send(
+            Envelope(to=envelope.sender, sender=envelope.to, context=envelope.context, message=message)
+        )
+        assert (await asyncio.wait_for(request_task, timeout=20)).status == 201
+
     @pytest.mark.asyncio
     async def test_send_connection_drop(self):
         """Test unexpected response."""
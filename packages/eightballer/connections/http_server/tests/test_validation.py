@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the compiled request validation of the HTTP Server connection."""
+
+import os
+from typing import Dict, List, Optional
+
+import pytest
+
+from packages.eightballer.connections.http_server.connection import (
+    APISpec,
+    Request,
+    RequestParameters,
+)
+
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+API_SPEC_PATH = os.path.join(ROOT_DIR, "tests", "data", "petstore_sim.yaml")
+SERVER = "http://127.0.0.1:8000"
+
+
+def make_request(
+    path: str,
+    method: str = "get",
+    query: Optional[Dict[str, List[str]]] = None,
+) -> Request:
+    """Make a request to the test server."""
+    return Request(
+        full_url_pattern=f"{SERVER}{path}",
+        method=method,
+        parameters=RequestParameters(query=query or {}),
+        body=b"",
+        mimetype="text/plain",
+    )
+
+
+@pytest.mark.parametrize(
+    "request_, expected",
+    [
+        (make_request("/pets"), True),
+        (make_request("/pets", query={"limit": ["10"]}), True),
+        (make_request("/pets", query={"limit": ["ten"]}), False),
+        (make_request("/pets/1"), True),
+        (make_request("/pets/1", method="post"), False),
+        (make_request("/pets", method="post"), True),
+        (make_request("/unknown"), False),
+    ],
+)
+def test_compiled_validation_matches_full_validation(request_: Request, expected: bool) -> None:
+    """Test that the compiled validation agrees with the full openapi_core validation."""
+    api_spec = APISpec(API_SPEC_PATH, SERVER)
+    assert api_spec.verify(request_) is expected
+    assert api_spec._verify_fully(request_) is expected  # pylint: disable=protected-access
+
+
+def test_operations_are_cached() -> None:
+    """Test that operations are compiled once per (method, path template)."""
+    api_spec = APISpec(API_SPEC_PATH, SERVER)
+    assert api_spec.verify(make_request("/pets/1"))
+    compiled_spec = api_spec._compiled_spec  # pylint: disable=protected-access
+    operation = compiled_spec.operation("get", "/pets/{petId}")
+    assert api_spec.verify(make_request("/pets/2"))
+    assert compiled_spec.operation("get", "/pets/{petId}") is operation
+
+
+def test_static_asset_bypass() -> None:
+    """Test that static asset GETs skip the verification only when configured."""
+    assert not APISpec(API_SPEC_PATH, SERVER).verify(make_request("/static/app.js"))
+    api_spec = APISpec(API_SPEC_PATH, SERVER, static_asset_extensions=[".js", ".css"])
+    assert api_spec.verify(make_request("/static/app.js"))
+    assert not api_spec.verify(make_request("/static/app.js", method="post"))
+
+
+SECURED_API_SPEC_PATH = os.path.join(ROOT_DIR, "tests", "data", "petstore_secured.yaml")
+
+
+@pytest.mark.parametrize(
+    "request_, expected",
+    [
+        (make_request("/pets/1"), False),
+        (make_request("/pets/1", query={"api_key": ["secret"]}), True),
+    ],
+)
+def test_security_requirements_use_full_validation(request_: Request, expected: bool) -> None:
+    """Test that the operations declaring security requirements are fully validated."""
+    api_spec = APISpec(SECURED_API_SPEC_PATH, SERVER)
+    assert api_spec.verify(request_) is expected
+    compiled_spec = api_spec._compiled_spec  # pylint: disable=protected-access
+    assert compiled_spec.operation("get", "/pets/{petId}").requires_fallback
+    assert not compiled_spec.operation("get", "/pets").requires_fallback
+
+
+@pytest.mark.parametrize(
+    "request_, expected",
+    [
+        (make_request("/pets", query={"since": ["2024-01-01T00:00:00Z"]}), True),
+        (make_request("/pets", query={"since": ["yesterday"]}), False),
+    ],
+)
+def test_compiled_validation_checks_formats(request_: Request, expected: bool) -> None:
+    """Test that the compiled validation checks the formats as the full validation does."""
+    api_spec = APISpec(SECURED_API_SPEC_PATH, SERVER)
+    assert api_spec.verify(request_) is expected
+    assert api_spec._verify_fully(request_) is expected  # pylint: disable=protected-access
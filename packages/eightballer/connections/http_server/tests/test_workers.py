@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the front-end workers of the HTTP Server connection."""
+
+# pylint: disable=W0201
+import os
+import gzip
+import socket
+import asyncio
+from typing import Tuple, cast
+from unittest.mock import MagicMock
+
+import pytest
+import aiohttp
+from aea.mail.base import Envelope
+from aea.identity.base import Identity
+from aea.test_tools.network import get_host, get_unused_tcp_port
+from aea.configurations.base import ConnectionConfig
+
+from packages.eightballer.protocols.http.message import HttpMessage
+from packages.eightballer.protocols.http.dialogues import HttpDialogue
+from packages.eightballer.connections.http_server.workers import aea_packages, forwardable_headers
+from packages.eightballer.connections.http_server.connection import HTTPServerConnection
+from packages.eightballer.connections.http_server.tests.test_http_server import (
+    ROOT_DIR,
+    HttpDialogues,
+)
+
+
+WORKERS = 2
+STARTUP_TIMEOUT = 10.0
+
+
+def test_forwardable_headers() -> None:
+    """Test that the hop-by-hop headers are not forwarded."""
+    headers = {"Connection": "keep-alive", "Content-Length": "3", "Accept": "*/*", "Transfer-Encoding": "chunked"}
+    assert forwardable_headers(headers) == [("Accept", "*/*")]
+
+
+def test_aea_packages() -> None:
+    """Test that the loaded AEA packages are listed with their directories, for the spawned workers to load them."""
+    loaded = {(os.path.normpath(directory), *package) for directory, *package in aea_packages()}
+    assert (os.path.normpath(ROOT_DIR), "eightballer", "connections", "http_server") in loaded
+
+
+def make_connection(host: str, port: int, workers: int = WORKERS) -> HTTPServerConnection:
+    """Make a http server connection served by front-end workers."""
+    configuration = ConnectionConfig(
+        host=host,
+        port=port,
+        target_skill_id="some_author/some_skill:0.1.0",
+        api_spec_path=os.path.join(ROOT_DIR, "tests", "data", "petstore_sim.yaml"),
+        compression_threshold=16,
+        response_cache_size=8,
+        workers=workers,
+        connection_id=HTTPServerConnection.connection_id,
+        restricted_to_protocols={HttpMessage.protocol_id},
+    )
+    return HTTPServerConnection(
+        configuration=configuration,
+        data_dir=MagicMock(),
+        identity=Identity("name", address="my_key", public_key="my_public_key"),
+    )
+
+
+def test_connect_fails_when_the_workers_cannot_serve_the_port() -> None:
+    """Test that the connection fails, and cleans up, when the workers exit before serving the port."""
+    host, port = get_host(), get_unused_tcp_port()
+    # a socket without SO_REUSEPORT keeps the workers from binding the port
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as taken:
+        taken.bind((host, port))
+        taken.listen()
+        http_connection = make_connection(host, port, workers=1)
+        asyncio.get_event_loop().run_until_complete(http_connection.connect())
+
+        assert http_connection.is_disconnected
+        assert http_connection.channel.worker_socket_path is None
+
+
+@pytest.mark.asyncio
+class TestFrontEndWorkers:
+    """Tests for the HTTPServer connection with front-end workers."""
+
+    def setup(self):
+        """Initialise the test case."""
+        self.host = get_host()
+        self.port = get_unused_tcp_port()
+        self.target_skill_id = "some_author/some_skill:0.1.0"
+        self.http_connection = make_connection(self.host, self.port)
+        self.loop = asyncio.get_event_loop()
+        self.loop.run_until_complete(self.http_connection.connect())
+        self._dialogues = HttpDialogues(self.target_skill_id)
+
+    async def request(self, method: str, path: str, **kwargs) -> Tuple[aiohttp.ClientResponse, bytes]:
+        """Make a http request, waiting for the workers to serve the port."""
+        url = f"http://{self.host}:{self.port}{path}"
+        deadline = self.loop.time() + STARTUP_TIMEOUT
+        async with aiohttp.ClientSession(auto_decompress=False) as session:
+            while True:
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        return response, await response.read()
+                except aiohttp.ClientConnectorError:
+                    if self.loop.time() > deadline:
+                        raise
+                    await asyncio.sleep(0.1)
+
+    async def respond(self, body: bytes, headers: str = "Content-Type: application/json") -> HttpMessage:
+        """Respond to the next request received by the agent, returning it."""
+        envelope = await asyncio.wait_for(self.http_connection.receive(), timeout=STARTUP_TIMEOUT)
+        incoming_message = cast(HttpMessage, envelope.message)
+        dialogue = cast(HttpDialogue, self._dialogues.update(incoming_message))
+        message = dialogue.reply(
+            target_message=incoming_message,
+            performative=HttpMessage.Performative.RESPONSE,
+            version=incoming_message.version,
+            status_code=200,
+            status_text="Success",
+            headers=headers,
+            body=body,
+        )
+        await self.http_connection.send(
+            Envelope(to=envelope.sender, sender=envelope.to, context=envelope.context, message=message)
+        )
+        return incoming_message
+
+    async def test_workers_serve_the_port(self):
+        """Test that the workers forward the verified requests, and compress the responses."""
+        assert self.http_connection.channel.http_server is not None
+        body = b'{"pets": ["' + b"cat" * 100 + b'"]}'
+        request_task = self.loop.create_task(self.request("get", "/pets", headers={"Accept-Encoding": "gzip"}))
+        incoming_message = await self.respond(body)
+        response, response_body = await asyncio.wait_for(request_task, timeout=STARTUP_TIMEOUT)
+
+        assert incoming_message.url == f"http://{self.host}:{self.port}/pets"
+        assert "X-Forwarded-Url" not in incoming_message.headers
+        assert response.status == 200 and response.reason == "Success"
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response_body) == body
+
+    async def test_forwarded_url_cannot_be_spoofed(self):
+        """Test that the url a client sends in the forwarded url header does not reach the skill."""
+        request_task = self.loop.create_task(
+            self.request("get", "/pets", headers={"X-Forwarded-Url": "http://attacker.example/admin"})
+        )
+        incoming_message = await self.respond(b'{"pets": []}')
+        response, _ = await asyncio.wait_for(request_task, timeout=STARTUP_TIMEOUT)
+
+        assert response.status == 200
+        assert incoming_message.url == f"http://{self.host}:{self.port}/pets"
+        assert "attacker" not in incoming_message.headers
+
+    async def test_workers_reject_invalid_requests(self):
+        """Test that the workers reject the invalid requests without forwarding them."""
+        response, _ = await self.request("get", "/not-a-path")
+        assert response.status == 404
+        assert self.http_connection.channel.pending_requests == {}
+
+    async def test_unsafe_requests_invalidate_the_cache_of_every_worker(self):
+        """Test that the agent caches the forwarded responses, so that an unsafe request invalidates them at once."""
+        cacheable = "Content-Type: application/json\nCache-Control: max-age=60"
+        for _ in range(2):
+            request_task = self.loop.create_task(self.request("get", "/pets"))
+            await self.respond(b'{"pets": []}', cacheable)
+            assert (await asyncio.wait_for(request_task, timeout=STARTUP_TIMEOUT))[0].status == 200
+            # whichever worker serves it, the request is answered from the cache of the agent
+            response, body = await self.request("get", "/pets")
+            assert response.status == 200 and body == b'{"pets": []}'
+            assert self.http_connection.channel._in_queue.empty()  # pylint: disable=protected-access
+
+            request_task = self.loop.create_task(self.request("post", "/pets"))
+            await self.respond(b"")
+            await asyncio.wait_for(request_task, timeout=STARTUP_TIMEOUT)
+        assert self.http_connection.channel.response_cache.stats["hits"] == 2
+
+    async def test_exited_workers_are_restarted(self):
+        """Test that a worker which exits is restarted, and the port is still served."""
+        front_end = self.http_connection.channel._front_end  # pylint: disable=protected-access
+        assert front_end.alive == WORKERS
+        killed = front_end.processes[0]
+        killed.kill()
+        killed.join()
+
+        deadline = self.loop.time() + STARTUP_TIMEOUT
+        while front_end.restarts < 1:
+            assert self.loop.time() < deadline
+            await asyncio.sleep(0.1)
+        assert front_end.processes[0] is not killed
+
+        request_task = self.loop.create_task(self.request("get", "/pets"))
+        await self.respond(b'{"pets": []}')
+        response, _ = await asyncio.wait_for(request_task, timeout=STARTUP_TIMEOUT)
+        assert response.status == 200
+
+    async def test_stopping_the_workers_does_not_block_the_loop(self):
+        """Test that the loop keeps running while the workers are stopped."""
+        channel = self.http_connection.channel
+        channel._front_end_supervisor.cancel()  # pylint: disable=protected-access
+        front_end = channel._front_end  # pylint: disable=protected-access
+        processes = list(front_end.processes)
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = self.loop.create_task(tick())
+        try:
+            await front_end.stop()
+        finally:
+            ticker.cancel()
+        assert ticks > 1
+        assert not any(process.is_alive() for process in processes)
+        assert front_end.processes == []
+
+    async def test_worker_socket_is_private(self):
+        """Test that only the agent can access the unix socket the workers forward the requests on."""
+        socket_path = self.http_connection.channel.worker_socket_path
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        assert os.stat(os.path.dirname(socket_path)).st_mode & 0o777 == 0o700
+
+    def teardown(self):
+        """Teardown the test case."""
+        socket_path = self.http_connection.channel.worker_socket_path
+        self.loop.run_until_complete(self.http_connection.disconnect())
+        assert not os.path.exists(os.path.dirname(socket_path))
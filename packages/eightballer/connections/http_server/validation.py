@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""Compiled validation of requests against an OpenAPI spec."""
+
+import re
+import json
+from typing import Any, Dict, List, Tuple, Pattern, Callable, Optional
+from urllib.parse import urlparse
+
+from jsonschema import RefResolver, Draft4Validator
+from jsonschema.exceptions import ValidationError
+from openapi_schema_validator import oas30_format_checker
+
+
+PATH_PARAMETER = re.compile(r"\{([^}/]+)\}")
+JSON_MIMETYPE = re.compile(r"^application/(.+\+)?json$")
+# the parameter locations that are validated without falling back to openapi_core
+COMPILED_LOCATIONS = ("query", "path")
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+class RequestValidationError(Exception):
+    """Error raised when a request does not conform with the API spec."""
+
+
+def to_json_schema(schema: Any) -> Any:
+    """
+    Convert the schemas of an OpenAPI spec into JSON schemas.
+
+    :param schema: the spec, or a part of it.
+    :return: the converted spec, in which `nullable` schemas also accept `null`.
+    """
+    if isinstance(schema, list):
+        return [to_json_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    converted = {key: to_json_schema(value) for key, value in schema.items()}
+    if converted.pop("nullable", False) is True and "type" in converted:
+        converted["type"] = [converted["type"], "null"]
+    return converted
+
+
+def _coerce(value: str, schema_type: Optional[str]) -> Any:
+    """Coerce a raw parameter value to the type of its schema."""
+    if schema_type == "integer":
+        return int(value)
+    if schema_type == "number":
+        return float(value)
+    if schema_type == "boolean":
+        if value.lower() not in ("true", "false"):
+            raise ValueError(f"Invalid boolean {value!r}.")
+        return value.lower() == "true"
+    return value
+
+
+class CompiledParameter:
+    """A query or path parameter with its compiled schema validator."""
+
+    def __init__(self, name: str, required: bool, schema: Dict, validator: Draft4Validator) -> None:
+        """Initialize the parameter."""
+        self.name = name
+        self.required = required
+        self.schema_type = schema.get("type", None)
+        self.items_type = schema.get("items", {}).get("type", None)
+        self.validator = validator
+
+    def validate(self, values: Optional[List[str]]) -> None:
+        """
+        Validate the raw values of the parameter.
+
+        :param values: the raw values of the parameter, `None` if it is missing.
+        """
+        if not values:
+            if self.required:
+                raise RequestValidationError(f"Missing required parameter {self.name!r}.")
+            return
+        try:
+            if self.schema_type == "array":
+                value: Any = [_coerce(item, self.items_type) for item in values]
+            else:
+                value = _coerce(values[0], self.schema_type)
+            self.validator.validate(value)
+        except (ValueError, ValidationError) as error:
+            raise RequestValidationError(f"Invalid parameter {self.name!r}: {error}") from error
+
+
+class CompiledOperation:
+    """An operation of the spec, with its parameters and body schemas resolved and compiled."""
+
+    def __init__(self, spec: "CompiledSpec", path_item: Dict, operation: Dict) -> None:
+        """
+        Compile the operation.
+
+        :param spec: the compiled spec, holding the reference resolver.
+        :param path_item: the path item of the operation.
+        :param operation: the operation.
+        """
+        # the security requirements are only checked by the full validation, an empty requirement being optional
+        self.requires_fallback = any(operation.get("security", spec.security))
+        self.parameters: Dict[str, List[CompiledParameter]] = {location: [] for location in COMPILED_LOCATIONS}
+
+        # operation parameters override the path item ones with the same name and location
+        parameters: Dict[Tuple[str, str], Dict] = {}
+        for parameter in path_item.get("parameters", []) + operation.get("parameters", []):
+            parameter = spec.resolve(parameter)
+            parameters[(parameter["name"], parameter["in"])] = parameter
+        for (name, location), parameter in parameters.items():
+            schema = spec.resolve(parameter.get("schema", {}))
+            if (
+                location not in COMPILED_LOCATIONS
+                or "content" in parameter
+                or parameter.get("style", "form") not in ("form", "simple")
+                or schema.get("type", None) == "object"
+            ):
+                self.requires_fallback = True
+                continue
+            self.parameters[location].append(
+                CompiledParameter(
+                    name,
+                    parameter.get("required", location == "path"),
+                    schema,
+                    spec.compile(schema),
+                )
+            )
+
+        request_body = spec.resolve(operation.get("requestBody", {}))
+        self.body_required: bool = request_body.get("required", False)
+        self.body_validators: Optional[Dict[str, Optional[Draft4Validator]]] = None
+        if "content" in request_body:
+            self.body_validators = {}
+            for mimetype, media_type in request_body["content"].items():
+                schema = media_type.get("schema", None)
+                if schema is not None and JSON_MIMETYPE.match(mimetype) is None:
+                    self.requires_fallback = True
+                self.body_validators[mimetype] = None if schema is None else spec.compile(schema)
+
+    def validate(
+        self,
+        path_values: Dict[str, str],
+        query: Dict[str, List[str]],
+        body_size: int,
+        read_body: Callable[[], bytes],
+        mimetype: str,
+    ) -> None:
+        """
+        Validate a request against the operation.
+
+        :param path_values: the values of the path template variables.
+        :param query: the query string parameters.
+        :param body_size: the size of the request body.
+        :param read_body: a callable returning the request body, only called if the body has a schema.
+        :param mimetype: the content type of the request, without parameters.
+        """
+        for parameter in self.parameters["path"]:
+            value = path_values.get(parameter.name, None)
+            parameter.validate(None if value is None else [value])
+        for parameter in self.parameters["query"]:
+            parameter.validate(query.get(parameter.name, None))
+
+        if not body_size:
+            if self.body_required:
+                raise RequestValidationError("Missing required request body.")
+            return
+        if self.body_validators is None:
+            return
+        if mimetype not in self.body_validators:
+            raise RequestValidationError(f"Unsupported media type {mimetype!r}.")
+        validator = self.body_validators[mimetype]
+        if validator is None:
+            return
+        try:
+            validator.validate(json.loads(read_body()))
+        except (ValueError, ValidationError) as error:
+            raise RequestValidationError(f"Invalid request body: {error}") from error
+
+
+class CompiledSpec:
+    """
+    An OpenAPI spec compiled for fast request validation.
+
+    The path templates are compiled into regular expressions once, and the operations are resolved
+    and compiled on first use, then cached by (method, path template).
+    """
+
+    def __init__(self, spec_dict: Dict) -> None:
+        """
+        Compile the spec.
+
+        :param spec_dict: the spec, as loaded from its YAML source file.
+        """
+        self._root = to_json_schema(spec_dict)
+        self._resolver = RefResolver.from_schema(self._root)
+        self._operations: Dict[Tuple[str, str], Optional[CompiledOperation]] = {}
+        self.security: List[Dict] = spec_dict.get("security", [])
+
+        self.server_prefixes = sorted(
+            {urlparse(server["url"]).path.rstrip("/") for server in spec_dict.get("servers", [])} or {""},
+            key=len,
+            reverse=True,
+        )
+        # servers with variables are only supported by the full validation
+        self.requires_fallback = any("{" in server["url"] for server in spec_dict.get("servers", []))
+
+        templates: List[Tuple[str, Pattern, int]] = []
+        for template in spec_dict.get("paths", {}):
+            variables = PATH_PARAMETER.findall(template)
+            pattern = "".join(
+                f"(?P<v{index}>[^/]+)" if index % 2 else re.escape(part)
+                for index, part in enumerate(PATH_PARAMETER.split(template))
+            )
+            templates.append((template, re.compile(f"^{pattern}$"), len(variables)))
+        # fewer variables means a more concrete path
+        self._templates = sorted(templates, key=lambda item: item[2])
+
+    def resolve(self, node: Dict) -> Dict:
+        """Resolve a local reference of the spec."""
+        while isinstance(node, dict) and "$ref" in node:
+            _, node = self._resolver.resolve(node["$ref"])
+        return node
+
+    def compile(self, schema: Dict) -> Draft4Validator:
+        """Compile a schema of the spec into a validator, checking the formats as the full validation does."""
+        return Draft4Validator(
+            to_json_schema(schema),
+            resolver=self._resolver,
+            format_checker=oas30_format_checker,
+        )
+
+    def match(self, path: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Match a request path with a path template of the spec.
+
+        :param path: the path of the request url.
+        :return: the matched template and the values of its variables, if any.
+        """
+        for prefix in self.server_prefixes:
+            if not path.startswith(prefix):
+                continue
+            relative_path = path[len(prefix) :] or "/"
+            for template, pattern, _ in self._templates:
+                match = pattern.match(relative_path)
+                if match is not None:
+                    names = PATH_PARAMETER.findall(template)
+                    return template, {names[int(group[1:]) // 2]: value for group, value in match.groupdict().items()}
+        return None
+
+    def operation(self, method: str, template: str) -> Optional[CompiledOperation]:
+        """Get the compiled operation of a path template, compiling it on first use."""
+        key = (method, template)
+        if key not in self._operations:
+            path_item = self.resolve(self._root["paths"][template])
+            operation = path_item.get(method, None)
+            self._operations[key] = (
+                None
+                if operation is None or method not in HTTP_METHODS
+                else CompiledOperation(self, path_item, operation)
+            )
+        return self._operations[key]
+
+
+def is_static_asset(path: str, extensions: Tuple[str, ...]) -> bool:
+    """Check whether a request path refers to a static asset, given the static asset extensions."""
+    return bool(extensions) and path.lower().endswith(extensions)
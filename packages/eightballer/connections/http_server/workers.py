@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 8baller
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+Multi-process front-end of the http server.
+
+The front-end workers share the port of the server through SO_REUSEPORT, so that the kernel balances the
+connections across them. They terminate TLS, parse, bound and verify the requests and compress the responses,
+and forward the verified requests to the agent over a unix socket.
+
+The workers are spawned rather than forked, since the agent already runs threads and an event loop by then,
+and they do not cache responses: the cache is kept by the agent, so that unsafe requests invalidate it for all.
+The spawned workers run the entrypoint module from its file path, which loads the AEA packages of the agent first.
+"""
+
+import os
+import ssl
+import sys
+import time
+import runpy
+import signal
+import socket
+import asyncio
+import logging
+import tempfile
+import multiprocessing
+from typing import Any, List, Tuple, Mapping, Optional
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from multiprocessing.process import BaseProcess
+
+import aiohttp
+from aiohttp import web
+from aiohttp.web_request import BaseRequest
+
+from packages.eightballer.connections.http_server.connection import (
+    NOT_FOUND,
+    PAYLOAD_TOO_LARGE,
+    FORWARDED_URL_HEADER,
+    APISpec,
+    Request,
+    Response,
+    RequestBodyTooLarge,
+)
+from packages.eightballer.connections.http_server.entrypoint import WORKER_ARGS
+from packages.eightballer.connections.http_server.compression import ResponseCompressor
+
+
+_default_logger = logging.getLogger("aea.packages.eightballer.connections.http_server.workers")
+
+BAD_GATEWAY = 502
+GATEWAY_TIMEOUT = 504
+# the time the workers wait for the agent on top of its own response timeout
+FORWARD_TIMEOUT_MARGIN = 5.0
+# the interval at which the workers check that the agent is still alive
+PARENT_CHECK_INTERVAL = 1.0
+ENTRYPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "entrypoint.py")
+# the headers which only concern the connection they are received on
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+        "content-length",
+        "date",
+        "server",
+    }
+)
+
+
+@dataclass(frozen=True)
+class FrontEndConfig:  # pylint: disable=too-many-instance-attributes
+    """The configuration of the front-end workers."""
+
+    host: str
+    port: int
+    socket_path: str
+    server_address: str
+    timeout_window: float
+    api_spec_path: Optional[str] = None
+    ssl_cert_path: Optional[str] = None
+    ssl_key_path: Optional[str] = None
+    static_asset_extensions: Tuple[str, ...] = ()
+    max_body_size: int = 0
+    spool_threshold: Optional[int] = None
+    compression_threshold: int = 0
+    compression_cache_size: int = 0
+
+
+def default_socket_path(port: int) -> str:
+    """Get the default path of the unix socket the agent receives the forwarded requests on, in a private directory."""
+    return os.path.join(tempfile.mkdtemp(prefix="http_server_"), f"http_server_{port}.sock")
+
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    """
+    Create a listening socket which shares its port with the sockets of the other workers.
+
+    :param host: the host to bind.
+    :param port: the port to bind.
+    :return: the socket.
+    """
+    if not hasattr(socket, "SO_REUSEPORT"):  # pragma: nocover
+        raise OSError("SO_REUSEPORT is not supported on this platform.")
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(socket.SOMAXCONN)
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def aea_packages() -> List[Tuple[str, str, str, str]]:
+    """Get the directory, author, type and name of the AEA packages loaded in this process."""
+    loaded = []
+    for module_name, module in list(sys.modules.items()):
+        parts = module_name.split(".")
+        module_file = getattr(module, "__file__", None)
+        if len(parts) == 4 and parts[0] == "packages" and module_file is not None:
+            loaded.append((os.path.dirname(module_file), parts[1], parts[2], parts[3]))
+    return loaded
+
+
+def forwardable_headers(headers: Mapping[str, str]) -> List[Tuple[str, str]]:
+    """Get the headers of a message without the ones which only concern its connection."""
+    return [(name, value) for name, value in headers.items() if name.lower() not in HOP_BY_HOP_HEADERS]
+
+
+class FrontEndWorker:
+    """A front-end worker, serving the port of the http server and forwarding the verified requests to the agent."""
+
+    def __init__(self, config: FrontEndConfig, logger: logging.Logger = _default_logger) -> None:
+        """
+        Initialize the worker.
+
+        :param config: the configuration of the workers.
+        :param logger: the logger.
+        """
+        self.config = config
+        self.logger = logger
+        self.api_spec = APISpec(config.api_spec_path, config.server_address, logger, config.static_asset_extensions)
+        self.compressor = ResponseCompressor(config.compression_threshold, config.compression_cache_size)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def handle(self, http_request: BaseRequest) -> web.Response:
+        """
+        Verify a request, forward it to the agent and compress its response.
+
+        :param http_request: the request.
+        :return: the response.
+        """
+        accept_encoding = http_request.headers.get("Accept-Encoding", "")
+        try:
+            request = await Request.create(
+                http_request,
+                max_body_size=self.config.max_body_size,
+                spool_threshold=self.config.spool_threshold,
+            )
+        except RequestBodyTooLarge as error:
+            self.logger.warning(f"Rejecting request: {error}")
+            return Response(status=PAYLOAD_TOO_LARGE, reason="Payload Too Large")
+
+        try:
+            if not self.api_spec.verify(request):
+                self.logger.warning(f"request is not valid: {request}")
+                return Response(status=NOT_FOUND, reason="Request Not Found")
+            response = await self._forward(http_request, request)
+        finally:
+            request.cleanup()
+        return await self.compressor.compress_response(accept_encoding, response)
+
+    async def _forward(self, http_request: BaseRequest, request: Request) -> web.Response:
+        """Forward a verified request to the agent, streaming the spooled body from its file."""
+        if self._session is None:  # pragma: nocover
+            raise ValueError("Worker not running!")
+
+        # a client must not choose the url the skill sees, so its own forwarded url is dropped
+        headers = [
+            (name, value)
+            for name, value in forwardable_headers(http_request.headers)
+            if name.lower() != FORWARDED_URL_HEADER.lower()
+        ]
+        headers.append((FORWARDED_URL_HEADER, request.full_url_pattern))
+        body_file = open(request.body_path, "rb") if request.body_path is not None else None  # noqa: SIM115
+        try:
+            async with self._session.request(
+                http_request.method,
+                f"http://agent{http_request.rel_url}",
+                headers=headers,
+                data=body_file if body_file is not None else request.body,
+            ) as upstream:
+                body = await upstream.read()
+                return Response(
+                    status=upstream.status,
+                    reason=upstream.reason,
+                    body=body,
+                    headers=forwardable_headers(upstream.headers),
+                )
+        except asyncio.TimeoutError:
+            self.logger.warning(f"The agent did not respond in time to {request}")
+            return Response(status=GATEWAY_TIMEOUT, reason="Gateway Timeout")
+        except aiohttp.ClientError as error:
+            self.logger.warning(f"Could not forward {request} to the agent: {error}")
+            return Response(status=BAD_GATEWAY, reason="Bad Gateway")
+        finally:
+            if body_file is not None:
+                body_file.close()
+
+    async def run(self, ready: Optional[Any] = None) -> None:
+        """
+        Serve the port of the http server until the worker is terminated, or the agent exits.
+
+        :param ready: the event to set once the port is served, if any.
+        """
+        ssl_context = None
+        if self.config.ssl_cert_path and self.config.ssl_key_path:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(self.config.ssl_cert_path, self.config.ssl_key_path)
+
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stopped.set)
+
+        parent_pid = os.getppid()
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.UnixConnector(path=self.config.socket_path),
+            timeout=aiohttp.ClientTimeout(total=self.config.timeout_window + FORWARD_TIMEOUT_MARGIN),
+            auto_decompress=False,
+        )
+        runner = web.ServerRunner(web.Server(self.handle))
+        await runner.setup()
+        try:
+            sock = create_reuseport_socket(self.config.host, self.config.port)
+            await web.SockSite(runner, sock, ssl_context=ssl_context).start()
+            self.logger.debug(f"Front-end worker {os.getpid()} serving port {self.config.port}.")
+            if ready is not None:
+                ready.set()
+            while not stopped.is_set() and os.getppid() == parent_pid:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stopped.wait(), timeout=PARENT_CHECK_INTERVAL)
+        finally:
+            await runner.cleanup()
+            await self._session.close()
+            self.compressor.close()
+
+
+def run_worker(config: FrontEndConfig, ready: Optional[Any] = None) -> None:
+    """Run a front-end worker, in its own process."""
+    asyncio.run(FrontEndWorker(config).run(ready))
+
+
+class FrontEndPool:
+    """The pool of the front-end worker processes."""
+
+    STARTUP_TIMEOUT = 30.0
+    STARTUP_CHECK_INTERVAL = 0.1
+    STOP_TIMEOUT = 5.0
+    STOP_CHECK_INTERVAL = 0.05
+
+    def __init__(self, config: FrontEndConfig, workers: int, logger: logging.Logger = _default_logger) -> None:
+        """
+        Initialize the pool.
+
+        :param config: the configuration of the workers.
+        :param workers: the number of worker processes.
+        :param logger: the logger.
+        """
+        self.config = config
+        self.workers = workers
+        self.logger = logger
+        self.processes: List[BaseProcess] = []
+        self.restarts = 0
+        # forking a process which already runs threads can deadlock the children, and leaks the fds of the agent
+        self._context = multiprocessing.get_context("spawn")
+        self._ready: List[Any] = []
+
+    @property
+    def alive(self) -> int:
+        """Get the number of worker processes which are alive."""
+        return sum(process.is_alive() for process in self.processes)
+
+    def _spawn(self, index: int) -> Tuple[BaseProcess, Any]:
+        """Spawn a worker process, returning it with the event it sets once it serves the port."""
+        ready = self._context.Event()
+        # the target is importable by the spawned process, unlike the AEA packages, which the entrypoint loads
+        process = self._context.Process(
+            target=runpy.run_path,
+            args=(ENTRYPOINT_PATH,),
+            kwargs={
+                "init_globals": {
+                    WORKER_ARGS: {"aea_packages": aea_packages(), "config": asdict(self.config), "ready": ready}
+                },
+                "run_name": "__main__",
+            },
+            name=f"http_server_worker_{index}",
+            daemon=True,
+        )
+        process.start()
+        return process, ready
+
+    async def start(self, timeout: float = STARTUP_TIMEOUT) -> None:
+        """
+        Spawn the worker processes, and wait for all of them to serve the port.
+
+        :param timeout: the seconds to wait for the workers to serve the port.
+        """
+        for index in range(self.workers):
+            process, ready = self._spawn(index)
+            self.processes.append(process)
+            self._ready.append(ready)
+
+        deadline = time.monotonic() + timeout
+        while not all(ready.is_set() for ready in self._ready):
+            dead = [process for process in self.processes if not process.is_alive()]
+            if dead or time.monotonic() > deadline:
+                await self.stop()
+                reason = f"{len(dead)} exited" if dead else f"not all served the port within {timeout} seconds"
+                raise RuntimeError(f"Could not start the front-end workers on port {self.config.port}: {reason}.")
+            await asyncio.sleep(self.STARTUP_CHECK_INTERVAL)
+        self.logger.info(f"Started {self.workers} front-end workers on port {self.config.port}.")
+
+    def restart_dead(self) -> int:
+        """
+        Respawn the worker processes which exited.
+
+        :return: the number of respawned workers.
+        """
+        restarted = 0
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            self.logger.warning(f"Front-end worker {process.pid} exited with code {process.exitcode}, restarting it.")
+            process.join()
+            self.processes[index], self._ready[index] = self._spawn(index)
+            restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    async def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """
+        Terminate the worker processes, killing the ones which do not exit in time.
+
+        The exit of the workers is polled, so that stopping them does not block the event loop.
+
+        :param timeout: the seconds to wait for the workers to exit.
+        """
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        while any(process.is_alive() for process in self.processes) and time.monotonic() < deadline:
+            await asyncio.sleep(self.STOP_CHECK_INTERVAL)
+        for process in self.processes:
+            if process.is_alive():  # pragma: nocover
+                self.logger.warning(f"Killing front-end worker {process.pid}, which did not exit in time.")
+                process.kill()
+        while any(process.is_alive() for process in self.processes):  # pragma: nocover
+            await asyncio.sleep(self.STOP_CHECK_INTERVAL)
+        for process in self.processes:
+            # the workers have exited, so this only reaps them
+            process.join()
+        self.processes.clear()
+        self._ready.clear()
@@ -22,13 +22,11 @@ import ssl
 import asyncio
 from typing import Any, Dict, Optional, cast
 from asyncio import CancelledError
-from textwrap import dedent
 from asyncio.events import AbstractEventLoop
 from asyncio.futures import Future
 from concurrent.futures._base import CancelledError as FuturesCancelledError  # noqa
 
-import socketio
-from aiohttp import WSMessage, web
+from aiohttp import WSMessage, WSMsgType, web
 from aea.common import Address
 from aea.mail.base import Message, Envelope
 from aiohttp.web_request import BaseRequest
@@ -93,13 +91,14 @@ RequestId = DialogueLabel
 class WebSocketChannel(HTTPChannel):
     """A wrapper for an RESTful API with an internal HTTPServer."""
 
-    RESPONSE_TIMEOUT = 6
-
     def __init__(self, **kwarg):
         super().__init__(**kwarg)
         self.open_connections: Dict[RequestId, Future] = {}
+        # the task reading the messages of each websocket session, for as long as it is open
+        self.readers: Dict[RequestId, asyncio.Task] = {}
         self._websocket_dialogues = WebSocketDialogue(self.address)
         self.wss_server = None
+        self.wss_runner = None
 
     async def _base_connect(self, loop: AbstractEventLoop) -> None:
         """
@@ -139,14 +138,14 @@ class WebSocketChannel(HTTPChannel):
 
         Note, this message handles the initiall http connection for the websocket.
 
-        We use that to create a mapping of the request id to the future object.
+        We use that to create a mapping of the request id to the future object,
+        then read the messages of the websocket until the client, the skill or the channel closes it.
 
         :param http_request: the request object
 
-        :return: a tuple of response code and response description
+        :return: the websocket response
         """
         self.logger.info(f"Handling initial http request for websocket connection from {http_request.remote}")
-        connection_time = self._loop.time()
         request = await HttpRequest.create(http_request)
         ws = web.WebSocketResponse()
         await ws.prepare(http_request)
@@ -166,34 +165,22 @@ class WebSocketChannel(HTTPChannel):
             # turn request into envelope
             http_envelope = request.to_envelope_and_set_id(self._dialogues, self.target_skill_id)
 
-            self.open_connections[request.id] = Future()
-            self.open_connections[request.id].ws = ws
+            closed = Future()
+            closed.ws = ws
+            self.open_connections[request.id] = closed
             # send the envelope to the agent's inbox (via self.in_queue)
             await self._in_queue.put(http_envelope)
             await self._handle_new_client(request, ws=ws)
 
-            # we now wait for ws messages to come in.
-            while self._loop.time() - connection_time < self.RESPONSE_TIMEOUT:
-                if self.open_connections[request.id].done():
-                    break
-                async for msg in ws:
-                    websocket_envelope = await self._inbound_wss_handler(request, msg)
-                    await self._in_queue.put(websocket_envelope)
-                    break
-                await asyncio.sleep(0.0000001)
-
-            # this is the closure http response.
-            self.logger.info(f"Closing initial connection from {request.id}")
-            await self.close_session(request.id, ws)
+            # we now wait for ws messages to come in, until the skill answers the initial request.
+            reader = asyncio.ensure_future(self._read_session(request, ws))
+            self.readers[request.id] = reader
+            await asyncio.wait({reader, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not reader.done():
+                reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            return ws
 
-        except asyncio.TimeoutError as err:
-            self.logger.warning(
-                dedent(f"""
-                Request timed out! Request={request} not handled as a result. 
-                Ensure requests (protocol_id={HttpMessage.protocol_id}) are handled by a skill!"
-                """)
-            )
-            raise NotImplementedError from err
         except FuturesCancelledError as err:
             raise NotImplementedError from err
         except BaseException as err:  # noqa
@@ -204,6 +191,27 @@ class WebSocketChannel(HTTPChannel):
             if request.is_id_set:
                 self.open_connections.pop(request.id, None)
 
+    async def _read_session(self, request: HttpRequest, ws: web.WebSocketResponse) -> None:
+        """
+        Send the messages of a websocket session to the agent as they come in, then close the session.
+
+        The session is read until the client closes the websocket, or the reader is cancelled.
+
+        :param request: the initial http request of the session
+        :param ws: the websocket of the session
+        """
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    self.logger.warning(f"Websocket of {request.id} failed: {ws.exception()}")
+                    break
+                await self._inbound_wss_handler(request, msg)
+        finally:
+            # this is the closure http response.
+            self.logger.info(f"Closing initial connection from {request.id}")
+            await self.close_session(request.id, ws)
+            self.readers.pop(request.id, None)
+
     async def close_session(self, request_id: RequestId, ws) -> None:
         """
         Close the connection.
@@ -308,6 +316,8 @@ class WebSocketChannel(HTTPChannel):
 
     async def _start_ws_server(self) -> None:
         """Start websocket server."""
+        import socketio  # pylint: disable=import-outside-toplevel
+
         loop = asyncio.get_event_loop()
         app = web.Application(loop=loop)
         sio = socketio.AsyncServer(cors_allowed_origins="*")
@@ -355,6 +365,7 @@ class WebSocketChannel(HTTPChannel):
         app.router.add_get("/{tail:.*}", self._http_handler)
         runner = web.AppRunner(app)
         await runner.setup()
+        self.wss_runner = runner
         ssl_context = None
         if self.ssl_cert_path and self.ssl_key_path:
             ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
@@ -431,7 +442,12 @@ class WebSocketChannel(HTTPChannel):
             raise ValueError("Server not connected, call connect first!")
 
         if not self.is_stopped:
-            await self.wss_server.stop()
+            # close the open sessions first, so that the skill is told of them before the queue goes
+            readers = list(self.readers.values())
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+            await self.wss_runner.cleanup()
             self.logger.info(f"HTTP Server has shutdown on port: {self.port}.")
             self.is_stopped = True
             self._in_queue = None
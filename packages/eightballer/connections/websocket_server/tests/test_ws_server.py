@@ -41,7 +41,9 @@ from packages.eightballer.protocols.http.dialogues import (
     HttpDialogue,
     HttpDialogues as BaseHttpDialogues,
 )
+from packages.eightballer.protocols.websockets.message import WebsocketsMessage
 from packages.eightballer.connections.websocket_server.connection import (
+    WebSocketChannel,
     WebSocketServerConnection,
 )
 
@@ -163,3 +165,39 @@ class TestWebSocketServer:
         """Teardown the test case."""
         self.loop.run_until_complete(self.wss_connection.disconnect())
         self.wss_connection.channel.timeout_window = self.original_timeout
+
+
+@pytest.mark.asyncio
+async def test_websocket_session_read_until_channel_disconnects():
+    """Test that a websocket session stays open past the messages, and is closed with the channel."""
+    port = get_unused_tcp_port()
+    channel = WebSocketChannel(
+        address="my_key",
+        host=get_host(),
+        port=port,
+        target_skill_id="some_author/some_skill:0.1.0",
+        api_spec_path=None,
+        connection_id=WebSocketServerConnection.connection_id,
+    )
+    await channel.connect(asyncio.get_running_loop())
+    queue = channel._in_queue  # pylint: disable=protected-access
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f"http://127.0.0.1:{port}/ws") as ws:
+            for data in ("first", "second"):
+                await ws.send_str(data)
+            messages = [(await asyncio.wait_for(channel.get_message(), timeout=5)).message for _ in range(4)]
+            assert [message.performative for message in messages[1:]] == [
+                WebsocketsMessage.Performative.CONNECT,
+                WebsocketsMessage.Performative.SEND,
+                WebsocketsMessage.Performative.SEND,
+            ]
+            assert [message.data for message in messages[2:]] == ["first", "second"]
+            assert len(channel.readers) == 1
+
+            # the client reads along, so that it answers the closing handshake of the server
+            closing = asyncio.ensure_future(ws.receive(timeout=5))
+            await channel.disconnect()
+            assert (await closing).type == aiohttp.WSMsgType.CLOSE
+
+    assert queue.get_nowait().message.performative == WebsocketsMessage.Performative.DISCONNECT
+    assert not channel.readers
@@ -37,15 +37,21 @@ from packages.eightballer.protocols.http.dialogues import (
     HttpDialogue as BaseHttpDialogue,
     HttpDialogues as BaseHttpDialogues,
 )
+from packages.eightballer.connections.http_common.stateless_dialogues import (
+    DEFAULT_DIALOGUE_TTL,
+    StatelessDialoguesMixin,
+)
 
 HttpDialogue = BaseHttpDialogue
 
 
-class HttpDialogues(Model, BaseHttpDialogues):
+class HttpDialogues(Model, StatelessDialoguesMixin, BaseHttpDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
         """Initialize the Dialogues class."""
+        dialogue_ttl = kwargs.pop("dialogue_ttl", DEFAULT_DIALOGUE_TTL)
+        dialogue_ring_size = kwargs.pop("dialogue_ring_size", 0)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -64,4 +70,5 @@ class HttpDialogues(Model, BaseHttpDialogues):
             self,
             self_address=str(self.skill_id),
             role_from_first_message=role_from_first_message,
-        )
\ No newline at end of file
+        )
+        StatelessDialoguesMixin.__init__(self, dialogue_ttl, dialogue_ring_size)
\ No newline at end of file
@@ -25,6 +25,7 @@ from urllib.parse import unquote, urlparse
 from aea.skills.base import Handler
 import requests
 from packages.eightballer.protocols.http.message import HttpMessage as ApiHttpMessage
+from packages.victorpolisetty.customs.idriss_token_finder_ui.dialogues import HttpDialogues
 
 
 class ApiHttpHandler(Handler):
@@ -32,6 +33,15 @@ class ApiHttpHandler(Handler):
 
     SUPPORTED_PROTOCOL = ApiHttpMessage.protocol_id  # type: Optional[str]
 
+    _http_dialogues = None
+
+    @property
+    def http_dialogues(self) -> HttpDialogues:
+        """Get the stateless dialogues of the API requests, created on first use as the handler is loaded on its own."""
+        if self._http_dialogues is None:
+            self._http_dialogues = HttpDialogues(name="api_http_dialogues", skill_context=self.context)
+        return self._http_dialogues
+
     def setup(self) -> None:
         """Set up the handler."""
 
@@ -47,17 +57,36 @@ class ApiHttpHandler(Handler):
 
         self.context.logger.info(f"Received {method.upper()} request for {path}")
 
+        dialogue = self.http_dialogues.update(message)
+        if dialogue is None:
+            self.context.logger.error(f"Could not locate dialogue for message={message}")
+            return None
+
         normalized_path = path.rstrip("/")
 
         handler_name, kwargs = self.get_handler_name_and_kwargs(method, normalized_path, path, body)
 
         handler_method = getattr(self, handler_name, None)
 
-        if handler_method:
-            self.context.logger.debug(f"Found handler method: {handler_name}")
-            return handler_method(message, **kwargs)
-        self.context.logger.warning(f"No handler found for {method.upper()} request to {path}")
-        return self.handle_unexpected_message(message)
+        if not handler_method:
+            self.context.logger.warning(f"No handler found for {method.upper()} request to {path}")
+            return self.handle_unexpected_message(message)
+
+        self.context.logger.debug(f"Found handler method: {handler_name}")
+        response = handler_method(message, **kwargs)
+        # the storage no longer holds an expired dialogue, so its response must not be sent anymore
+        if self.http_dialogues.is_expired(dialogue):
+            self.context.logger.warning(f"Dropping the response to the expired {method.upper()} request to {path}")
+            return None
+        return dialogue.reply(
+            performative=response.performative,
+            target_message=message,
+            status_code=response.status_code,
+            status_text=response.status_text,
+            headers=response.headers,
+            version=response.version,
+            body=response.body,
+        )
 
     def get_handler_name_and_kwargs(self, method: str, normalized_path: str, body: bytes) -> tuple[str, dict]:
         """Get the handler name and kwargs for the given method and path."""
@@ -26,10 +26,10 @@ from packages.victorpolisetty.skills.idriss_token_finder_abci.composition import
 from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import (
     FarcasterSearchResponseSpecs as FarcasterSearchResponseSpecs
 )
-from packages.valory.skills.abstract_round_abci.models import (
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import (
     BenchmarkTool as BaseBenchmarkTool,
 )
-from packages.valory.skills.abstract_round_abci.models import Requests as BaseRequests
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import Requests as BaseRequests
 from packages.valory.skills.abstract_round_abci.tests.data.dummy_abci.models import (
     RandomnessApi as BaseRandomnessApi,
 )
@@ -19,26 +19,152 @@
 
 """This package contains round behaviours of IdrissTokenFinderAggregationAbciApp."""
 
+import json
+import time
 from abc import ABC
-from typing import Generator, Set, Type, cast
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, List, Optional, Set, Tuple, Type, cast
+from urllib.parse import urlencode
 
+from aea.protocols.base import Message
+
+from packages.valory.connections.http_client.connection import PUBLIC_ID as HTTP_CLIENT_PUBLIC_ID
+from packages.valory.protocols.http import HttpMessage
 from packages.valory.skills.abstract_round_abci.base import AbstractRound
+from packages.valory.skills.abstract_round_abci.behaviour_utils import TimeoutException
 from packages.valory.skills.abstract_round_abci.behaviours import (
     AbstractRoundBehaviour,
     BaseBehaviour,
 )
-from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import Params, SharedState
+from packages.valory.skills.abstract_round_abci.dialogues import HttpDialogue, HttpDialogues
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import Params, Requests, SharedState
 from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.payloads import (
     HelloPayload,
     CollectFarcasterSearchPayload,
+    AggregateFarcasterSearchPayload,
+    CompressedContentPayload,
 )
 from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.rounds import (
     IdrissTokenFinderAggregationAbciApp,
     HelloRound,
     CollectFarcasterSearchRound,
+    AggregateFarcasterSearchRound,
     SynchronizedData,
 )
 
+# the request timed out, or the http client could not get a response at all
+TIMEOUT_STATUS_CODES = frozenset({408, 504, 600})
+
+
+def canonicalize_casts(
+    casts: List[Dict[str, Any]], bucket_size: int, snapshot_timestamp: int
+) -> List[Dict[str, Any]]:
+    """
+    Canonicalize a Farcaster search result set, so that agents with near-identical fetches agree on it.
+
+    Casts published after the snapshot are dropped, engagement counts are rounded down
+    into buckets and the remaining casts are sorted by their `merkleRoot`.
+
+    :param casts: the casts as returned by the search API.
+    :param bucket_size: the size of the engagement buckets.
+    :param snapshot_timestamp: the end of the snapshot window, in milliseconds.
+    :return: the canonical result set.
+    """
+    canonical = []
+    for cast_ in casts:
+        body, meta = cast_["body"], cast_.get("meta", {})
+        if body.get("publishedAt", 0) > snapshot_timestamp:
+            continue
+        engagement = {
+            kind: meta.get(kind, {}).get("count", 0) // bucket_size * bucket_size
+            for kind in ("reactions", "recasts", "watches")
+        }
+        canonical.append(
+            {
+                "merkleRoot": cast_["merkleRoot"],
+                "text": body["data"]["text"],
+                "username": body.get("username"),
+                "publishedAt": body.get("publishedAt"),
+                "engagement": engagement,
+            }
+        )
+    return merge_casts(canonical)
+
+
+def merge_casts(*cast_sets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge canonical result sets into a single one, deduplicated and sorted by `merkleRoot`.
+
+    :param cast_sets: the canonical result sets to merge.
+    :return: the merged canonical result set.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for cast_ in (cast_ for cast_set in cast_sets for cast_ in cast_set):
+        existing = merged.get(cast_["merkleRoot"])
+        # the same cast can be returned for several queries, pick one independently of the shard order
+        if existing is None or serialize_casts([cast_]) > serialize_casts([existing]):
+            merged[cast_["merkleRoot"]] = cast_
+    return [merged[merkle_root] for merkle_root in sorted(merged)]
+
+
+def parse_headers(headers: str) -> Dict[str, str]:
+    """Parse the headers of an http message into a dictionary with lowercase names."""
+    parsed = {}
+    for line in headers.splitlines():
+        name, sep, value = line.partition(":")
+        if sep:
+            parsed[name.strip().lower()] = value.strip()
+    return parsed
+
+
+@dataclass(frozen=True)
+class TimedHttpResponse:
+    """The response to one of the requests sent at once, `None` if it did not arrive in time."""
+
+    response: Optional[HttpMessage]
+    # the seconds from sending the request to receiving its response
+    elapsed: Optional[float]
+
+
+def serialize_casts(casts: List[Dict[str, Any]]) -> str:
+    """
+    Serialize a canonical result set into a byte-stable string.
+
+    :param casts: the canonical result set.
+    :return: the serialized result set.
+    """
+    return json.dumps(casts, sort_keys=True, separators=(",", ":"))
+
+
+def serialize_shard(agent_index: int, queries: List[str], casts: List[Dict[str, Any]]) -> str:
+    """
+    Serialize the shard of an agent, along with the queries it covers, into a byte-stable string.
+
+    The index of the agent keeps the shards distinct, even the empty ones of the agents without queries.
+
+    :param agent_index: the index of the agent owning the shard.
+    :param queries: the queries searched for the shard.
+    :param casts: the canonical result set of the queries.
+    :return: the serialized shard.
+    """
+    return json.dumps(
+        {"agent_index": agent_index, "queries": sorted(queries), "casts": casts},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def get_missing_queries(queries: List[str], shards: List[Dict[str, Any]]) -> List[str]:
+    """
+    Get the queries of the watchlist which none of the collected shards covers.
+
+    :param queries: the watchlist.
+    :param shards: the deserialized shards collected.
+    :return: the uncovered queries, in the order of the watchlist.
+    """
+    covered = {query for shard in shards for query in shard["queries"]}
+    return [query for query in queries if query not in covered]
+
 
 class HelloBaseBehaviour(BaseBehaviour, ABC):  # pylint: disable=too-many-ancestors
     """Base behaviour for the hello_abci skill."""
@@ -58,6 +184,204 @@ class HelloBaseBehaviour(BaseBehaviour, ABC):  # pylint: disable=too-many-ancest
         """Return the state."""
         return cast(SharedState, self.context.state)
 
+    def _build_payload(
+        self, payload_cls: Type[CompressedContentPayload], content: str
+    ) -> CompressedContentPayload:
+        """Build a payload with compressed content, benchmarking the compression."""
+        benchmark = self.context.benchmark_tool.measure(self.behaviour_id)
+        with benchmark.compression():
+            payload = payload_cls.from_content(self.context.agent_address, content)
+        benchmark.payload_size(len(content.encode()), len(payload.content.encode()))
+        return payload
+
+    def get_http_responses(
+        self,
+        requests: List[Dict[str, Any]],
+        quorum: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Generator[None, None, List[TimedHttpResponse]]:
+        """
+        Send several http requests at once, and wait until all of them, or a quorum, are answered.
+
+        Unlike with `get_http_response`, the requests are in flight together,
+        so that they take as long as the slowest of them instead of the sum of them.
+        The requests still unanswered on return are given up on, and their late responses dropped by the handler.
+
+        :param requests: the method, url, and optionally the headers and content of each request.
+        :param quorum: the number of responses to wait for, all of them if `None`.
+        :param timeout: the seconds to wait for the quorum, unbounded if `None`.
+        :yield: None
+        :return: the responses in the order of the requests, with the time each of them took.
+        """
+        quorum = len(requests) if quorum is None else min(quorum, len(requests))
+        responses: Dict[int, HttpMessage] = {}
+        sent_at: List[float] = []
+        received_at: Dict[int, float] = {}
+        pending_requests = cast(Requests, self.context.requests)
+        nonces: List[str] = []
+        for index, request in enumerate(requests):
+            message, dialogue = self._create_http_request(**request)
+            nonce = dialogue.dialogue_label.dialogue_reference[0]
+            pending_requests.register(nonce, self._get_fan_out_callback(index, responses, received_at))
+            nonces.append(nonce)
+            self.context.outbox.put_message(message=message)
+            sent_at.append(time.perf_counter())
+
+        try:
+            yield from self.wait_for_condition(lambda: len(responses) >= quorum, timeout)
+        except TimeoutException:
+            self.context.logger.warning(
+                f"Got {len(responses)} of the {quorum} responses needed out of {len(requests)} in {timeout}s."
+            )
+        finally:
+            for index, nonce in enumerate(nonces):
+                if index not in responses:
+                    pending_requests.abandon(nonce)
+        return [
+            TimedHttpResponse(
+                responses.get(index), received_at[index] - sent_at[index] if index in received_at else None
+            )
+            for index in range(len(requests))
+        ]
+
+    def _create_http_request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        content: Optional[bytes] = None,
+    ) -> Tuple[HttpMessage, HttpDialogue]:
+        """Create a request to the http client, in a new dialogue."""
+        message, dialogue = cast(HttpDialogues, self.context.http_dialogues).create(
+            counterparty=str(HTTP_CLIENT_PUBLIC_ID),
+            performative=HttpMessage.Performative.REQUEST,
+            method=method,
+            url=url,
+            headers="".join(f"{key}: {value}\r\n" for key, value in (headers or {}).items()),
+            version="",
+            body=b"" if content is None else content,
+        )
+        return cast(HttpMessage, message), cast(HttpDialogue, dialogue)
+
+    def _get_fan_out_callback(
+        self, index: int, responses: Dict[int, HttpMessage], received_at: Dict[int, float]
+    ) -> Callable[[Message, BaseBehaviour], None]:
+        """Get the callback collecting the response to one of the requests sent at once."""
+
+        def callback(message: Message, current_behaviour: BaseBehaviour) -> None:
+            """Collect the response, unless the behaviour moved on."""
+            if self.is_stopped or self != current_behaviour:
+                self.context.logger.info(f"Dropping the late response to request {index}: {message}")
+                return
+            responses[index] = cast(HttpMessage, message)
+            received_at[index] = time.perf_counter()
+
+        return callback
+
+    def _search_all(self, queries: List[str]) -> Generator[None, None, Optional[List[Dict[str, Any]]]]:
+        """Search the casts matching every query at once and return them merged, or `None` if any search failed."""
+        requests: List[Dict[str, Any]] = []
+        api_keys: List[Optional[str]] = []
+        for query in queries:
+            search_request = self._search_request(query)
+            if search_request is None:
+                # the keys of the requests which will not be sent are given back
+                for api_key in api_keys:
+                    self._release_api_key(api_key, None)
+                return None
+            requests.append(search_request[0])
+            api_keys.append(search_request[1])
+
+        responses = yield from self.get_http_responses(requests)
+
+        shard: Optional[List[Dict[str, Any]]] = []
+        # every response is processed, even after a failed search, so that its key and timeouts are accounted
+        for query, api_key, timed_response in zip(queries, api_keys, responses):
+            self.context.logger.info(f"Search for {query!r} took {timed_response.elapsed}s")
+            casts = self._search_result(query, timed_response.response, api_key)
+            shard = None if shard is None or casts is None else merge_casts(shard, casts)
+        return shard
+
+    def _search_request(self, query: str) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """Get the request searching the casts matching the given query and its API key, or `None` on failure."""
+        # Prepare API request specifications
+        api_specs = self.context.farcaster_search_response.get_spec(query, self.params.search_count)
+
+        # Pick a key from the pool of the API, if keys are configured for it
+        api_id = self.context.farcaster_search_response.api_id
+        key_pool = self.params.api_key_pools.get(api_id, None)
+        api_key = None
+        if key_pool is not None and len(key_pool) > 0:
+            api_key = key_pool.acquire()
+            if api_key is None:
+                self.context.logger.warning(f"Every API key of {api_id} is rate limited.")
+                return None
+            api_specs["headers"]["X-API-KEY"] = api_key
+
+        # the query string is encoded here, once, as the parameters are joined into the url without encoding
+        request = {
+            "method": api_specs["method"],
+            "url": f"{api_specs['url']}?{urlencode(api_specs['parameters'])}",
+            "headers": api_specs["headers"],
+        }
+        return request, api_key
+
+    def _release_api_key(self, api_key: Optional[str], response: Optional[HttpMessage]) -> None:
+        """Give back the API key of a request, accounting the quota reported in its response if any."""
+        key_pool = self.params.api_key_pools.get(self.context.farcaster_search_response.api_id, None)
+        if key_pool is None or api_key is None:
+            return
+        if response is None:
+            key_pool.release(api_key, 0, {})
+            return
+        key_pool.release(api_key, response.status_code, parse_headers(response.headers))
+
+    def _search_result(
+        self, query: str, response: Optional[HttpMessage], api_key: Optional[str]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Get the casts of the response to a search canonicalized, or `None` on failure."""
+        self._release_api_key(api_key, response)
+        if response is None:
+            return None
+
+        timeouts = self.params.request_id_to_num_timeouts
+        timeouts.record_request()
+        if response.status_code in TIMEOUT_STATUS_CODES:
+            num_timeouts = timeouts.increment(query)
+            if num_timeouts >= self.params.timeout_limit:
+                self.context.logger.warning(
+                    f"Query {query!r} timed out {num_timeouts} times, tracker stats: {timeouts.stats}"
+                )
+            return None
+        timeouts.pop(query)
+
+        try:
+            farcaster_search_response = self.context.farcaster_search_response.process_response(response)
+        except Exception as e:
+            self.context.logger.error(f"Error processing Farcaster Search response: {e}")
+            return None
+
+        if not farcaster_search_response:
+            return None
+
+        # Canonicalize the result set, so that near-identical fetches produce identical payloads
+        try:
+            return canonicalize_casts(
+                farcaster_search_response["casts"],
+                self.params.engagement_bucket_size,
+                self.snapshot_timestamp,
+            )
+        except (KeyError, TypeError) as e:
+            self.context.logger.error(f"Unexpected Farcaster Search response format: {e}")
+            return None
+
+    @property
+    def snapshot_timestamp(self) -> int:
+        """Return the end of the current snapshot window in milliseconds, aligned on the last round transition."""
+        window = self.params.snapshot_window_seconds
+        last_transition = self.round_sequence.last_round_transition_timestamp.timestamp()
+        return int(last_transition // window * window * 1000)
+
 
 class HelloBehaviour(HelloBaseBehaviour):  # pylint: disable=too-many-ancestors
     """HelloBehaviour"""
@@ -80,7 +404,7 @@ class HelloBehaviour(HelloBaseBehaviour):  # pylint: disable=too-many-ancestors
         self.set_done()
 
 class CollectFarcasterSearchBehaviour(HelloBaseBehaviour):  # pylint: disable=too-many-ancestors
-    """Behaviour to observe and collect Farcaster Search."""
+    """Behaviour to observe and collect this agent's shard of the Farcaster Search watchlist."""
 
     matching_round = CollectFarcasterSearchRound
 
@@ -89,9 +413,9 @@ class CollectFarcasterSearchBehaviour(HelloBaseBehaviour):  # pylint: disable=to
         Do the action.
 
         Steps:
-        - Ask the configured API for historical stock price data.
-        - If the request fails, retry until max retries are exceeded.
-        - Send an observation transaction and wait for it to be mined.
+        - Ask the configured API for the casts of every query in this agent's shard of the watchlist, all at once.
+        - If a request fails, retry until max retries are exceeded.
+        - Send the canonical shard as an observation transaction and wait for it to be mined.
         - Wait until ABCI application transitions to the next round.
         - Go to the next behaviour (set done event).
         """
@@ -104,40 +428,22 @@ class CollectFarcasterSearchBehaviour(HelloBaseBehaviour):  # pylint: disable=to
             self.set_done()
             return
 
-        # Measure the local execution time of the HTTP request
-        with self.context.benchmark_tool.measure(self.behaviour_id).local():
-            # Prepare API request specifications
-            api_specs = self.context.farcaster_search_response.get_spec()
-
-            # Make the asynchronous HTTP request to the Farcaster Search API
-            response = yield from self.get_http_response(
-                method=api_specs["method"],
-                url=api_specs["url"],
-                headers=api_specs["headers"],
-                parameters=api_specs["parameters"],
-            )
+        queries = self.params.query_shard
+        self.context.logger.info(
+            f"Agent {self.params.agent_index}/{self.params.num_agents} collecting queries: {queries}"
+        )
 
-        try:
-            farcaster_search_response = self.context.farcaster_search_response.process_response(response)
-        except Exception as e:
-            self.context.logger.error(f"Error processing Farcaster Search response: {e}")
-            farcaster_search_response = None
-
-        # Extract the response from farcaster search response
-        if farcaster_search_response:
-            farcaster_search_result = str(farcaster_search_response['casts'][0]['body']['data']['text'])
-        else:
-            farcaster_search_result = ""
+        # Measure the local execution time of the HTTP requests
+        with self.context.benchmark_tool.measure(self.behaviour_id).local():
+            shard = yield from self._search_all(queries)
 
         # Handle the API response
-        # TODO: Fix here
-        if farcaster_search_result:
+        if shard is not None:
+            farcaster_search_result = serialize_shard(self.params.agent_index, queries, shard)
             self.context.logger.info(
                 f"Got farcaster_search_result from {self.context.farcaster_search_response.api_id}: {farcaster_search_result}"
             )
-            payload = CollectFarcasterSearchPayload(
-                self.context.agent_address, farcaster_search_result
-            )
+            payload = self._build_payload(CollectFarcasterSearchPayload, farcaster_search_result)
 
             # Send a transaction and wait for the round to end
             with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
@@ -156,6 +462,54 @@ class CollectFarcasterSearchBehaviour(HelloBaseBehaviour):  # pylint: disable=to
             self.context.farcaster_search_response.increment_retries()
 
 
+class AggregateFarcasterSearchBehaviour(HelloBaseBehaviour):  # pylint: disable=too-many-ancestors
+    """Behaviour to merge the per-agent Farcaster Search shards into a single result set."""
+
+    matching_round = AggregateFarcasterSearchRound
+
+    def async_act(self) -> Generator:
+        """
+        Do the act, supporting asynchronous execution.
+
+        The collection round ends once a threshold of agents submitted their shards,
+        so the queries of the shards which were not collected are searched again by every agent.
+        """
+
+        with self.context.benchmark_tool.measure(self.behaviour_id).decompression():
+            shards = [
+                json.loads(cast(CollectFarcasterSearchPayload, payload).decompressed_content)
+                for payload in self.synchronized_data.participant_to_farcaster_search_round.values()
+            ]
+
+        with self.context.benchmark_tool.measure(self.behaviour_id).local():
+            cast_sets = [shard["casts"] for shard in shards]
+            missing = get_missing_queries(self.params.search_queries, shards)
+            if missing:
+                self.context.logger.warning(f"Searching the queries of the uncollected shards again: {missing}")
+                casts = yield from self._search_all(missing)
+                if casts is not None:
+                    cast_sets.append(casts)
+                elif not self.context.farcaster_search_response.is_retries_exceeded():
+                    self.context.farcaster_search_response.increment_retries()
+                    yield from self.sleep(self.context.farcaster_search_response.retries_info.suggested_sleep_time)
+                    return
+                else:
+                    self.context.logger.warning(f"Dropping the uncollected queries from the result set: {missing}")
+
+            payload_content = serialize_casts(merge_casts(*cast_sets))
+            self.context.logger.info(
+                f"Merged {len(shards)} farcaster search shards: {payload_content}"
+            )
+
+        payload = self._build_payload(AggregateFarcasterSearchPayload, payload_content)
+
+        with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
+            yield from self.send_a2a_transaction(payload)
+            yield from self.wait_until_round_end()
+
+        self.set_done()
+
+
 class IdrissTokenFinderAggregationRoundBehaviour(AbstractRoundBehaviour):
     """IdrissTokenFinderAggregationBehaviour"""
 
@@ -163,5 +517,6 @@ class IdrissTokenFinderAggregationRoundBehaviour(AbstractRoundBehaviour):
     abci_app_cls = IdrissTokenFinderAggregationAbciApp  # type: ignore
     behaviours: Set[Type[BaseBehaviour]] = [  # type: ignore
         HelloBehaviour,
-        CollectFarcasterSearchBehaviour
+        CollectFarcasterSearchBehaviour,
+        AggregateFarcasterSearchBehaviour,
     ]
\ No newline at end of file
@@ -19,6 +19,10 @@
 
 """This module contains the handlers for the skill of IdrissTokenFinderAggregationAbciApp."""
 
+from typing import cast
+
+from aea.protocols.base import Message
+
 from packages.valory.skills.abstract_round_abci.handlers import (
     ABCIRoundHandler as BaseABCIRoundHandler,
 )
@@ -40,9 +44,24 @@ from packages.valory.skills.abstract_round_abci.handlers import (
 from packages.valory.skills.abstract_round_abci.handlers import (
     TendermintHandler as BaseTendermintHandler,
 )
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import Requests
+
+
+class HttpHandler(BaseHttpHandler):
+    """Handle the http responses, dropping the late responses to the requests the behaviours gave up on."""
+
+    def handle(self, message: Message) -> None:
+        """Handle a response, unless its request was given up on."""
+        nonce = message.dialogue_reference[0]
+        if cast(Requests, self.context.requests).forget_abandoned(nonce):
+            # the dialogue is still updated, so that the response completes it
+            self.context.http_dialogues.update(message)
+            self.context.logger.info(f"Dropping the late response to the abandoned request {nonce}.")
+            return
+        super().handle(message)
+
 
 ABCIHandler = BaseABCIRoundHandler
-HttpHandler = BaseHttpHandler
 SigningHandler = BaseSigningHandler
 LedgerApiHandler = BaseLedgerApiHandler
 ContractApiHandler = BaseContractApiHandler
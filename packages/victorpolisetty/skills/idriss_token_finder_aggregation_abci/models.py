@@ -20,9 +20,15 @@
 """This module contains the shared state for the abci skill of IdrissTokenFinderAggregationAbciApp."""
 import os
 import json
+import time
 import base64
+import hashlib
 from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.rounds import IdrissTokenFinderAggregationAbciApp
 from packages.valory.skills.abstract_round_abci.models import BaseParams
+from packages.valory.skills.abstract_round_abci.models import (
+    BenchmarkBehaviour as BaseBenchmarkBehaviour,
+)
+from packages.valory.skills.abstract_round_abci.models import BenchmarkBlock
 from packages.valory.skills.abstract_round_abci.models import (
     BenchmarkTool as BaseBenchmarkTool,
 )
@@ -30,14 +36,13 @@ from packages.valory.skills.abstract_round_abci.models import Requests as BaseRe
 from packages.valory.skills.abstract_round_abci.models import (
     SharedState as BaseSharedState,
 )
-from collections import defaultdict
-from typing import Any, Callable, Dict, List, Optional, cast
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, cast
 from packages.valory.skills.abstract_round_abci.models import ApiSpecs
 from aea.exceptions import enforce
 from aea.skills.base import Model
-from dotenv import load_dotenv
 
-load_dotenv()  # Load environment variables from .env file
 
 class SharedState(BaseSharedState):
     """Keep the current shared state of the skill."""
@@ -45,8 +50,320 @@ class SharedState(BaseSharedState):
     abci_app_cls = IdrissTokenFinderAggregationAbciApp
 
 
-Requests = BaseRequests
-BenchmarkTool = BaseBenchmarkTool
+class Requests(BaseRequests):
+    """
+    Keep the current pending requests, and the ones the behaviours gave up on.
+
+    The callbacks of the requests given up on are removed, and their nonces are kept in a bounded set,
+    so that the http handler drops their late responses instead of failing on the missing callbacks.
+    """
+
+    MAX_ABANDONED_REQUESTS = 1000
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the requests."""
+        self.abandoned_requests: "OrderedDict[str, None]" = OrderedDict()
+        super().__init__(*args, **kwargs)
+
+    def register(self, nonce: str, callback: Callable) -> None:
+        """Register the callback of the response to a request."""
+        self.request_id_to_callback[nonce] = callback
+
+    def abandon(self, nonce: str) -> None:
+        """Remove the callback of a request which is not waited for anymore, if it is still pending."""
+        if self.request_id_to_callback.pop(nonce, None) is None:
+            return
+        self.abandoned_requests[nonce] = None
+        while len(self.abandoned_requests) > self.MAX_ABANDONED_REQUESTS:
+            self.abandoned_requests.popitem(last=False)
+
+    def forget_abandoned(self, nonce: str) -> bool:
+        """Forget a request given up on, once its late response arrived, returning whether it was given up on."""
+        if nonce not in self.abandoned_requests:
+            return False
+        del self.abandoned_requests[nonce]
+        return True
+
+
+class BenchmarkBehaviour(BaseBenchmarkBehaviour):
+    """Benchmark a single behaviour, including the compression of its payloads."""
+
+    def __init__(self) -> None:
+        """Initialize Benchmark behaviour object."""
+        super().__init__()
+        self.payload_sizes: Dict[str, int] = {}
+
+    def compression(self) -> BenchmarkBlock:
+        """Measure the payload compression block."""
+        return self._measure("compression")
+
+    def decompression(self) -> BenchmarkBlock:
+        """Measure the payload decompression block."""
+        return self._measure("decompression")
+
+    def payload_size(self, raw_size: int, compressed_size: int) -> None:
+        """Record the size of a payload content, before and after compression."""
+        self.payload_sizes["payload_raw_bytes"] = raw_size
+        self.payload_sizes["payload_compressed_bytes"] = compressed_size
+
+
+class BenchmarkTool(BaseBenchmarkTool):
+    """Tool to benchmark ABCI apps, which also reports the payload sizes."""
+
+    def measure(self, behaviour: str) -> BenchmarkBehaviour:
+        """Measure time to complete round."""
+        if behaviour not in self.benchmark_data:
+            self.benchmark_data[behaviour] = BenchmarkBehaviour()
+        return cast(BenchmarkBehaviour, self.benchmark_data[behaviour])
+
+    @property
+    def data(self) -> List:
+        """Returns formatted data."""
+        behavioural_data = super().data
+        for behaviour_data in behavioural_data:
+            tool = cast(BenchmarkBehaviour, self.benchmark_data[behaviour_data["behaviour"]])
+            behaviour_data["data"].update(tool.payload_sizes)
+        return behavioural_data
+
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+API_KEY_STRATEGIES = (ROUND_ROBIN, LEAST_LOADED)
+RATE_LIMITED_STATUS = 429
+
+
+@dataclass
+class ApiKeyUsage:
+    """The usage of a single API key, as reported by the upstream."""
+
+    key: str
+    in_flight: int = 0
+    requests: int = 0
+    rate_limited: int = 0
+    # the remaining quota of the current window, `None` until the upstream reports it
+    remaining: Optional[int] = None
+    # the timestamp at which the current window resets
+    reset_at: float = 0.0
+
+    def is_available(self, now: float) -> bool:
+        """Check whether the key may be used at the given time."""
+        return now >= self.reset_at or self.remaining is None or self.remaining > 0
+
+
+class ApiKeyPool:
+    """
+    A pool of API keys for the same upstream.
+
+    Requests are spread across the keys either round-robin or to the least loaded key.
+    A key which is rate limited is taken out of rotation until its window resets.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        strategy: str = ROUND_ROBIN,
+        window_seconds: float = 60.0,
+    ) -> None:
+        """Initialize the pool."""
+        self.usages: List[ApiKeyUsage] = [ApiKeyUsage(key) for key in keys]
+        self.strategy = strategy
+        self.window_seconds = window_seconds
+        self._next_index = 0
+
+    def __len__(self) -> int:
+        """Get the number of keys in the pool."""
+        return len(self.usages)
+
+    def acquire(self, now: Optional[float] = None) -> Optional[str]:
+        """
+        Acquire a key for a request.
+
+        :param now: the current timestamp.
+        :return: the key, or `None` if every key is rate limited.
+        """
+        now = time.time() if now is None else now
+        available = [usage for usage in self.usages if usage.is_available(now)]
+        if not available:
+            return None
+
+        if self.strategy == LEAST_LOADED:
+            usage = min(
+                available,
+                key=lambda usage: (
+                    usage.in_flight,
+                    -(float("inf") if usage.remaining is None or now >= usage.reset_at else usage.remaining),
+                    usage.requests,
+                ),
+            )
+        else:
+            n_keys = len(self.usages)
+            for offset in range(n_keys):
+                usage = self.usages[(self._next_index + offset) % n_keys]
+                if usage.is_available(now):
+                    self._next_index = (self._next_index + offset + 1) % n_keys
+                    break
+
+        usage.in_flight += 1
+        usage.requests += 1
+        return usage.key
+
+    def release(
+        self,
+        key: str,
+        status_code: int,
+        headers: Dict[str, str],
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        Release a key once its request is over, accounting the quota reported by the upstream.
+
+        :param key: the key that was acquired for the request.
+        :param status_code: the status code of the response.
+        :param headers: the headers of the response, with lowercase names.
+        :param now: the current timestamp.
+        """
+        now = time.time() if now is None else now
+        usage = next((usage for usage in self.usages if usage.key == key), None)
+        if usage is None:
+            return
+
+        usage.in_flight = max(usage.in_flight - 1, 0)
+        remaining = _parse_number(headers.get("x-ratelimit-remaining"))
+        if remaining is not None:
+            usage.remaining = int(remaining)
+        reset = _parse_number(headers.get("x-ratelimit-reset"))
+        if reset is not None:
+            # the reset is either an epoch timestamp or a number of seconds from now
+            usage.reset_at = reset if reset > now else now + reset
+
+        if status_code == RATE_LIMITED_STATUS:
+            usage.rate_limited += 1
+            usage.remaining = 0
+            retry_after = _parse_number(headers.get("retry-after"))
+            if retry_after is not None:
+                usage.reset_at = now + retry_after
+            elif usage.reset_at <= now:
+                usage.reset_at = now + self.window_seconds
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the usage of every key, identified by a fingerprint of the key."""
+        return {
+            hashlib.sha256(usage.key.encode()).hexdigest()[:8]: {
+                "requests": usage.requests,
+                "in_flight": usage.in_flight,
+                "rate_limited": usage.rate_limited,
+                "remaining": usage.remaining,
+                "reset_at": usage.reset_at,
+            }
+            for usage in self.usages
+        }
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    """Parse a numeric header value, returning `None` if it is missing or malformed."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class RequestTimeoutTracker:
+    """
+    Track the number of times each request has timed out.
+
+    The tracker is an LRU bounded to `max_size` entries, whose entries expire `ttl` seconds after their last update.
+    Expired entries are swept every `cleanup_freq` requests.
+    """
+
+    def __init__(self, max_size: int, ttl: float, cleanup_freq: int) -> None:
+        """Initialize the tracker."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cleanup_freq = cleanup_freq
+        self.request_count = 0
+        self.evictions = 0
+        self.expirations = 0
+        # maps the request id to its number of timeouts and the timestamp of its last update
+        self._entries: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Get the number of tracked requests."""
+        return len(self._entries)
+
+    def __contains__(self, request_id: Hashable) -> bool:
+        """Check whether the given request is tracked."""
+        return request_id in self._entries
+
+    def __getitem__(self, request_id: Hashable) -> int:
+        """Get the number of timeouts of the given request, without refreshing it."""
+        entry = self._entries.get(request_id, None)
+        if entry is None or self._is_expired(entry, time.time()):
+            return 0
+        return entry[0]
+
+    def _is_expired(self, entry: Tuple[int, float], now: float) -> bool:
+        """Check whether the given entry has expired."""
+        return now - entry[1] > self.ttl
+
+    def increment(self, request_id: Hashable, now: Optional[float] = None) -> int:
+        """
+        Record a timeout of the given request.
+
+        :param request_id: the id of the request.
+        :param now: the current timestamp.
+        :return: the number of timeouts of the request.
+        """
+        now = time.time() if now is None else now
+        entry = self._entries.pop(request_id, None)
+        num_timeouts = 1 if entry is None or self._is_expired(entry, now) else entry[0] + 1
+        self._entries[request_id] = (num_timeouts, now)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return num_timeouts
+
+    def pop(self, request_id: Hashable) -> int:
+        """Stop tracking the given request, returning its number of timeouts."""
+        entry = self._entries.pop(request_id, None)
+        return 0 if entry is None else entry[0]
+
+    def record_request(self, now: Optional[float] = None) -> None:
+        """Count a request, sweeping the expired entries every `cleanup_freq` requests."""
+        self.request_count += 1
+        if self.request_count % self.cleanup_freq == 0:
+            self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Remove the expired entries.
+
+        :param now: the current timestamp.
+        :return: the number of removed entries.
+        """
+        now = time.time() if now is None else now
+        expired = [
+            request_id
+            for request_id, entry in self._entries.items()
+            if self._is_expired(entry, now)
+        ]
+        for request_id in expired:
+            del self._entries[request_id]
+        self.expirations += len(expired)
+        return len(expired)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Get the size and eviction stats of the tracker."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "requests": self.request_count,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
 
 
 #Params = BaseParams
@@ -68,7 +385,10 @@ class Params(BaseParams):
         # self.in_flight_req: bool = False
         # self.from_block: Optional[int] = None
         # self.req_to_callback: Dict[str, Callable] = {}
-        # Load the API keys JSON from the environment variable
+        # Load the API keys JSON from the environment variable, reading the .env file only once params are built
+        from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+
+        load_dotenv()
         api_keys_json_str = os.getenv("API_KEYS_JSON", "[]")  # Get the JSON string, or default to empty list if not found
 
         # Parse the JSON string into a list of lists
@@ -76,10 +396,24 @@ class Params(BaseParams):
 
         # Convert the list of lists into a dictionary
         self.api_keys = {key: value for key, value in api_keys_list}
+        # every api id gets a pool of its keys, so that requests are spread across them
+        self.api_key_strategy: str = kwargs.get("api_key_strategy", ROUND_ROBIN)
+        enforce(
+            self.api_key_strategy in API_KEY_STRATEGIES,
+            f"api_key_strategy must be one of {API_KEY_STRATEGIES}!",
+        )
+        self.api_key_window_seconds: float = kwargs.get("api_key_window_seconds", 60.0)
+        self.api_key_pools: Dict[str, ApiKeyPool] = {
+            api_id: ApiKeyPool(
+                [keys] if isinstance(keys, str) else keys,
+                self.api_key_strategy,
+                self.api_key_window_seconds,
+            )
+            for api_id, keys in self.api_keys.items()
+        }
         # self.api_keys: Dict = self._nested_list_todict_workaround(
         #     kwargs, "api_keys_json"
         # )
-        print("API KEYS: ", self.api_keys)
 
         # self.file_hash_to_tools: Dict[
         #     str, List[str]
@@ -90,8 +424,8 @@ class Params(BaseParams):
         self.polling_interval = kwargs.get("polling_interval", 30.0)
         self.task_deadline = kwargs.get("task_deadline", 240.0)
         self.num_agents = kwargs.get("num_agents", None)
-        self.request_count: int = 0
         self.cleanup_freq = kwargs.get("cleanup_freq", 50)
+        enforce(self.cleanup_freq > 0, "cleanup_freq must be positive!")
         enforce(self.num_agents is not None, "num_agents must be set!")
         self.agent_index = kwargs.get("agent_index", None)
         enforce(self.agent_index is not None, "agent_index must be set!")
@@ -101,22 +435,65 @@ class Params(BaseParams):
         enforce(self.timeout_limit is not None, "timeout_limit must be set!")
         self.max_block_window = kwargs.get("max_block_window", None)
         enforce(self.max_block_window is not None, "max_block_window must be set!")
-        # maps the request id to the number of times it has timed out
-        self.request_id_to_num_timeouts: Dict[int, int] = defaultdict(lambda: 0)
+        # the watchlist of search queries, sharded across the agents
+        self.search_queries: List[str] = kwargs.get("search_queries", ["test"])
+        self.search_count: int = kwargs.get("search_count", 25)
+        # canonicalization of the collected result set, so that agents submit identical payloads
+        self.engagement_bucket_size: int = kwargs.get("engagement_bucket_size", 10)
+        enforce(self.engagement_bucket_size > 0, "engagement_bucket_size must be positive!")
+        self.snapshot_window_seconds: int = kwargs.get("snapshot_window_seconds", 300)
+        enforce(self.snapshot_window_seconds > 0, "snapshot_window_seconds must be positive!")
+        # maps the request id to the number of times it has timed out, bounded in size and age
+        self.request_timeout_max_size: int = kwargs.get("request_timeout_max_size", 1024)
+        enforce(self.request_timeout_max_size > 0, "request_timeout_max_size must be positive!")
+        self.request_timeout_ttl: float = kwargs.get("request_timeout_ttl", 3600.0)
+        self.request_id_to_num_timeouts = RequestTimeoutTracker(
+            self.request_timeout_max_size,
+            self.request_timeout_ttl,
+            self.cleanup_freq,
+        )
         #self.mech_to_config: Dict[str, MechConfig] = self._parse_mech_configs(kwargs)
         super().__init__(*args, **kwargs)
 
+    @property
+    def query_shard(self) -> List[str]:
+        """Get the share of the watchlist this agent is responsible for."""
+        return [
+            query
+            for query in self.search_queries
+            if get_query_owner(query, self.num_agents) == self.agent_index
+        ]
+
+
+def get_query_owner(query: str, num_agents: int) -> int:
+    """
+    Get the index of the agent which owns the given query, using rendezvous hashing.
+
+    Changing the number of agents only moves the queries of the agents which joined or left.
+
+    :param query: the search query.
+    :param num_agents: the number of agents sharing the watchlist.
+    :return: the index of the owner.
+    """
+    return max(
+        range(num_agents),
+        key=lambda agent_index: hashlib.sha256(f"{agent_index}:{query}".encode()).digest(),
+    )
+
 
 class FarcasterSearchResponseSpecs(ApiSpecs):
     """A model that wraps ApiSpecs for the Farcaster Search API response specifications."""
 
-    def get_spec(self) -> Dict[str, Any]:
-        """Return the specifications for the Farcaster Search API request."""
+    def get_spec(self, query: str = "test", count: int = 1) -> Dict[str, Any]:
+        """Return the specifications for the Farcaster Search API request of the given query."""
         return {
             "method": "GET",
-            "url": "https://searchcaster.xyz/api/search?text=test&count=1",
+            "url": "https://searchcaster.xyz/api/search",
             "headers": {
                 "accept": "application/json"
             },
-            "parameters": {}
+            "parameters": {
+                "text": query,
+                "count": str(count),
+            }
         }
\ No newline at end of file
@@ -19,11 +19,48 @@
 
 """This module contains the transaction payloads of the IdrissTokenFinderAggregationAbci."""
 
+import base64
+import zlib
 from dataclasses import dataclass
 
 from packages.valory.skills.abstract_round_abci.base import BaseTxPayload
 
 
+# Preset dictionary shared by all the agents, seeded with the recurring parts of the canonical cast JSON.
+# It is written by hand rather than trained on samples: the canonical JSON of `serialize_casts` has fixed keys
+# in a fixed order, which are every cast's keys below, while the free-text part only holds common cast text.
+# zlib gives the most weight to the strings closest to the end, so the most frequent ones come last.
+# Every agent must use the same dictionary to decompress the payloads of the others, so changing it is a
+# breaking change of the payload format.
+CAST_JSON_DICTIONARY = (
+    b"https://warpcast.com/ https://i.imgur.com/ .eth the and to of a in is for on that $ token "
+    b'"username":"'
+    b'"text":"'
+    b'"publishedAt":17'
+    b'"merkleRoot":"0x'
+    b'{"engagement":{"reactions":0,"recasts":0,"watches":0},'
+)
+COMPRESSION_LEVEL = 9
+
+
+def compress_content(content: str) -> str:
+    """Compress a payload content using the shared dictionary and encode it so that it can be json serialized."""
+    compressor = zlib.compressobj(level=COMPRESSION_LEVEL, zdict=CAST_JSON_DICTIONARY)
+    compressed = compressor.compress(content.encode()) + compressor.flush()
+    return base64.b64encode(compressed).decode()
+
+
+def decompress_content(content: str) -> str:
+    """
+    Decompress a payload content compressed by `compress_content`.
+
+    The dictionary is only used by the streams which ask for it, so content compressed without it is decompressed too.
+    """
+    decompressor = zlib.decompressobj(zdict=CAST_JSON_DICTIONARY)
+    decompressed = decompressor.decompress(base64.b64decode(content)) + decompressor.flush()
+    return decompressed.decode()
+
+
 @dataclass(frozen=True)
 class HelloPayload(BaseTxPayload):
     """Represent a transaction payload for the HelloRound."""
@@ -32,7 +69,27 @@ class HelloPayload(BaseTxPayload):
 
 
 @dataclass(frozen=True)
-class CollectFarcasterSearchPayload(BaseTxPayload):
+class CompressedContentPayload(BaseTxPayload):
+    """Represent a transaction payload whose content is compressed at construction."""
+
+    content: str
+
+    @classmethod
+    def from_content(cls, sender: str, content: str) -> "CompressedContentPayload":
+        """Build a payload from its uncompressed content."""
+        return cls(sender, compress_content(content))
+
+    @property
+    def decompressed_content(self) -> str:
+        """Get the uncompressed content."""
+        return decompress_content(self.content)
+
+
+@dataclass(frozen=True)
+class CollectFarcasterSearchPayload(CompressedContentPayload):
     """Represent a transaction payload for the CollectFarcasterSearchRound."""
 
-    content: str
\ No newline at end of file
+
+@dataclass(frozen=True)
+class AggregateFarcasterSearchPayload(CompressedContentPayload):
+    """Represent a transaction payload for the AggregateFarcasterSearchRound."""
@@ -19,23 +19,36 @@
 
 """This package contains the rounds of IdrissTokenFinderAggregationAbciApp."""
 
+import binascii
+import zlib
+from abc import ABC
+from collections import Counter
 from enum import Enum
-from typing import Dict, FrozenSet, Optional, Set
+from typing import Any, ClassVar, Dict, FrozenSet, Optional, Set, Tuple, Type, cast
+from weakref import WeakKeyDictionary
 
 from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.payloads import (
     HelloPayload,
-    CollectFarcasterSearchPayload
+    CollectFarcasterSearchPayload,
+    AggregateFarcasterSearchPayload,
+    CompressedContentPayload,
+    decompress_content,
 )
 from packages.valory.skills.abstract_round_abci.base import (
+    ABCIAppInternalError,
     AbciApp,
+    AbciAppDB,
     AbciAppTransitionFunction,
     AppState,
     BaseSynchronizedData,
+    BaseTxPayload,
+    CollectDifferentUntilThresholdRound,
     CollectSameUntilThresholdRound,
     CollectionRound,
     DegenerateRound,
     DeserializedCollection,
     EventToTimeout,
+    TransactionNotValidError,
     get_name,
 )
 
@@ -55,10 +68,38 @@ class SynchronizedData(BaseSynchronizedData):
     This data is replicated by the tendermint application.
     """
 
+    # the deserialized collections of every db, along with the period and round they were read in.
+    # A new instance is created on every access to the synchronized data, so the memo is kept on the class.
+    _deserialized: ClassVar[
+        "WeakKeyDictionary[AbciAppDB, Dict[str, Tuple[Tuple[int, int], DeserializedCollection]]]"
+    ] = WeakKeyDictionary()
+
     def _get_deserialized(self, key: str) -> DeserializedCollection:
-        """Strictly get a collection and return it deserialized."""
-        serialized = self.db.get_strict(key)
-        return CollectionRound.deserialize_collection(serialized)
+        """Strictly get a collection and return it deserialized, reusing the memoized result within the round."""
+        version = (self.db.reset_index, self.db.round_count)
+        memo = self._deserialized.setdefault(self.db, {})
+        memoized = memo.get(key, None)
+        if memoized is None or memoized[0] != version:
+            memoized = (version, CollectionRound.deserialize_collection(self.db.get_strict(key)))
+            memo[key] = memoized
+        return dict(memoized[1])
+
+    def update(
+        self,
+        synchronized_data_class: Optional[Type] = None,
+        **kwargs: Any,
+    ) -> BaseSynchronizedData:
+        """Copy and update the current data, invalidating the deserialization memo."""
+        self._deserialized.pop(self.db, None)
+        return super().update(synchronized_data_class, **kwargs)
+
+    def create(
+        self,
+        synchronized_data_class: Optional[Type] = None,
+    ) -> BaseSynchronizedData:
+        """Copy and update with new data, invalidating the deserialization memo."""
+        self._deserialized.pop(self.db, None)
+        return super().create(synchronized_data_class)
 
     @property
     def hello_data(self) -> Optional[str]:
@@ -72,13 +113,19 @@ class SynchronizedData(BaseSynchronizedData):
 
     @property
     def search_farcaster_search(self) -> Optional[str]:
-        """Get the hello_data."""
-        return self.db.get("hello_data", None)
+        """Get the canonical farcaster search result set, decompressed on access."""
+        compressed = self.db.get("search_farcaster_search", None)
+        return None if compressed is None else decompress_content(compressed)
 
     @property
     def participant_to_farcaster_search_round(self) -> DeserializedCollection:
-        """Get the participants to the hello round."""
-        return self._get_deserialized("participant_to_hello_round")
+        """Get the participants to the farcaster search round, along with their shards."""
+        return self._get_deserialized("participant_to_farcaster_search_round")
+
+    @property
+    def participant_to_aggregate_farcaster_search_round(self) -> DeserializedCollection:
+        """Get the participants to the aggregate farcaster search round."""
+        return self._get_deserialized("participant_to_aggregate_farcaster_search_round")
 
 
 class HelloRound(CollectSameUntilThresholdRound):
@@ -94,15 +141,79 @@ class HelloRound(CollectSameUntilThresholdRound):
     # Event.ROUND_TIMEOUT  # this needs to be mentioned for static checkers
 
 
-class CollectFarcasterSearchRound(CollectSameUntilThresholdRound):
-    """CollectFarcasterSearchRound"""
+class CompressedContentRound(CollectionRound, ABC):
+    """A collection round of compressed content payloads, which rejects the payloads that cannot be decompressed."""
+
+    def check_payload(self, payload: BaseTxPayload) -> None:
+        """Check that the payload content can be decompressed."""
+        try:
+            decompress_content(cast(CompressedContentPayload, payload).content)
+        except (binascii.Error, zlib.error, UnicodeDecodeError) as e:
+            raise TransactionNotValidError(f"Cannot decompress the content of {payload.sender}: {e}") from e
+        super().check_payload(payload)
+
+    def process_payload(self, payload: BaseTxPayload) -> None:
+        """Process the payload, if its content can be decompressed."""
+        try:
+            self.check_payload(payload)
+        except TransactionNotValidError as e:
+            raise ABCIAppInternalError(e.args[0]) from e
+        super().process_payload(payload)
+
+
+class CollectFarcasterSearchRound(CompressedContentRound, CollectDifferentUntilThresholdRound):
+    """
+    CollectFarcasterSearchRound, in which every agent submits its own shard of the watchlist.
+
+    The round ends once a threshold of agents submitted, the queries of the shards
+    which were not collected are searched again in the aggregation.
+    Every shard holds the index of its agent, so that the empty shards differ too.
+    """
 
     payload_class = CollectFarcasterSearchPayload
     synchronized_data_class = SynchronizedData
     done_event = Event.DONE
+    collection_key = get_name(SynchronizedData.participant_to_farcaster_search_round)
+
+    # Event.ROUND_TIMEOUT  # this needs to be mentioned for static checkers
+
+
+class AggregateFarcasterSearchRound(CompressedContentRound, CollectSameUntilThresholdRound):
+    """
+    AggregateFarcasterSearchRound, in which agents agree on the merge of all the shards.
+
+    The agents vote on the decompressed content, as the same content can be compressed
+    into different bytes by different zlib builds.
+    """
+
+    payload_class = AggregateFarcasterSearchPayload
+    synchronized_data_class = SynchronizedData
+    done_event = Event.DONE
     no_majority_event = Event.NO_MAJORITY
-    collection_key = get_name(SynchronizedData.search_farcaster_search)
-    selection_key = get_name(SynchronizedData.participant_to_farcaster_search_round)
+    collection_key = get_name(SynchronizedData.participant_to_aggregate_farcaster_search_round)
+    selection_key = get_name(SynchronizedData.search_farcaster_search)
+
+    # Event.ROUND_TIMEOUT  # this needs to be mentioned for static checkers
+
+    @staticmethod
+    def _votes(payloads: Dict[str, BaseTxPayload]) -> Dict[str, BaseTxPayload]:
+        """Get the payload of every sender, replaced by the first payload of the same decompressed content."""
+        representatives: Dict[str, BaseTxPayload] = {}
+        return {
+            sender: representatives.setdefault(
+                decompress_content(cast(CompressedContentPayload, payload).content), payload
+            )
+            for sender, payload in sorted(payloads.items())
+        }
+
+    @property
+    def payload_values_count(self) -> Counter:
+        """Get the count of the payload values, by their decompressed content."""
+        return Counter(payload.values for payload in self._votes(self.collection).values())
+
+    def is_majority_possible(self, votes_by_participant: Dict[str, BaseTxPayload], nb_participants: int) -> bool:
+        """Check whether a majority is still possible, by the decompressed content of the votes."""
+        return super().is_majority_possible(self._votes(votes_by_participant), nb_participants)
 
 
 class FinishedHelloRound(DegenerateRound):
@@ -123,6 +234,10 @@ class IdrissTokenFinderAggregationAbciApp(AbciApp[Event]):
             Event.DONE: CollectFarcasterSearchRound,
         },
         CollectFarcasterSearchRound: {
+            Event.ROUND_TIMEOUT: CollectFarcasterSearchRound,
+            Event.DONE: AggregateFarcasterSearchRound,
+        },
+        AggregateFarcasterSearchRound: {
             Event.NO_MAJORITY: CollectFarcasterSearchRound,
             Event.ROUND_TIMEOUT: CollectFarcasterSearchRound,
             Event.DONE: FinishedHelloRound,
@@ -132,7 +247,9 @@ class IdrissTokenFinderAggregationAbciApp(AbciApp[Event]):
     final_states: Set[AppState] = {
         FinishedHelloRound,
     }
-    event_to_timeout: EventToTimeout = {}
+    event_to_timeout: EventToTimeout = {
+        Event.ROUND_TIMEOUT: 30.0,
+    }
     cross_period_persisted_keys: FrozenSet[str] = frozenset()
     db_pre_conditions: Dict[AppState, Set[str]] = {
         HelloRound: set(),
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the merge of the shards of IdrissTokenFinderAggregationAbciApp."""
+
+import json
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Generator, List, Optional
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from aea.configurations.base import PublicId
+
+from packages.valory.protocols.http import HttpMessage
+from packages.valory.skills.abstract_round_abci.behaviour_utils import TimeoutException
+from packages.valory.skills.abstract_round_abci.dialogues import HttpDialogues
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.behaviours import (
+    HelloBaseBehaviour,
+    canonicalize_casts,
+    get_missing_queries,
+    merge_casts,
+    serialize_casts,
+    serialize_shard,
+)
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.handlers import HttpHandler
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import (
+    ApiKeyPool,
+    FarcasterSearchResponseSpecs,
+    Requests,
+)
+
+
+def search_result(merkle_root: str, reactions: int = 0, published_at: int = 1000) -> Dict[str, Any]:
+    """Get a cast as returned by the search API."""
+    return {
+        "merkleRoot": merkle_root,
+        "body": {"publishedAt": published_at, "username": "idriss", "data": {"text": f"cast {merkle_root}"}},
+        "meta": {"reactions": {"count": reactions}},
+    }
+
+
+def test_canonicalize_casts() -> None:
+    """Test that casts past the snapshot are dropped, engagement is bucketed and casts are sorted."""
+    casts = canonicalize_casts(
+        [search_result("0xb", reactions=17), search_result("0xa", reactions=3), search_result("0xc", published_at=3000)],
+        bucket_size=10,
+        snapshot_timestamp=2000,
+    )
+    assert [cast_["merkleRoot"] for cast_ in casts] == ["0xa", "0xb"]
+    assert [cast_["engagement"]["reactions"] for cast_ in casts] == [0, 10]
+
+
+def test_merge_casts_is_independent_of_the_shard_order() -> None:
+    """Test that the merge of the shards deduplicates casts, whatever the order the shards are collected in."""
+    first = canonicalize_casts([search_result("0xa"), search_result("0xb", reactions=20)], 10, 2000)
+    second = canonicalize_casts([search_result("0xb", reactions=30), search_result("0xc")], 10, 2000)
+    merged = merge_casts(first, second)
+    assert [cast_["merkleRoot"] for cast_ in merged] == ["0xa", "0xb", "0xc"]
+    assert serialize_casts(merged) == serialize_casts(merge_casts(second, first))
+
+
+def test_missing_queries_of_uncollected_shards() -> None:
+    """Test that the queries no collected shard covers are searched again, in the order of the watchlist."""
+    shards = [json.loads(serialize_shard(0, ["b", "a"], [])), json.loads(serialize_shard(1, [], []))]
+    assert shards[0]["queries"] == ["a", "b"]
+    assert get_missing_queries(["d", "a", "c", "b"], shards) == ["d", "c"]
+    assert get_missing_queries(["a", "b"], shards) == []
+
+
+def test_search_query_is_encoded_once() -> None:
+    """Test that a query with spaces and reserved characters reaches the url encoded a single time."""
+    specs = SimpleNamespace(api_id="farcaster_search_response")
+    specs.get_spec = lambda query, count: FarcasterSearchResponseSpecs.get_spec(specs, query, count)  # type: ignore
+    behaviour = SimpleNamespace(
+        context=SimpleNamespace(farcaster_search_response=specs),
+        params=SimpleNamespace(search_count=10, api_key_pools={}),
+    )
+    request, api_key = HelloBaseBehaviour._search_request(behaviour, "$IDRISS 100% & more")  # type: ignore
+    assert api_key is None
+    url = urlparse(request["url"])
+    assert url.path == "/api/search"
+    assert parse_qs(url.query) == {"text": ["$IDRISS 100% & more"], "count": ["10"]}
+
+
+def test_api_key_released_after_error_and_missing_responses() -> None:
+    """Test that the key of a request is given back whatever its response, and accounts the reported quota."""
+    pool = ApiKeyPool(["a", "b"])
+    behaviour = SimpleNamespace(
+        context=SimpleNamespace(farcaster_search_response=SimpleNamespace(api_id="farcaster_search_response")),
+        params=SimpleNamespace(api_key_pools={"farcaster_search_response": pool}),
+    )
+    release = HelloBaseBehaviour._release_api_key  # pylint: disable=protected-access
+
+    assert pool.acquire() == "a"
+    release(behaviour, "a", SimpleNamespace(status_code=500, headers="Content-Type: text/plain\n"))  # type: ignore
+    assert pool.acquire() == "b"
+    release(behaviour, "b", None)  # type: ignore
+    assert [usage.in_flight for usage in pool.usages] == [0, 0]
+
+    # the quota reported by an error response is accounted too
+    assert pool.acquire() == "a"
+    release(behaviour, "a", SimpleNamespace(status_code=429, headers="Retry-After: 60\n"))  # type: ignore
+    assert [pool.acquire() for _ in range(2)] == ["b", "b"]
+
+
+class FanOutBehaviour:  # pylint: disable=too-few-public-methods
+    """A behaviour sending several requests at once, in a skill context of the tests."""
+
+    get_http_responses = HelloBaseBehaviour.get_http_responses
+    _create_http_request = HelloBaseBehaviour._create_http_request
+    _get_fan_out_callback = HelloBaseBehaviour._get_fan_out_callback
+
+    def __init__(self) -> None:
+        """Initialize the behaviour."""
+        self.is_stopped = False
+        self.sent: List[HttpMessage] = []
+        skill_context = MagicMock(skill_id=PublicId("victorpolisetty", "idriss_token_finder_aggregation_abci"))
+        self.context = SimpleNamespace(
+            http_dialogues=HttpDialogues(name="http_dialogues", skill_context=skill_context),
+            requests=Requests(name="requests", skill_context=skill_context),
+            outbox=SimpleNamespace(put_message=lambda message: self.sent.append(message)),
+            logger=MagicMock(),
+        )
+
+    @staticmethod
+    def wait_for_condition(condition: Callable[[], bool], timeout: Optional[float] = None) -> Generator:
+        """Wait for a condition, a tick per yield, timing out after as many ticks as the timeout."""
+        ticks = 0
+        while not condition():
+            if timeout is not None and ticks >= timeout:
+                raise TimeoutException()
+            ticks += 1
+            yield
+
+
+def http_response(nonce: str, body: bytes) -> HttpMessage:
+    """Get the response of the http client to the request with the given nonce."""
+    return HttpMessage(
+        dialogue_reference=(nonce, "1"),
+        message_id=-1,
+        target=1,
+        performative=HttpMessage.Performative.RESPONSE,
+        version="",
+        status_code=200,
+        status_text="OK",
+        headers="",
+        body=body,
+    )
+
+
+def respond(behaviour: FanOutBehaviour, request: HttpMessage, body: bytes) -> None:
+    """Respond to a request, calling its callback as the http handler does."""
+    nonce = request.dialogue_reference[0]
+    callback = behaviour.context.requests.request_id_to_callback.pop(nonce)
+    callback(http_response(nonce, body), behaviour)
+
+
+def test_concurrent_requests_with_a_late_response() -> None:
+    """Test that the requests are sent at once, and the one answered too late is given up on and dropped."""
+    behaviour = FanOutBehaviour()
+    requests = [
+        {"method": "GET", "url": f"https://api.example.com/search?text={index}", "headers": {"X-API-KEY": "key"}}
+        for index in range(3)
+    ]
+    responses = behaviour.get_http_responses(requests, timeout=2)
+
+    # every request is in flight before any response is waited for
+    next(responses)
+    assert [message.url for message in behaviour.sent] == [request["url"] for request in requests]
+    assert all(message.headers == "X-API-KEY: key\r\n" for message in behaviour.sent)
+    pending = behaviour.context.requests
+    assert len(pending.request_id_to_callback) == 3
+
+    respond(behaviour, behaviour.sent[1], b"second")
+    next(responses)
+    respond(behaviour, behaviour.sent[0], b"first")
+    with pytest.raises(StopIteration) as stop:
+        next(responses)
+    timed_responses = stop.value.value
+    assert [timed.response.body if timed.response else None for timed in timed_responses] == [
+        b"first",
+        b"second",
+        None,
+    ]
+    assert timed_responses[2].elapsed is None
+    late_nonce = behaviour.sent[2].dialogue_reference[0]
+    assert not pending.request_id_to_callback
+    assert list(pending.abandoned_requests) == [late_nonce]
+
+    # the late response is dropped by the handler, instead of failing on its missing callback
+    handler = HttpHandler(name="http", skill_context=SimpleNamespace(requests=pending, http_dialogues=MagicMock()))
+    handler.context.logger = MagicMock()
+    late = http_response(late_nonce, b"third")
+    handler.handle(late)
+    handler.context.http_dialogues.update.assert_called_once_with(late)
+    handler.context.logger.info.assert_called_once()
+    assert not pending.abandoned_requests
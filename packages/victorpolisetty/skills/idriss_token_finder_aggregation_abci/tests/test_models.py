@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the models.py module of the IdrissTokenFinderAggregation."""
+
+from types import SimpleNamespace
+from typing import List
+
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import (
+    LEAST_LOADED,
+    ApiKeyPool,
+    Params,
+    RequestTimeoutTracker,
+    get_query_owner,
+)
+
+
+QUERIES = [f"query {i}" for i in range(200)]
+
+
+def query_shard(queries: List[str], num_agents: int, agent_index: int) -> List[str]:
+    """Get the shard of an agent, without building the whole params."""
+    params = SimpleNamespace(search_queries=queries, num_agents=num_agents, agent_index=agent_index)
+    return Params.query_shard.fget(params)  # type: ignore
+
+
+class TestQuerySharding:
+    """Test the sharding of the watchlist across the agents."""
+
+    def test_owner_is_stable_and_in_range(self) -> None:
+        """Test that every query has a single owner, the same on every call."""
+        owners = [get_query_owner(query, 4) for query in QUERIES]
+        assert owners == [get_query_owner(query, 4) for query in QUERIES]
+        assert set(owners) == {0, 1, 2, 3}
+        assert {get_query_owner(query, 1) for query in QUERIES} == {0}
+
+    def test_shards_partition_the_watchlist(self) -> None:
+        """Test that the shards of all the agents cover every query exactly once, in the order of the watchlist."""
+        shards = [query_shard(QUERIES, 4, agent_index) for agent_index in range(4)]
+        assert sorted(query for shard in shards for query in shard) == sorted(QUERIES)
+        assert all(shard == [query for query in QUERIES if query in shard] for shard in shards)
+        # the queries are spread, not all given to a single agent
+        assert all(len(shard) > len(QUERIES) // 8 for shard in shards)
+
+    def test_adding_an_agent_only_moves_queries_to_it(self) -> None:
+        """Test that the rendezvous hashing only moves the queries taken by a joining agent."""
+        for query in QUERIES:
+            before, after = get_query_owner(query, 4), get_query_owner(query, 5)
+            assert after in (before, 4)
+
+
+class TestApiKeyPool:
+    """Test the rotation of the API keys."""
+
+    def test_round_robin(self) -> None:
+        """Test that the keys are used in turn."""
+        pool = ApiKeyPool(["a", "b", "c"])
+        assert [pool.acquire(now=0.0) for _ in range(4)] == ["a", "b", "c", "a"]
+
+    def test_rate_limited_key_rotated_out(self) -> None:
+        """Test that a key answered with a 429 is skipped until its cooldown expires."""
+        pool = ApiKeyPool(["a", "b", "c"])
+        assert pool.acquire(now=0.0) == "a"
+        pool.release("a", 429, {"retry-after": "30"}, now=0.0)
+        assert [pool.acquire(now=1.0) for _ in range(4)] == ["b", "c", "b", "c"]
+        assert pool.usages[0].rate_limited == 1
+
+        # the cooldown expired, so the key is back in rotation
+        assert "a" in [pool.acquire(now=30.0) for _ in range(3)]
+
+    def test_exhausted_quota_rotated_out(self) -> None:
+        """Test that a key whose quota is reported exhausted is skipped until its window resets."""
+        pool = ApiKeyPool(["a", "b"])
+        assert pool.acquire(now=0.0) == "a"
+        pool.release("a", 200, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "10"}, now=0.0)
+        assert [pool.acquire(now=5.0) for _ in range(2)] == ["b", "b"]
+        assert [pool.acquire(now=10.0) for _ in range(2)] == ["a", "b"]
+
+    def test_rate_limited_without_reset(self) -> None:
+        """Test that a 429 without any reset hint takes the key out for a whole window."""
+        pool = ApiKeyPool(["a", "b"], window_seconds=60.0)
+        pool.acquire(now=0.0)
+        pool.release("a", 429, {}, now=0.0)
+        assert pool.acquire(now=59.0) == "b"
+        assert pool.acquire(now=60.0) == "a"
+
+    def test_every_key_exhausted(self) -> None:
+        """Test that no key is given while every key is rate limited."""
+        pool = ApiKeyPool(["a", "b"])
+        for key in ("a", "b"):
+            assert pool.acquire(now=0.0) == key
+            pool.release(key, 429, {"retry-after": "10"}, now=0.0)
+        assert pool.acquire(now=5.0) is None
+        assert pool.acquire(now=10.0) == "a"
+
+    def test_release_after_error_response(self) -> None:
+        """Test that a key is given back after an error response, without being rate limited."""
+        pool = ApiKeyPool(["a", "b"], strategy=LEAST_LOADED)
+        assert pool.acquire(now=0.0) == "a"
+        assert pool.acquire(now=0.0) == "b"
+        pool.release("a", 500, {}, now=0.0)
+        usage = pool.usages[0]
+        assert (usage.in_flight, usage.rate_limited, usage.remaining) == (0, 0, None)
+        # the least loaded key is the one given back
+        assert pool.acquire(now=0.0) == "a"
+
+    def test_release_of_unknown_key(self) -> None:
+        """Test that releasing a key which is not in the pool is ignored."""
+        pool = ApiKeyPool(["a"])
+        pool.release("b", 429, {}, now=0.0)
+        assert pool.acquire(now=0.0) == "a"
+
+
+class TestRequestTimeoutTracker:
+    """Test the bounded tracking of the request timeouts."""
+
+    def test_increment_and_pop(self) -> None:
+        """Test that the timeouts of a request are counted until it is popped."""
+        tracker = RequestTimeoutTracker(max_size=10, ttl=60.0, cleanup_freq=100)
+        assert [tracker.increment("query", now=float(i)) for i in range(3)] == [1, 2, 3]
+        assert "query" in tracker
+        assert tracker.pop("query") == 3
+        assert "query" not in tracker
+        assert tracker.pop("query") == 0
+
+    def test_ttl_expiry(self) -> None:
+        """Test that the count of a request restarts once its entry expired, and that the sweep removes it."""
+        tracker = RequestTimeoutTracker(max_size=10, ttl=60.0, cleanup_freq=2)
+        tracker.increment("stale", now=0.0)
+        tracker.increment("stale", now=30.0)
+        assert tracker.increment("stale", now=91.0) == 1
+
+        tracker.increment("fresh", now=100.0)
+        # an expired entry reads as no timeout, even before it is swept
+        assert tracker["fresh"] == 0
+        # the sweep only runs every `cleanup_freq` requests
+        tracker.record_request(now=200.0)
+        assert len(tracker) == 2
+        tracker.record_request(now=200.0)
+        assert len(tracker) == 0
+        assert tracker.stats["expirations"] == 2
+
+    def test_lru_bound(self) -> None:
+        """Test that the least recently updated requests are evicted beyond the maximum size."""
+        tracker = RequestTimeoutTracker(max_size=2, ttl=60.0, cleanup_freq=100)
+        tracker.increment("a", now=0.0)
+        tracker.increment("b", now=1.0)
+        # updating "a" makes "b" the least recently updated
+        tracker.increment("a", now=2.0)
+        tracker.increment("c", now=3.0)
+        assert "b" not in tracker
+        assert "a" in tracker and "c" in tracker
+        assert tracker.stats["evictions"] == 1
+
+    def test_stats(self) -> None:
+        """Test that the stats count the requests, evictions and expirations."""
+        tracker = RequestTimeoutTracker(max_size=1, ttl=10.0, cleanup_freq=3)
+        tracker.increment("a", now=0.0)
+        tracker.increment("b", now=0.0)
+        for _ in range(3):
+            tracker.record_request(now=20.0)
+        assert tracker.stats == {"size": 0, "max_size": 1, "requests": 3, "evictions": 1, "expirations": 1}
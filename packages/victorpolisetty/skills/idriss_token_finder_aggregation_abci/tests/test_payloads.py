@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""Test the payloads.py module of the IdrissTokenFinderAggregation."""
+
+import base64
+import zlib
+from unittest import mock
+
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import BenchmarkTool
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.payloads import (
+    AggregateFarcasterSearchPayload,
+    CollectFarcasterSearchPayload,
+    compress_content,
+    decompress_content,
+)
+
+
+CONTENT = '[{"engagement":{"reactions":0,"recasts":0,"watches":0},"merkleRoot":"0xa","text":"gm $IDRISS ✨"}]'
+
+
+def test_compression_round_trip() -> None:
+    """Test that the content is compressed smaller, and decompressed back to the same string."""
+    compressed = compress_content(CONTENT)
+    assert len(compressed) < len(CONTENT.encode())
+    assert decompress_content(compressed) == CONTENT
+    assert decompress_content(compress_content("")) == ""
+
+
+def test_decompression_without_the_dictionary() -> None:
+    """Test that content compressed without the dictionary, or with another level, is decompressed too."""
+    for compressed in (zlib.compress(CONTENT.encode()), zlib.compress(CONTENT.encode(), 1)):
+        assert decompress_content(base64.b64encode(compressed).decode()) == CONTENT
+
+
+def test_payloads_from_content() -> None:
+    """Test that the payloads compress their content at construction, and survive their serialization."""
+    for payload_cls in (CollectFarcasterSearchPayload, AggregateFarcasterSearchPayload):
+        payload = payload_cls.from_content("sender", CONTENT)
+        assert payload.content == compress_content(CONTENT)
+        assert payload.decompressed_content == CONTENT
+        assert payload_cls.from_json(payload.json) == payload
+
+
+def test_benchmark_payload_size() -> None:
+    """Test that the payload sizes are reported along with the timings of the behaviour."""
+    benchmark_tool = BenchmarkTool(name="benchmark_tool", skill_context=mock.MagicMock(), log_dir="/tmp")
+    benchmark = benchmark_tool.measure("collect_farcaster_search")
+    with benchmark.compression():
+        compressed = compress_content(CONTENT)
+    benchmark.payload_size(len(CONTENT.encode()), len(compressed.encode()))
+
+    (data,) = benchmark_tool.data
+    assert data["behaviour"] == "collect_farcaster_search"
+    assert data["data"]["payload_raw_bytes"] == len(CONTENT.encode())
+    assert data["data"]["payload_compressed_bytes"] == len(compressed.encode())
+    assert "compression" in data["data"]
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This package contains the tests for rounds of IdrissTokenFinderAggregation."""
+
+import base64
+import zlib
+from typing import cast
+from unittest import mock
+
+import pytest
+
+from packages.valory.skills.abstract_round_abci.base import (
+    AbciAppDB,
+    CollectionRound,
+    TransactionNotValidError,
+)
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.behaviours import serialize_shard
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models import get_query_owner
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.payloads import (
+    AggregateFarcasterSearchPayload,
+    CollectFarcasterSearchPayload,
+    HelloPayload,
+)
+from packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.rounds import (
+    AggregateFarcasterSearchRound,
+    CollectFarcasterSearchRound,
+    Event,
+    SynchronizedData,
+)
+
+
+KEY = "participant_to_hello_round"
+AGENTS = [f"agent_{i}" for i in range(4)]
+
+
+def get_synchronized_data() -> SynchronizedData:
+    """Get the synchronized data of four participants."""
+    setup_data = {"all_participants": tuple(AGENTS), "participants": tuple(AGENTS), "consensus_threshold": 3}
+    return SynchronizedData(AbciAppDB(setup_data=AbciAppDB.data_to_lists(setup_data)))
+
+
+def get_db() -> AbciAppDB:
+    """Get a db holding a collection of payloads."""
+    collection = {sender: HelloPayload(sender, "Hello world!") for sender in ("agent_0", "agent_1")}
+    setup_data = {
+        "all_participants": tuple(collection),
+        "participants": tuple(collection),
+        "consensus_threshold": 2,
+        "safe_contract_address": "0x0000000000000000000000000000000000000000",
+        KEY: CollectionRound.serialize_collection(collection),
+    }
+    db = AbciAppDB(setup_data=AbciAppDB.data_to_lists(setup_data), cross_period_persisted_keys=frozenset({KEY}))
+    db.increment_round_count()
+    return db
+
+
+class TestSynchronizedData:
+    """Test the memo of the deserialized collections of SynchronizedData."""
+
+    def test_memo_outlives_the_instances(self) -> None:
+        """Test that a collection is deserialized once per round, whichever instance it is accessed through."""
+        db = get_db()
+        with mock.patch.object(
+            CollectionRound, "deserialize_collection", wraps=CollectionRound.deserialize_collection
+        ) as deserialize:
+            collections = [SynchronizedData(db).participant_to_hello_round for _ in range(3)]
+            assert deserialize.call_count == 1
+        assert collections[0] == collections[2]
+        assert set(collections[0]) == {"agent_0", "agent_1"}
+        # the caller gets its own dictionary, so that it cannot alter the memo
+        collections[0].clear()
+        assert len(SynchronizedData(db).participant_to_hello_round) == 2
+
+    def test_memo_invalidated(self) -> None:
+        """Test that the memo is invalidated by an update, a new period and a new round."""
+        db = get_db()
+        synchronized_data = SynchronizedData(db)
+        assert len(synchronized_data.participant_to_hello_round) == 2
+
+        updated = synchronized_data.update(
+            **{KEY: CollectionRound.serialize_collection({"agent_2": HelloPayload("agent_2", "Hello world!")})}
+        )
+        assert set(updated.participant_to_hello_round) == {"agent_2"}
+
+        with mock.patch.object(
+            CollectionRound, "deserialize_collection", wraps=CollectionRound.deserialize_collection
+        ) as deserialize:
+            db.increment_round_count()
+            assert set(SynchronizedData(db).participant_to_hello_round) == {"agent_2"}
+            assert deserialize.call_count == 1
+
+        created = SynchronizedData(db).create()
+        assert set(created.participant_to_hello_round) == {"agent_2"}
+        assert db.reset_index == 1
+
+
+class TestCollectFarcasterSearchRound:
+    """Test the collection of the shards of the watchlist."""
+
+    def test_agents_without_queries_reach_the_threshold(self) -> None:
+        """Test that the empty shards of the agents without queries are all collected."""
+        test_round = CollectFarcasterSearchRound(get_synchronized_data(), mock.MagicMock())
+
+        # a single query, so that a single agent has a shard to search
+        owner = get_query_owner("$IDRISS", len(AGENTS))
+        payloads = [
+            CollectFarcasterSearchPayload.from_content(
+                agent, serialize_shard(index, ["$IDRISS"] if index == owner else [], [])
+            )
+            for index, agent in enumerate(AGENTS)
+        ]
+        assert len({payload.content for payload in payloads}) == len(AGENTS)
+
+        for payload in [payload for index, payload in enumerate(payloads) if index != owner][:3]:
+            test_round.check_payload(payload)
+            test_round.process_payload(payload)
+
+        result = test_round.end_block()
+        assert result is not None
+        synchronized_data, event = result
+        assert event == Event.DONE
+        assert len(cast(SynchronizedData, synchronized_data).participant_to_farcaster_search_round) == 3
+
+    def test_undecompressable_payload_rejected(self) -> None:
+        """Test that a payload whose content cannot be decompressed is rejected."""
+        test_round = CollectFarcasterSearchRound(get_synchronized_data(), mock.MagicMock())
+        with pytest.raises(TransactionNotValidError, match="Cannot decompress"):
+            test_round.check_payload(CollectFarcasterSearchPayload("agent_0", "not compressed"))
+        assert not test_round.collection
+
+
+class TestAggregateFarcasterSearchRound:
+    """Test the agreement on the merge of the shards."""
+
+    def test_votes_on_the_decompressed_content(self) -> None:
+        """Test that the same content compressed into different bytes counts as the same vote."""
+        test_round = AggregateFarcasterSearchRound(get_synchronized_data(), mock.MagicMock())
+        content = '[{"merkleRoot":"0xa"}]'
+        payloads = [AggregateFarcasterSearchPayload.from_content(agent, content) for agent in AGENTS[:2]]
+        # as compressed by a zlib build with another level, and without the dictionary
+        payloads.append(
+            AggregateFarcasterSearchPayload(AGENTS[2], base64.b64encode(zlib.compress(content.encode(), 1)).decode())
+        )
+        assert payloads[0].content != payloads[2].content
+
+        for payload in payloads:
+            test_round.check_payload(payload)
+            test_round.process_payload(payload)
+            assert test_round.is_majority_possible(test_round.collection, len(AGENTS))
+
+        result = test_round.end_block()
+        assert result is not None
+        synchronized_data, event = result
+        assert event == Event.DONE
+        assert cast(SynchronizedData, synchronized_data).search_farcaster_search == content
+
+    def test_no_majority_on_different_content(self) -> None:
+        """Test that different contents are still different votes."""
+        test_round = AggregateFarcasterSearchRound(get_synchronized_data(), mock.MagicMock())
+        for index, agent in enumerate(AGENTS[:3]):
+            payload = AggregateFarcasterSearchPayload.from_content(agent, f"[{index}]")
+            test_round.check_payload(payload)
+            test_round.process_payload(payload)
+        assert not test_round.is_majority_possible(test_round.collection, len(AGENTS))
+        assert test_round.end_block() == (test_round.synchronized_data, Event.NO_MAJORITY)
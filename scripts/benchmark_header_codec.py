@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+This script benchmarks the header codec of the http connections against the email.message based path it replaced.
+
+It is assumed the script is run from the repository root.
+"""
+
+import email
+import email.message
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict
+
+import click
+
+
+sys.path.insert(0, str(Path.cwd()))
+
+from packages.eightballer.connections.http_common.headers import (  # noqa: E402  # pylint: disable=wrong-import-position
+    decode_headers,
+    encode_headers,
+)
+
+
+HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "Content-Length": "1024",
+    "Date": "Mon, 19 Oct 2026 00:00:00 GMT",
+    "Server": "Python/3.10 aiohttp/3.8.5",
+    "Cache-Control": "no-cache",
+    "X-Request-Id": "0f1e2d3c4b5a69788796a5b4c3d2e1f0",
+    "X-RateLimit-Remaining": "42",
+    "Set-Cookie": "session=0123456789abcdef; Path=/; HttpOnly",
+}
+
+
+def email_encode(headers: Dict[str, str]) -> str:
+    """Encode headers as the connections did before the codec."""
+    message = email.message.Message()
+    for name, value in headers.items():
+        message.add_header(name, value)
+    return message.as_string()
+
+
+def email_decode(headers: str) -> Dict[str, str]:
+    """Decode headers as the connections did before the codec."""
+    return dict(email.message_from_string(headers).items())
+
+
+def best_of(function: Callable[[], object], number: int, repeat: int) -> float:
+    """Get the best time per call, in microseconds."""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+@click.command()
+@click.option("--number", type=int, default=10000, show_default=True, help="Calls per measurement.")
+@click.option("--repeat", type=int, default=5, show_default=True, help="Measurements, the best one is kept.")
+def main(number: int, repeat: int) -> None:
+    """Benchmark the header codec."""
+    encoded = encode_headers(HEADERS)
+    legacy = email_encode(HEADERS)
+    results = {
+        "encode": (
+            best_of(lambda: email_encode(HEADERS), number, repeat),
+            best_of(lambda: encode_headers(HEADERS), number, repeat),
+        ),
+        "decode": (
+            best_of(lambda: email_decode(legacy), number, repeat),
+            best_of(lambda: decode_headers(encoded), number, repeat),
+        ),
+    }
+    click.echo(f"{'':8}{'email (us)':>12}{'codec (us)':>12}{'speedup':>10}")
+    for operation, (email_us, codec_us) in results.items():
+        click.echo(f"{operation:8}{email_us:12.2f}{codec_us:12.2f}{email_us / codec_us:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
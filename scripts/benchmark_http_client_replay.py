@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+This script benchmarks the http client connection offline, replaying the responses of a cassette.
+
+The requests of the cassette are replayed concurrently, with their recorded latency or a fixed one,
+and optionally with injected errors, so that runs are deterministic and do not touch the network.
+It is assumed the script is run from the repository root.
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import statistics
+from typing import List, Optional
+from pathlib import Path
+
+import click
+
+
+sys.path.insert(0, str(Path.cwd()))
+
+from packages.eightballer.protocols.http.message import (  # noqa: E402  # pylint: disable=wrong-import-position
+    HttpMessage,
+)
+from packages.eightballer.connections.http_client.cassette import (  # noqa: E402  # pylint: disable=wrong-import-position
+    REPLAY,
+    Interaction,
+    request_key,
+)
+from packages.eightballer.connections.http_client.connection import (  # noqa: E402  # pylint: disable=wrong-import-position
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+async def run(
+    cassette_path: str,
+    number: int,
+    concurrency: int,
+    latency: Optional[float],
+    error_rate: float,
+    max_retries: int,
+) -> None:
+    """Run the benchmark."""
+    # the requests with a body are left out, since their body is not kept in the cassette
+    _, _, no_body_hash = request_key("GET", "", b"")
+    with open(cassette_path, encoding="utf-8") as cassette:
+        interactions = [Interaction.from_line(line) for line in cassette if line.strip()]
+    messages = [
+        HttpMessage(
+            performative=HttpMessage.Performative.REQUEST,
+            method=interaction.method,
+            url=interaction.url,
+            headers="",
+            version="",
+            body=b"",
+        )
+        for interaction in interactions
+        if interaction.body_hash == no_body_hash
+    ]
+    channel = HTTPClientAsyncChannel(
+        "agent",
+        "127.0.0.1",
+        0,
+        HTTPClientConnection.connection_id,
+        transport_mode=REPLAY,
+        cassette_path=cassette_path,
+        replay_latency=latency,
+        replay_error_rate=error_rate,
+        replay_seed=0,
+        max_retries=max_retries,
+        retry_backoff=0.0,
+        max_in_flight_per_host=concurrency,
+    )
+    await channel.connect(asyncio.get_running_loop())
+    latencies: List[float] = []
+    statuses: List[int] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await channel._fetch(messages[index % len(messages)])  # pylint: disable=protected-access
+            latencies.append((time.perf_counter() - start) * 1e3)
+            statuses.append(response.status)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(request(index) for index in range(number)))
+    finally:
+        await channel.disconnect()
+    elapsed = time.perf_counter() - start
+
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    click.echo(f"requests: {number}, concurrency: {concurrency}, throughput: {number / elapsed:.1f} req/s")
+    click.echo(
+        f"latency (ms): mean {statistics.mean(latencies):.3f}, p50 {statistics.median(latencies):.3f}, p99 {p99:.3f}"
+    )
+    click.echo(f"errors: {sum(status >= 400 for status in statuses)}, injected: {channel.cassette.injected_errors}")
+
+
+@click.command()
+@click.argument("cassette_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--number", type=int, default=1000, show_default=True, help="Requests to replay.")
+@click.option("--concurrency", type=int, default=16, show_default=True, help="Requests in flight.")
+@click.option("--latency", type=float, default=None, help="Fixed latency in seconds, the recorded one if not set.")
+@click.option("--error-rate", type=float, default=0.0, show_default=True, help="Share of injected errors.")
+@click.option("--max-retries", type=int, default=0, show_default=True, help="Retries of the injected errors.")
+def main(
+    cassette_path: str,
+    number: int,
+    concurrency: int,
+    latency: Optional[float],
+    error_rate: float,
+    max_retries: int,
+) -> None:
+    """Benchmark the http client connection offline, replaying a cassette."""
+    # the retries of the injected errors are expected, and not worth a warning each
+    logging.getLogger("aea.packages.eightballer.connections.http_client").setLevel(logging.ERROR)
+    asyncio.run(run(cassette_path, number, concurrency, latency, error_rate, max_retries))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
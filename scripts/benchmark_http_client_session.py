@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+This script benchmarks the per-request latency of the http client connection against a local stand-in server.
+
+It compares the pooled session of the channel with the session per request it replaced.
+It is assumed the script is run from the repository root.
+"""
+
+import sys
+import time
+import asyncio
+import statistics
+from pathlib import Path
+from typing import List, Callable, Awaitable
+
+import click
+import aiohttp
+from aiohttp import web
+
+
+sys.path.insert(0, str(Path.cwd()))
+
+from packages.eightballer.protocols.http.message import (  # noqa: E402  # pylint: disable=wrong-import-position
+    HttpMessage,
+)
+from packages.eightballer.connections.http_client.connection import (  # noqa: E402  # pylint: disable=wrong-import-position
+    HTTPClientAsyncChannel,
+    HTTPClientConnection,
+)
+
+
+HOST = "127.0.0.1"
+BODY = b'{"casts": []}'
+
+
+async def stand_in(_request: web.BaseRequest) -> web.Response:
+    """Answer as the searchcaster API would, without any latency of its own."""
+    return web.json_response(body=BODY)
+
+
+async def measure(request: Callable[[], Awaitable[object]], number: int) -> List[float]:
+    """Get the latency of sequential requests, in milliseconds."""
+    latencies = []
+    for _ in range(number):
+        start = time.perf_counter()
+        await request()
+        latencies.append((time.perf_counter() - start) * 1e3)
+    return latencies
+
+
+async def run(number: int) -> None:
+    """Run the benchmark."""
+    runner = web.ServerRunner(web.Server(stand_in))
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    url = f"http://{HOST}:{port}/api/search"
+    message = HttpMessage(
+        performative=HttpMessage.Performative.REQUEST,
+        method="get",
+        url=url,
+        headers="",
+        version="",
+        body=b"",
+    )
+
+    async def session_per_request() -> None:
+        async with aiohttp.ClientSession() as session, session.get(url) as response:
+            await response.read()
+
+    channel = HTTPClientAsyncChannel("agent", HOST, port, HTTPClientConnection.connection_id)
+    await channel.connect(asyncio.get_running_loop())
+    try:
+        results = {
+            "per request": await measure(session_per_request, number),
+            "pooled": await measure(
+                lambda: channel._perform_http_request(message), number  # pylint: disable=protected-access
+            ),
+        }
+    finally:
+        await channel.disconnect()
+        await runner.cleanup()
+
+    click.echo(f"{'session':12}{'mean (ms)':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, latencies in results.items():
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        click.echo(f"{name:12}{statistics.mean(latencies):12.3f}{statistics.median(latencies):12.3f}{p99:12.3f}")
+    speedup = statistics.mean(results["per request"]) / statistics.mean(results["pooled"])
+    click.echo(f"speedup: {speedup:.1f}x")
+
+
+@click.command()
+@click.option("--number", type=int, default=1000, show_default=True, help="Sequential requests per session mode.")
+def main(number: int) -> None:
+    """Benchmark the pooled session of the http client connection."""
+    asyncio.run(run(number))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+This script measures the cold import time of the packages loaded on agent startup.
+
+Every module is imported in a fresh interpreter with `python -X importtime`, and the
+cumulative import time of the module, along with its heaviest dependencies, is reported.
+Given a baseline produced by a previous run, the script fails if a module got slower than
+the allowed tolerance.
+
+It is assumed the script is run from the repository root.
+"""
+
+import json
+import re
+import statistics
+import subprocess  # nosec
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+
+DEFAULT_MODULES = (
+    "packages.eightballer.connections.http_client.connection",
+    "packages.eightballer.connections.http_server.connection",
+    "packages.eightballer.connections.websocket_server.connection",
+    "packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.models",
+    "packages.victorpolisetty.skills.idriss_token_finder_aggregation_abci.behaviours",
+    "packages.victorpolisetty.skills.idriss_token_finder_abci.models",
+    "packages.victorpolisetty.skills.idriss_token_finder_abci.behaviours",
+)
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_import_times(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse the output of `python -X importtime`.
+
+    :param stderr: the standard error of the interpreter.
+    :return: the self and cumulative import time, in microseconds, of every top level import of a module.
+    """
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, _, module = match.groups()
+        times.setdefault(module, (int(self_us), int(cumulative_us)))
+    return times
+
+
+def measure(module: str, top: int) -> Dict:
+    """
+    Measure the cold import time of a module.
+
+    :param module: the dotted path of the module.
+    :param top: the number of heaviest dependencies to report.
+    :return: the measurement.
+    """
+    result = subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"Could not import {module}:\n{result.stderr[-2000:]}")
+
+    times = parse_import_times(result.stderr)
+    heaviest = sorted(
+        ((name, cumulative) for name, (_, cumulative) in times.items() if "." not in name),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        "cumulative_us": times[module][1],
+        "heaviest": dict(heaviest),
+    }
+
+
+def check_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Get the modules which got slower than the baseline by more than the tolerance."""
+    return [
+        f"{module}: {result['cumulative_us']}us vs {baseline[module]['cumulative_us']}us"
+        for module, result in results.items()
+        if module in baseline and result["cumulative_us"] > baseline[module]["cumulative_us"] * (1 + tolerance)
+    ]
+
+
+@click.command()
+@click.option(
+    "--module",
+    "modules",
+    multiple=True,
+    default=DEFAULT_MODULES,
+    show_default=True,
+    help="Module to measure, can be repeated.",
+)
+@click.option(
+    "--runs", type=int, default=5, show_default=True, help="Fresh interpreters per module, the median is kept."
+)
+@click.option("--top", type=int, default=5, show_default=True, help="Number of heaviest dependencies to report.")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), help="File to write the results to.")
+@click.option(
+    "--baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path), help="Results to compare against."
+)
+@click.option("--tolerance", type=float, default=0.2, show_default=True, help="Allowed relative slowdown.")
+def main(
+    modules: Tuple[str, ...],
+    runs: int,
+    top: int,
+    output: Optional[Path],
+    baseline: Optional[Path],
+    tolerance: float,
+) -> None:
+    """Measure the import time of the agent packages."""
+    sys.path.insert(0, str(Path.cwd()))
+    results = {}
+    for module in modules:
+        measurements = [measure(module, top) for _ in range(runs)]
+        median = statistics.median(m["cumulative_us"] for m in measurements)
+        results[module] = {
+            "cumulative_us": int(median),
+            "heaviest": measurements[-1]["heaviest"],
+        }
+        click.echo(f"{median / 1000:10.1f}ms  {module}")
+        for name, cumulative in results[module]["heaviest"].items():
+            click.echo(f"{'':14}{cumulative / 1000:8.1f}ms  {name}")
+
+    if output is not None:
+        output.write_text(json.dumps(results, indent=4))
+
+    if baseline is not None:
+        regressions = check_regressions(results, json.loads(baseline.read_text()), tolerance)
+        if regressions:
+            raise click.ClickException("Import time regressions:\n" + "\n".join(regressions))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
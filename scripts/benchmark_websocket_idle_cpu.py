@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+This script benchmarks the CPU used by the websocket server connection while its clients are connected but idle.
+
+The clients run in the same process as the server, so the CPU time measured is an upper bound of the server's.
+It is assumed the script is run from the repository root.
+"""
+
+import sys
+import time
+import socket
+import asyncio
+import logging
+from typing import List
+from pathlib import Path
+
+import click
+import aiohttp
+
+
+sys.path.insert(0, str(Path.cwd()))
+
+from packages.eightballer.connections.websocket_server.connection import (  # noqa: E402  # pylint: disable=wrong-import-position
+    CONNECTION_ID,
+    WebSocketChannel,
+)
+
+
+HOST = "127.0.0.1"
+
+
+def get_unused_tcp_port() -> int:
+    """Get an unused TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+async def drain(channel: WebSocketChannel) -> None:
+    """Consume the envelopes the channel sends to the agent, as the multiplexer would."""
+    while True:
+        await channel.get_message()
+
+
+async def run(clients: int, duration: float) -> None:
+    """Run the benchmark."""
+    port = get_unused_tcp_port()
+    channel = WebSocketChannel(
+        address="agent",
+        host=HOST,
+        port=port,
+        target_skill_id="some_author/some_skill:0.1.0",
+        api_spec_path=None,
+        connection_id=CONNECTION_ID,
+    )
+    await channel.connect(asyncio.get_running_loop())
+    drainer = asyncio.ensure_future(drain(channel))
+    connector = aiohttp.TCPConnector(limit=0)
+    session = aiohttp.ClientSession(connector=connector)
+    readers: List[asyncio.Task] = []
+    try:
+        websockets = await asyncio.gather(*(session.ws_connect(f"http://{HOST}:{port}/ws") for _ in range(clients)))
+        # the clients wait for messages, so that they answer the closing handshake of the server
+        readers = [asyncio.ensure_future(ws.receive()) for ws in websockets]
+        while len(channel.readers) < clients:
+            await asyncio.sleep(0.1)
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        await asyncio.sleep(duration)
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+        open_sessions = len(channel.readers)
+    finally:
+        await channel.disconnect()
+        drainer.cancel()
+        await asyncio.gather(drainer, *readers, return_exceptions=True)
+        await session.close()
+
+    click.echo(f"clients: {clients}, idle for {wall:.1f}s, sessions still open: {open_sessions}")
+    click.echo(f"cpu: {cpu:.3f}s, {100 * cpu / wall:.2f}% of a core")
+
+
+@click.command()
+@click.option("--clients", type=int, default=1000, show_default=True, help="Idle websocket clients.")
+@click.option("--duration", type=float, default=10.0, show_default=True, help="Seconds to measure for.")
+def main(clients: int, duration: float) -> None:
+    """Benchmark the CPU used by the websocket server connection with idle clients."""
+    # a line per connection and disconnection is not worth logging here
+    logging.getLogger("aea").setLevel(logging.WARNING)
+    asyncio.run(run(clients, duration))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter